@@ -4,6 +4,24 @@ from functools import lru_cache
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+
+    # Read replicas for API queries: comma-separated URLs (empty = primary only)
+    DATABASE_REPLICA_URLS: str = ""
+    # Seconds between replica freshness checks; loads a replica may trail the primary
+    REPLICA_CHECK_SECONDS: int = 10
+    REPLICA_MAX_LOAD_LAG: int = 0
+
+    # Multi-tenancy: database name per tenant, e.g. "cortex_{tenant}" (empty = DATABASE_URL only)
+    TENANT_DATABASE_TEMPLATE: str = ""
+    # Tenant from subdomains of this domain (acme.example.com -> acme)
+    TENANT_BASE_DOMAIN: str = ""
+    # Also accept the unauthenticated X-Tenant header / ?tenant= (only behind a gateway that sets them)
+    TENANT_HEADER_SELECTION: bool = False
+    # Connection pool per tenant, tenants with open engines and seconds before an idle tenant is closed
+    TENANT_POOL_SIZE: int = 2
+    TENANT_MAX_OVERFLOW: int = 3
+    TENANT_MAX_ENGINES: int = 50
+    TENANT_IDLE_SECONDS: int = 600
     SECRET_KEY: str = "cortex-secret-key"
     DEBUG: bool = False
 
@@ -11,6 +29,55 @@ class Settings(BaseSettings):
     API_V1_PREFIX: str = "/api"
     PROJECT_NAME: str = "Cortex Analytics - E-commerce Dashboard"
 
+    # ABC classification (0 = lifetime revenue)
+    ABC_WINDOW_DAYS: int = 0
+    ABC_THRESHOLD_A: float = 0.8
+    ABC_THRESHOLD_B: float = 0.95
+
+    # Seconds between dimension cache version checks
+    DIMENSION_CACHE_POLL_SECONDS: int = 60
+
+    # Seconds between data version checks (ETag validation)
+    DATA_VERSION_POLL_SECONDS: int = 5
+
+    # Seconds between keep-alive comments on live (SSE) streams
+    LIVE_KEEPALIVE_SECONDS: int = 15
+
+    # Responses smaller than this are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+
+    # Concurrent queries (and DB connections) per /dashboard/bundle request
+    DASHBOARD_BUNDLE_WORKERS: int = 4
+
+    # Startup warm-up (gates /ready)
+    WARMUP_CONNECTIONS: int = 5
+    WARMUP_PERIOD: str = "30d"
+    WARMUP_RETRY_SECONDS: int = 5
+
+    # Monthly fact partitions: months created ahead, months kept (0 = all) and archive before dropping
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_RETENTION_MONTHS: int = 0
+    PARTITION_ARCHIVE: bool = True
+
+    # Parquet snapshots queried with DuckDB (empty = disabled)
+    SNAPSHOT_DIR: str = ""
+
+    # Background jobs: worker threads, store (empty = api_jobs in each tenant's database,
+    # e.g. sqlite:///jobs.db for a local file), seconds results are kept and a job may run
+    JOB_WORKERS: int = 2
+    JOB_STORE_URL: str = ""
+    JOB_RESULT_TTL_SECONDS: int = 3600
+    JOB_TIMEOUT_SECONDS: int = 900
+
+    # Multi-touch attribution
+    ATTRIBUTION_LOOKBACK_DAYS: int = 30
+    ATTRIBUTION_HALF_LIFE_DAYS: float = 7.0
+    ATTRIBUTION_CHUNK_SIZE: int = 5000
+
+    @property
+    def replica_urls(self) -> list:
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
     class Config:
         env_file = ".env"
         case_sensitive = True
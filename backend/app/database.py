@@ -1,27 +1,290 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import create_engine, make_url, text, Delete, Insert, Update
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .tenancy import DEFAULT_TENANT, current_tenant, forget_tenant
+
+logger = logging.getLogger(__name__)
+
+# MySQL "Unknown database": the tenant has no database
+UNKNOWN_DATABASE_ERROR = 1049
+
+# Seconds between idle-tenant sweeps made on the request path
+TENANT_SWEEP_SECONDS = 60
+
+
+def engine_url(url: str) -> str:
+    """Ensure MySQL URLs use the pymysql driver."""
+    if url.startswith("mysql://"):
+        return url.replace("mysql://", "mysql+pymysql://", 1)
+    return url
+
+
+def make_engine(url: str, **pool_options):
+    return create_engine(
+        engine_url(url),
+        pool_pre_ping=True,
+        pool_recycle=300,
+        echo=settings.DEBUG,
+        **pool_options
+    )
 
-# Ensure DATABASE_URL uses pymysql driver
-database_url = settings.DATABASE_URL
-if database_url.startswith("mysql://"):
-    database_url = database_url.replace("mysql://", "mysql+pymysql://", 1)
 
-engine = create_engine(
-    database_url,
-    pool_pre_ping=True,
-    pool_recycle=300,
-    echo=settings.DEBUG
-)
+def tenant_url(url: str, tenant: str) -> str:
+    """`url` pointed at the tenant's database (TENANT_DATABASE_TEMPLATE)."""
+    database = settings.TENANT_DATABASE_TEMPLATE.format(tenant=tenant)
+    return make_url(engine_url(url)).set(database=database).render_as_string(hide_password=False)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Latest completed load; a replica that has not replicated it yet is stale
+LOAD_VERSION_SQL = text("SELECT MAX(load_id) FROM etl_loads")
+
+
+class ReplicaSet:
+    """Round-robin over the replicas that are caught up with the primary.
+
+    Every REPLICA_CHECK_SECONDS the latest etl_loads.load_id of each replica
+    is compared with the primary's; replicas more than REPLICA_MAX_LOAD_LAG
+    loads behind, or unreachable, are skipped until the next check. With no
+    usable replica, reads fall back to the primary.
+    """
+
+    def __init__(self, primary, engines: list):
+        self.primary = primary
+        self.engines = engines
+        self._healthy = []
+        self._checked_at = None
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load_version(bind) -> int:
+        with bind.connect() as connection:
+            return connection.execute(LOAD_VERSION_SQL).scalar() or 0
+
+    def check(self):
+        """Re-evaluate which replicas may serve reads."""
+        try:
+            primary_version = self.load_version(self.primary)
+        except Exception:
+            logger.exception("Could not read the primary load version; keeping replica state")
+            self._checked_at = time.monotonic()
+            return
+
+        healthy = []
+        for replica in self.engines:
+            try:
+                lag = primary_version - self.load_version(replica)
+            except Exception as e:
+                logger.warning(f"Replica {replica.url.host or replica.url.database} unavailable: {e}")
+                continue
+            if lag <= settings.REPLICA_MAX_LOAD_LAG:
+                healthy.append(replica)
+            else:
+                logger.warning(f"Replica {replica.url.host or replica.url.database} is {lag} loads behind; skipping")
+
+        self._healthy = healthy
+        self._checked_at = time.monotonic()
+
+    def pick(self):
+        """Engine for the next read-only session: a fresh replica, else the primary."""
+        if not self.engines:
+            return self.primary
+
+        if self._checked_at is None or time.monotonic() - self._checked_at >= settings.REPLICA_CHECK_SECONDS:
+            with self._lock:
+                if self._checked_at is None or time.monotonic() - self._checked_at >= settings.REPLICA_CHECK_SECONDS:
+                    self.check()
+
+        healthy = self._healthy
+        if not healthy:
+            return self.primary
+        return healthy[next(self._counter) % len(healthy)]
+
+    def invalidate(self):
+        """Force a re-check on the next pick (e.g. right after a load)."""
+        self._checked_at = None
+
+
+class RoutingSession(Session):
+    """Session that reads from `read_engine` and sends writes to the primary."""
+
+    def __init__(self, *args, primary=None, read_engine=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.primary = primary
+        self.read_engine = read_engine or primary
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, (Insert, Update, Delete)):
+            return self.primary
+        return self.read_engine
+
+
+ReadSessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+
+class TenantDatabase:
+    """Engines (primary and replicas), replica routing and sessions of one database."""
+
+    def __init__(self, url: str, replica_urls: list, **pool_options):
+        self.engine = make_engine(url, **pool_options)
+        self.replica_engines = [make_engine(replica, **pool_options) for replica in replica_urls]
+        self.replicas = ReplicaSet(self.engine, self.replica_engines)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.last_used = time.monotonic()
+
+    def read_session(self) -> Session:
+        return ReadSessionLocal(primary=self.engine, read_engine=self.replicas.pick())
+
+    def in_use(self) -> bool:
+        return any(bind.pool.checkedout() for bind in [self.engine, *self.replica_engines])
+
+    def dispose(self):
+        for bind in [self.engine, *self.replica_engines]:
+            bind.dispose()
+
+
+class EngineRegistry:
+    """Databases per tenant, opened on first use and closed when idle.
+
+    Tenant engines get small pools (TENANT_POOL_SIZE + TENANT_MAX_OVERFLOW).
+    At most TENANT_MAX_ENGINES tenants keep engines open; past that the least
+    recently used ones are disposed, as are tenants idle for
+    TENANT_IDLE_SECONDS, unless a connection is checked out. An evicted tenant
+    loses its caches too and is reopened on its next request. The default
+    tenant (DATABASE_URL) is never evicted.
+    """
+
+    def __init__(self, default: TenantDatabase):
+        self.default = default
+        self._tenants = OrderedDict()
+        self._swept_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def open(self, tenant: str) -> TenantDatabase:
+        database = TenantDatabase(
+            tenant_url(settings.DATABASE_URL, tenant),
+            [tenant_url(url, tenant) for url in settings.replica_urls],
+            pool_size=settings.TENANT_POOL_SIZE,
+            max_overflow=settings.TENANT_MAX_OVERFLOW
+        )
+        try:
+            with database.engine.connect():
+                pass
+        except OperationalError as e:
+            database.dispose()
+            if getattr(e.orig, "args", (None,))[0] == UNKNOWN_DATABASE_ERROR:
+                raise LookupError(f"Unknown tenant {tenant}") from e
+            raise
+        logger.info(f"Opened engines for tenant {tenant}")
+        return database
+
+    def get(self, tenant: str) -> TenantDatabase:
+        if time.monotonic() - self._swept_at >= TENANT_SWEEP_SECONDS:
+            self.sweep()
+
+        if tenant == DEFAULT_TENANT:
+            return self.default
+
+        with self._lock:
+            database = self._tenants.get(tenant)
+            if database is not None:
+                self._tenants.move_to_end(tenant)
+                database.last_used = time.monotonic()
+                return database
+
+        # Connect outside the lock: other tenants' requests must not wait for it
+        database = self.open(tenant)
+        with self._lock:
+            existing = self._tenants.get(tenant)
+            if existing is not None:
+                database.dispose()
+                database = existing
+            else:
+                self._tenants[tenant] = database
+            self._tenants.move_to_end(tenant)
+            database.last_used = time.monotonic()
+            evicted = self._evict()
+
+        self._close(evicted)
+        return database
+
+    def _evict(self) -> list:
+        """Remove idle and least recently used tenants beyond the limit (holding the lock)."""
+        now = self._swept_at = time.monotonic()
+        evicted = []
+        # Oldest first; the tenant just used is last
+        for tenant, database in list(self._tenants.items())[:-1]:
+            over_limit = len(self._tenants) > settings.TENANT_MAX_ENGINES
+            idle = now - database.last_used >= settings.TENANT_IDLE_SECONDS
+            if (over_limit or idle) and not database.in_use():
+                evicted.append((tenant, self._tenants.pop(tenant)))
+        return evicted
+
+    def _close(self, evicted: list):
+        for tenant, database in evicted:
+            database.dispose()
+            forget_tenant(tenant)
+            logger.info(f"Closed idle engines of tenant {tenant}")
+
+    def sweep(self):
+        """Evict idle tenants without waiting for the next new one."""
+        with self._lock:
+            evicted = self._evict()
+        self._close(evicted)
+
+    def tenants(self) -> list:
+        return list(self._tenants)
+
+    def dispose(self):
+        with self._lock:
+            evicted = list(self._tenants.items())
+            self._tenants.clear()
+        self._close(evicted)
+        self.default.dispose()
+
+
+# DATABASE_URL: the only database without multi-tenancy, and the one scripts use
+default_database = TenantDatabase(settings.DATABASE_URL, settings.replica_urls)
+
+# Primary: every write, the post-load refresh and the data version
+engine = default_database.engine
+SessionLocal = default_database.SessionLocal
+
+# Read replicas for the API's analytics queries (optional)
+replica_engines = default_database.replica_engines
+replicas = default_database.replicas
+
+databases = EngineRegistry(default_database)
+
+
+def tenant_database() -> TenantDatabase:
+    """Database of the current tenant (see tenancy.py)."""
+    return databases.get(current_tenant())
+
+
+def primary_session() -> Session:
+    """Session on the current tenant's primary."""
+    return tenant_database().SessionLocal()
+
+
+def read_session() -> Session:
+    """Session for read-only analytics; one replica for its whole lifetime."""
+    return tenant_database().read_session()
+
 
 def get_db():
-    db = SessionLocal()
+    # Routers only read, so requests are served from the replicas when configured
+    db = read_session()
     try:
         yield db
     finally:
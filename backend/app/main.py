@@ -1,19 +1,29 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .routers import (
-    dashboard_router,
-    customers_router,
-    orders_router,
-    products_router,
-    campaigns_router,
-    predictions_router
-)
+from .middleware import ConditionalGetMiddleware, CompressionMiddleware, TenantMiddleware
+from .startup import lifespan, readiness
+from .utils.lazy import import_timings, timed
+from .utils.responses import FastJSONResponse
+
+with timed("app.routers"):
+    from .routers import (
+        dashboard_router,
+        customers_router,
+        orders_router,
+        products_router,
+        campaigns_router,
+        predictions_router,
+        sessions_router,
+        jobs_router
+    )
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
-    description="API for Cortex Analytics E-commerce Dashboard"
+    description="API for Cortex Analytics E-commerce Dashboard",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS configuration
@@ -28,6 +38,13 @@ allowed_origins = [
     "http://127.0.0.1:5173",
 ]
 
+# Conditional GETs answer repeat views with 304 until the next load; the
+# tenant is resolved outside them (ETags are per tenant). CORS is added last so
+# it wraps everything (304s and tenant errors need CORS headers too)
+app.add_middleware(ConditionalGetMiddleware, prefix=settings.API_V1_PREFIX)
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MINIMUM_SIZE)
+app.add_middleware(TenantMiddleware, prefix=settings.API_V1_PREFIX)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allowed_origins,
@@ -43,6 +60,8 @@ app.include_router(customers_router, prefix=settings.API_V1_PREFIX)
 app.include_router(products_router, prefix=settings.API_V1_PREFIX)
 app.include_router(campaigns_router, prefix=settings.API_V1_PREFIX)
 app.include_router(predictions_router, prefix=settings.API_V1_PREFIX)
+app.include_router(sessions_router, prefix=settings.API_V1_PREFIX)
+app.include_router(jobs_router, prefix=settings.API_V1_PREFIX)
 
 
 @app.get("/")
@@ -58,3 +77,12 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/ready")
+def readiness_check():
+    """Ready once startup warm-up has finished (503 until then); /health only reports the process is up."""
+    return FastJSONResponse(
+        {**readiness.status(), "imports": import_timings},
+        status_code=200 if readiness.ready else 503
+    )
@@ -0,0 +1,221 @@
+"""HTTP middleware: tenant resolution, conditional GETs keyed on the data version, and compression.
+
+The dashboard re-fetches every widget on navigation. API responses only change
+when a new load lands (see services/data_version.py) or the calendar day rolls
+over, so their ETag is derived from the tenant, its data version, the current
+date and the request itself. That lets `If-None-Match` be answered with 304
+before any handler or query runs.
+"""
+import gzip
+import hashlib
+from datetime import date
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders, QueryParams
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .database import databases
+from .services.data_version import data_version
+from .tenancy import TENANT_HEADER, current_tenant, header_selection, multi_tenant, resolve_tenant, use_tenant, valid_tenant
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+# Browsers may keep responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+# Request headers that select a different representation of the same URL
+VARY_HEADERS = ["Accept", "Accept-Encoding"]
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+
+def vary_headers() -> list:
+    return VARY_HEADERS + [TENANT_HEADER] if header_selection() else VARY_HEADERS
+
+
+def compute_etag(version: int, scope: Scope, headers: Headers) -> str:
+    """Weak ETag for a request at a data version (weak: valid across encodings)."""
+    key = "|".join([
+        current_tenant(),
+        date.today().isoformat(),
+        scope["path"],
+        scope.get("query_string", b"").decode("latin-1"),
+        headers.get("accept", ""),
+    ])
+    return f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+
+
+def add_vary(headers: MutableHeaders, name: str):
+    """Append to Vary unless already listed (MutableHeaders.add_vary_header always appends)."""
+    listed = [value.strip().lower() for value in headers.get("vary", "").split(",")]
+    if name.lower() not in listed:
+        headers.add_vary_header(name)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Compare weakly: ignore W/ prefixes
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+class TenantMiddleware:
+    """Run each request under `prefix` as its tenant (multi-tenant deployments only).
+
+    Requests without a tenant get 400, and tenants without a database get 404.
+    """
+
+    def __init__(self, app: ASGIApp, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not multi_tenant() or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        tenant = resolve_tenant(Headers(scope=scope), QueryParams(scope.get("query_string", b"")))
+        if not tenant or not valid_tenant(tenant):
+            response = JSONResponse({"detail": "Missing or invalid tenant"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        try:
+            # Opens the tenant's engines on its first request
+            await run_in_threadpool(databases.get, tenant)
+        except LookupError:
+            response = JSONResponse({"detail": "Unknown tenant"}, status_code=404)
+            await response(scope, receive, send)
+            return
+
+        with use_tenant(tenant):
+            await self.app(scope, receive, send)
+
+
+class ConditionalGetMiddleware:
+    """ETag every successful GET under `prefix` and answer matching requests with 304."""
+
+    def __init__(self, app: ASGIApp, prefix: str = "/api"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") \
+                or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        version = data_version.cached()
+        if version is None:
+            version = await run_in_threadpool(data_version.load)
+
+        request_headers = Headers(scope=scope)
+        etag = compute_etag(version, scope, request_headers)
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            response = Response(status_code=304, headers={
+                "ETag": etag,
+                "Cache-Control": CACHE_CONTROL,
+                "Vary": ", ".join(vary_headers()),
+            })
+            await response(scope, receive, send)
+            return
+
+        async def send_with_etag(message: Message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = MutableHeaders(scope=message)
+                # Event streams and responses with their own caching policy (job status) get no ETag
+                if not headers.get("content-type", "").startswith("text/event-stream") \
+                        and "cache-control" not in headers:
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = CACHE_CONTROL
+                    for name in vary_headers():
+                        add_vary(headers, name)
+            await send(message)
+
+        await self.app(scope, receive, send_with_etag)
+
+
+def accepted_encoding(accept_encoding: str):
+    """Preferred supported encoding from an Accept-Encoding header, or None."""
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(token.strip())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Brotli (when installed) or gzip for response bodies of at least `minimum_size` bytes.
+
+    Bodies are buffered until complete; event streams are passed through as they come.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", "")) \
+            if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_compressed(message: Message):
+            nonlocal start, passthrough
+
+            if message["type"] == "http.response.start":
+                start = message
+                headers = Headers(raw=start["headers"])
+                passthrough = "content-encoding" in headers \
+                    or headers.get("content-type", "").startswith("text/event-stream")
+                if passthrough:
+                    await send(start)
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(scope=start)
+            add_vary(headers, "Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -1,23 +1,39 @@
 from .customer import Customer
-from .product import Product
-from .order import Order, OrderItem
-from .campaign import Campaign, AdSpend
+from .product import Product, ProductSalesDaily, StockSnapshot
+from .order import Order, OrderKey, OrderItem, SalesHourly
+from .campaign import Campaign, AdSpend, CampaignDaily
 from .channel import Channel
 from .date import DateDimension
-from .session import Session
+from .session import (
+    Session, SessionFunnelDaily, LandingPageDaily, SessionTrafficDaily, SessionDeviceDaily, SessionGeoDaily
+)
 from .attribution import Attribution
 from .cohort import CohortMetric
+from .load import DataLoad
+from .job import Job
 
 __all__ = [
     "Customer",
     "Product",
+    "ProductSalesDaily",
+    "StockSnapshot",
     "Order",
+    "OrderKey",
     "OrderItem",
+    "SalesHourly",
     "Campaign",
     "AdSpend",
+    "CampaignDaily",
     "Channel",
     "DateDimension",
     "Session",
+    "SessionFunnelDaily",
+    "LandingPageDaily",
+    "SessionTrafficDaily",
+    "SessionDeviceDaily",
+    "SessionGeoDaily",
     "Attribution",
-    "CohortMetric"
+    "CohortMetric",
+    "DataLoad",
+    "Job"
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Integer, String, Numeric, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, BigInteger, Integer, String, Numeric, Boolean, ForeignKey, TIMESTAMP
 from sqlalchemy.sql import func
 from ..database import Base
 
@@ -7,10 +7,15 @@ class Attribution(Base):
     __tablename__ = "fct_attribution"
 
     attribution_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    order_id = Column(BigInteger, ForeignKey("fct_orders.order_id"), nullable=False)
+    # fct_orders is partitioned: no foreign key to it
+    order_id = Column(BigInteger, nullable=False)
     campaign_id = Column(BigInteger, ForeignKey("dim_campaigns.campaign_id"), nullable=True)
     channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
 
+    # Denormalized from fct_orders so marketing queries skip the join
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    is_cancelled = Column(Boolean, nullable=False, default=False)
+
     # Attribution model
     attribution_model = Column(String(50), nullable=False)
 
@@ -45,9 +45,11 @@ class Campaign(Base):
 class AdSpend(Base):
     __tablename__ = "fct_ad_spend"
 
-    spend_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
-    campaign_id = Column(BigInteger, ForeignKey("dim_campaigns.campaign_id"), nullable=False)
+    # Partitioned by date_key (schema_ecommerce.sql): MySQL's primary key is (spend_id, date_key), and no
+    # foreign keys. spend_id alone is unique, so it is the ORM key (and SQLite can autoincrement it).
+    spend_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    date_key = Column(Integer, nullable=False)
+    campaign_id = Column(BigInteger, nullable=False)
 
     # Delivery metrics
     impressions = Column(BigInteger, default=0)
@@ -73,3 +75,25 @@ class AdSpend(Base):
 
     # Control
     extracted_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class CampaignDaily(Base):
+    __tablename__ = "fct_campaign_daily"
+
+    campaign_daily_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    campaign_id = Column(BigInteger, ForeignKey("dim_campaigns.campaign_id"), nullable=False)
+    attribution_model = Column(String(50), nullable=False)
+
+    # Delivery metrics (repeated for every attribution model)
+    impressions = Column(BigInteger, nullable=False, default=0)
+    clicks = Column(BigInteger, nullable=False, default=0)
+    spend = Column(Numeric(14, 2), nullable=False, default=0)
+    conversions_platform = Column(Integer, nullable=False, default=0)
+    conversions_value_platform = Column(Numeric(14, 2), nullable=False, default=0)
+
+    # Attributed results for this model
+    attributed_revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    attributed_orders = Column(Numeric(12, 4), nullable=False, default=0)
+
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
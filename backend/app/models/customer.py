@@ -51,4 +51,8 @@ class Customer(Base):
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    orders = relationship("Order", back_populates="customer")
+    orders = relationship(
+        "Order",
+        primaryjoin="Customer.customer_id == foreign(Order.customer_id)",
+        back_populates="customer"
+    )
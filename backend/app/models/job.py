@@ -0,0 +1,36 @@
+from sqlalchemy import Column, String, Integer, Text, DateTime, LargeBinary, Index
+from sqlalchemy.dialects.mysql import LONGBLOB
+from sqlalchemy.orm import deferred
+from ..database import Base
+
+
+class Job(Base):
+    """A long-running API request executed in the background (see services/jobs.py)."""
+    __tablename__ = "api_jobs"
+
+    job_id = Column(String(32), primary_key=True)
+    tenant = Column(String(64), nullable=False)
+
+    # Route and its parameters; params_key identifies identical requests
+    endpoint = Column(String(200), nullable=False)
+    params = Column(Text)
+    params_key = Column(String(40), nullable=False)
+
+    status = Column(String(20), nullable=False)  # queued, running, done, failed
+
+    # The response: body, media type and HTTP status (or the error detail)
+    status_code = Column(Integer)
+    media_type = Column(String(100))
+    result = deferred(Column(LargeBinary().with_variant(LONGBLOB(), "mysql")))
+    error = Column(Text)
+
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # Running jobs expire after JOB_TIMEOUT_SECONDS, results after JOB_RESULT_TTL_SECONDS
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_job_lookup", "tenant", "params_key", "expires_at"),
+        Index("idx_expires", "expires_at"),
+    )
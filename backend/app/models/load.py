@@ -0,0 +1,16 @@
+from sqlalchemy import Column, BigInteger, Integer, TIMESTAMP
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class DataLoad(Base):
+    """One row per completed post-load refresh; the latest id is the data version."""
+    __tablename__ = "etl_loads"
+
+    load_id = Column(BigInteger, primary_key=True, autoincrement=True)
+
+    # Date range that was (re)loaded
+    start_date_key = Column(Integer, nullable=False)
+    end_date_key = Column(Integer, nullable=False)
+
+    loaded_at = Column(TIMESTAMP, server_default=func.now())
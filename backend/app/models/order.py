@@ -1,4 +1,7 @@
-from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Numeric, Boolean, ForeignKey, TIMESTAMP
+from sqlalchemy import (
+    Column, BigInteger, Integer, SmallInteger, String, DateTime, Numeric, Boolean, ForeignKey, TIMESTAMP,
+    UniqueConstraint
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -7,10 +10,13 @@ from ..database import Base
 class Order(Base):
     __tablename__ = "fct_orders"
 
-    order_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    external_order_id = Column(String(100), nullable=False, unique=True)
-    customer_id = Column(BigInteger, ForeignKey("dim_customers.customer_id"), nullable=False)
-    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    # Partitioned by date_key (schema_ecommerce.sql): MySQL's primary key is (order_id, date_key), and no
+    # foreign keys. order_id alone is unique, so it is the ORM key (and SQLite can autoincrement it).
+    order_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    date_key = Column(Integer, nullable=False)
+    # Unique per date_key here; globally unique through fct_order_keys (OrderKey)
+    external_order_id = Column(String(100), nullable=False)
+    customer_id = Column(BigInteger, nullable=False)
 
     # Timestamps
     order_created_at = Column(DateTime, nullable=False)
@@ -41,7 +47,7 @@ class Order(Base):
     utm_campaign = Column(String(255), nullable=True)
     utm_content = Column(String(255), nullable=True)
     utm_term = Column(String(255), nullable=True)
-    channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
+    channel_id = Column(Integer, nullable=True)
 
     # Tracking cookies
     fbc = Column(String(255), nullable=True)
@@ -58,17 +64,39 @@ class Order(Base):
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    customer = relationship("Customer", back_populates="orders")
-    items = relationship("OrderItem", back_populates="order")
+    customer = relationship(
+        "Customer",
+        primaryjoin="foreign(Order.customer_id) == Customer.customer_id",
+        back_populates="orders"
+    )
+    items = relationship(
+        "OrderItem",
+        primaryjoin="and_(Order.order_id == foreign(OrderItem.order_id), Order.date_key == foreign(OrderItem.date_key))",
+        back_populates="order"
+    )
+
+    __table_args__ = (
+        UniqueConstraint("external_order_id", "date_key", name="idx_external_order"),
+    )
+
+
+class OrderKey(Base):
+    """One row per external_order_id, kept by fct_orders' triggers (global uniqueness)."""
+    __tablename__ = "fct_order_keys"
+
+    external_order_id = Column(String(100), primary_key=True)
+    date_key = Column(Integer, nullable=False)
 
 
 class OrderItem(Base):
     __tablename__ = "fct_order_items"
 
-    order_item_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    order_id = Column(BigInteger, ForeignKey("fct_orders.order_id"), nullable=False)
-    product_id = Column(BigInteger, ForeignKey("dim_products.product_id"), nullable=False)
-    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    # Partitioned by date_key (schema_ecommerce.sql): MySQL's primary key is (order_item_id, date_key), and no
+    # foreign keys. order_item_id alone is unique, so it is the ORM key (and SQLite can autoincrement it).
+    order_item_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    date_key = Column(Integer, nullable=False)
+    order_id = Column(BigInteger, nullable=False)
+    product_id = Column(BigInteger, nullable=False)
 
     quantity = Column(Integer, nullable=False, default=1)
     unit_price = Column(Numeric(12, 2), nullable=False)
@@ -83,5 +111,31 @@ class OrderItem(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     # Relationships
-    order = relationship("Order", back_populates="items")
-    product = relationship("Product", back_populates="order_items")
+    order = relationship(
+        "Order",
+        primaryjoin="and_(Order.order_id == foreign(OrderItem.order_id), Order.date_key == foreign(OrderItem.date_key))",
+        back_populates="items"
+    )
+    product = relationship(
+        "Product",
+        primaryjoin="foreign(OrderItem.product_id) == Product.product_id",
+        back_populates="order_items"
+    )
+
+
+class SalesHourly(Base):
+    __tablename__ = "fct_sales_hourly"
+
+    sales_hourly_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    hour = Column(SmallInteger, nullable=False)
+    day_of_week = Column(SmallInteger, nullable=False)  # 0=Sunday, 6=Saturday
+    channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
+
+    # Metrics (non-cancelled orders only)
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, String, Integer, Numeric, Boolean, TIMESTAMP
+from sqlalchemy import Column, BigInteger, String, Integer, Numeric, Boolean, Date, ForeignKey, TIMESTAMP
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
@@ -31,10 +31,54 @@ class Product(Base):
     total_units_sold = Column(Integer, default=0)
     total_revenue = Column(Numeric(14, 2), default=0)
     abc_classification = Column(String(1), nullable=True)
+    abc_category_classification = Column(String(1), nullable=True)
+    abc_revenue = Column(Numeric(14, 2), nullable=True)
 
     # Control
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    order_items = relationship("OrderItem", back_populates="product")
+    order_items = relationship(
+        "OrderItem",
+        primaryjoin="Product.product_id == foreign(OrderItem.product_id)",
+        back_populates="product"
+    )
+
+
+class ProductSalesDaily(Base):
+    __tablename__ = "fct_product_sales_daily"
+
+    product_sales_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    product_id = Column(BigInteger, ForeignKey("dim_products.product_id"), nullable=False)
+
+    # Metrics (non-cancelled orders only)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+    gross_margin = Column(Numeric(14, 2), nullable=False, default=0)
+    orders = Column(Integer, nullable=False, default=0)
+
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class StockSnapshot(Base):
+    __tablename__ = "fct_stock_snapshot"
+
+    product_id = Column(BigInteger, ForeignKey("dim_products.product_id"), primary_key=True)
+    snapshot_date = Column(Date, nullable=False)
+
+    # Product attributes at snapshot time
+    product_name = Column(String(500), nullable=False)
+    category_level_1 = Column(String(200), nullable=True)
+    stock_quantity = Column(Integer, nullable=False, default=0)
+    current_price = Column(Numeric(12, 2), nullable=True)
+
+    # Velocity over the trailing window
+    units_sold = Column(Integer, nullable=False, default=0)
+    daily_velocity = Column(Numeric(12, 4), nullable=False, default=0)
+    days_of_stock = Column(Numeric(12, 1), nullable=True)  # NULL = no sales in window
+    stock_value = Column(Numeric(14, 2), nullable=False, default=0)
+    stock_status = Column(String(20), nullable=False)  # critical, low, healthy, overstock
+
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
@@ -6,19 +6,21 @@ from ..database import Base
 class Session(Base):
     __tablename__ = "fct_sessions"
 
-    session_id = Column(BigInteger, primary_key=True, autoincrement=True)
-    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    # Partitioned by date_key (schema_ecommerce.sql): MySQL's primary key is (session_id, date_key), and no
+    # foreign keys. session_id alone is unique, so it is the ORM key (and SQLite can autoincrement it).
+    session_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    date_key = Column(Integer, nullable=False)
 
     # Identifiers
     ga_session_id = Column(String(100), nullable=True)
     ga_client_id = Column(String(100), nullable=True)
-    customer_id = Column(BigInteger, ForeignKey("dim_customers.customer_id"), nullable=True)
+    customer_id = Column(BigInteger, nullable=True)
 
     # Traffic source
     source = Column(String(100), nullable=True)
     medium = Column(String(100), nullable=True)
     campaign = Column(String(255), nullable=True)
-    channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
+    channel_id = Column(Integer, nullable=True)
 
     # Landing page
     landing_page = Column(String(500), nullable=True)
@@ -48,3 +50,98 @@ class Session(Base):
     session_start_at = Column(DateTime, nullable=True)
 
     created_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class SessionFunnelDaily(Base):
+    __tablename__ = "fct_session_funnel_daily"
+
+    session_funnel_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
+    device_category = Column(String(50), nullable=True)
+
+    # Sessions reaching each funnel stage
+    sessions = Column(Integer, nullable=False, default=0)
+    add_to_cart = Column(Integer, nullable=False, default=0)
+    begin_checkout = Column(Integer, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class LandingPageDaily(Base):
+    __tablename__ = "fct_landing_page_daily"
+
+    landing_page_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    landing_page = Column(String(500), nullable=True)
+
+    # Sessions reaching each funnel stage
+    sessions = Column(Integer, nullable=False, default=0)
+    engaged_sessions = Column(Integer, nullable=False, default=0)
+    add_to_cart = Column(Integer, nullable=False, default=0)
+    begin_checkout = Column(Integer, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class SessionTrafficDaily(Base):
+    __tablename__ = "fct_session_traffic_daily"
+
+    session_traffic_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    channel_id = Column(Integer, ForeignKey("dim_channels.channel_id"), nullable=True)
+    source = Column(String(100), nullable=True)
+    medium = Column(String(100), nullable=True)
+
+    # Metrics
+    sessions = Column(Integer, nullable=False, default=0)
+    engaged_sessions = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(BigInteger, nullable=False, default=0)
+    pageviews = Column(BigInteger, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class SessionDeviceDaily(Base):
+    __tablename__ = "fct_session_device_daily"
+
+    session_device_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    device_category = Column(String(50), nullable=True)
+    browser = Column(String(100), nullable=True)
+    operating_system = Column(String(100), nullable=True)
+
+    # Metrics
+    sessions = Column(Integer, nullable=False, default=0)
+    engaged_sessions = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(BigInteger, nullable=False, default=0)
+    pageviews = Column(BigInteger, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
+
+
+class SessionGeoDaily(Base):
+    __tablename__ = "fct_session_geo_daily"
+
+    session_geo_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    date_key = Column(Integer, ForeignKey("dim_dates.date_key"), nullable=False)
+    country = Column(String(50), nullable=True)
+    region = Column(String(100), nullable=True)
+
+    # Metrics
+    sessions = Column(Integer, nullable=False, default=0)
+    engaged_sessions = Column(Integer, nullable=False, default=0)
+    duration_seconds = Column(BigInteger, nullable=False, default=0)
+    pageviews = Column(BigInteger, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+
+    # Control
+    refreshed_at = Column(TIMESTAMP, server_default=func.now())
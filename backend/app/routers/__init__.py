@@ -4,6 +4,8 @@ from .orders import router as orders_router
 from .products import router as products_router
 from .campaigns import router as campaigns_router
 from .predictions import router as predictions_router
+from .sessions import router as sessions_router
+from .jobs import router as jobs_router
 
 __all__ = [
     "dashboard_router",
@@ -11,5 +13,7 @@ __all__ = [
     "orders_router",
     "products_router",
     "campaigns_router",
-    "predictions_router"
+    "predictions_router",
+    "sessions_router",
+    "jobs_router"
 ]
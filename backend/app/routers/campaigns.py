@@ -1,260 +1,254 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from datetime import date, timedelta
+from sqlalchemy import func, and_, case, literal, null
 from decimal import Decimal
 from typing import List, Optional
 
 from ..database import get_db
-from ..models import Campaign, AdSpend, Order, Attribution, DateDimension, Channel
+from ..models import Attribution, CampaignDaily, SalesHourly
 from ..schemas.campaign import CampaignResponse, CampaignPerformance
+from ..services import dimension_cache
+from ..services.campaign_daily import ATTRIBUTION_MODELS, DEFAULT_MODEL, campaign_totals, ratio
+from ..services.coalescing import coalesce
+from ..utils.dates import from_date_key
+from ..utils.periods import Window, resolve_period
+from ..utils.responses import table_response, response_layout
 
 router = APIRouter(prefix="/marketing", tags=["Marketing"])
 
+CAMPAIGN_PERFORMANCE_COLUMNS = [
+    "campaign_id", "platform", "campaign_name", "funnel_stage", "campaign_type",
+    "impressions", "clicks", "spend", "conversions", "revenue",
+    "roas", "cpa", "ctr", "cpc"
+]
 
-def get_date_range(period: str) -> tuple[date, date]:
-    end_date = date.today()
-    if period == "7d":
-        start_date = end_date - timedelta(days=7)
-    elif period == "30d":
-        start_date = end_date - timedelta(days=30)
-    elif period == "60d":
-        start_date = end_date - timedelta(days=60)
-    elif period == "90d":
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    return start_date, end_date
+SPEND_REVENUE_COLUMNS = ["date", "spend", "revenue", "roas"]
+
+
+def validate_model(model: Optional[str]):
+    if model and model not in ATTRIBUTION_MODELS:
+        raise HTTPException(status_code=400, detail=f"Invalid attribution model: {model}")
+
+
+def campaign_groups(db: Session, window: Window, model: str, attribute: str):
+    """Campaign totals rolled up by a cached campaign attribute (platform, funnel stage).
+
+    Totals are aggregated on bare campaign ids; each group is the set of ids
+    the dimension cache holds for one attribute value.
+    """
+    perf = campaign_totals(window, model).subquery()
+
+    ids_by_value = {}
+    for campaign_id, campaign in dimension_cache.campaigns.get(db).items():
+        value = getattr(campaign, attribute)
+        if value is not None:
+            ids_by_value.setdefault(value, []).append(campaign_id)
+    whens = [(perf.c.campaign_id.in_(ids), literal(value)) for value, ids in ids_by_value.items()]
+    group = case(*whens, else_=null()) if whens else null()
+
+    totals = db.query(
+        group.label("group"),
+        func.count(perf.c.campaign_id).label("campaigns"),
+        func.sum(perf.c.impressions).label("impressions"),
+        func.sum(perf.c.clicks).label("clicks"),
+        func.sum(perf.c.spend).label("spend"),
+        func.sum(perf.c.revenue).label("revenue"),
+        func.sum(perf.c.orders).label("orders")
+    ).filter(
+        perf.c.spend > 0
+    ).group_by(group).subquery()
+
+    return db.query(
+        totals,
+        ratio(totals.c.revenue, totals.c.spend).label("roas"),
+        ratio(totals.c.spend, totals.c.orders).label("cpa"),
+        ratio(totals.c.clicks, totals.c.impressions, 100.0).label("ctr")
+    ).all()
 
 
 @router.get("/campaign-performance")
 def get_campaign_performance(
     period: str = Query("30d"),
     platform: Optional[str] = None,
+    model: str = Query(DEFAULT_MODEL, description="Attribution model"),
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get performance metrics for all campaigns."""
-    start_date, end_date = get_date_range(period)
+    validate_model(model)
+
+    window = resolve_period(period)
+
+    perf = campaign_totals(window, model).subquery()
 
-    # Base query
     query = db.query(
-        Campaign.campaign_id,
-        Campaign.platform,
-        Campaign.campaign_name,
-        Campaign.funnel_stage,
-        Campaign.campaign_type,
-        func.sum(AdSpend.impressions).label("impressions"),
-        func.sum(AdSpend.clicks).label("clicks"),
-        func.sum(AdSpend.spend).label("spend"),
-        func.sum(AdSpend.conversions_platform).label("conversions")
-    ).join(
-        AdSpend, Campaign.campaign_id == AdSpend.campaign_id
-    ).join(
-        DateDimension, AdSpend.date_key == DateDimension.date_key
+        perf.c.campaign_id,
+        perf.c.impressions,
+        perf.c.clicks,
+        perf.c.spend,
+        perf.c.conversions,
+        perf.c.revenue,
+        ratio(perf.c.revenue, perf.c.spend).label("roas"),
+        ratio(perf.c.spend, perf.c.orders).label("cpa"),
+        ratio(perf.c.clicks, perf.c.impressions, 100.0).label("ctr"),
+        ratio(perf.c.spend, perf.c.clicks).label("cpc")
     ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date
+        perf.c.spend > 0
     )
 
     if platform:
-        query = query.filter(Campaign.platform == platform)
+        query = query.filter(perf.c.campaign_id.in_(dimension_cache.campaigns.ids_where(db, platform=platform)))
 
-    results = query.group_by(
-        Campaign.campaign_id,
-        Campaign.platform,
-        Campaign.campaign_name,
-        Campaign.funnel_stage,
-        Campaign.campaign_type
-    ).order_by(func.sum(AdSpend.spend).desc()).all()
-
-    # Get attributed revenue per campaign
-    attribution_data = db.query(
-        Attribution.campaign_id,
-        func.sum(Attribution.attributed_revenue).label("revenue"),
-        func.sum(Attribution.attributed_orders).label("orders")
-    ).join(
-        Order, Attribution.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Attribution.attribution_model == "last_click"
-    ).group_by(Attribution.campaign_id).all()
-
-    revenue_map = {a.campaign_id: (float(a.revenue or 0), float(a.orders or 0)) for a in attribution_data}
+    results = query.order_by(perf.c.spend.desc()).all()
+    campaign_rows = dimension_cache.campaigns.get(db)
 
-    campaigns = []
+    rows = []
     for r in results:
-        spend = float(r.spend or 0)
-        impressions = r.impressions or 0
-        clicks = r.clicks or 0
-        revenue, orders = revenue_map.get(r.campaign_id, (0, 0))
-
-        campaigns.append({
-            "campaign_id": r.campaign_id,
-            "platform": r.platform,
-            "campaign_name": r.campaign_name,
-            "funnel_stage": r.funnel_stage,
-            "campaign_type": r.campaign_type,
-            "impressions": impressions,
-            "clicks": clicks,
-            "spend": spend,
-            "conversions": r.conversions or 0,
-            "revenue": revenue,
-            "roas": round(revenue / spend, 2) if spend > 0 else None,
-            "cpa": round(spend / orders, 2) if orders > 0 else None,
-            "ctr": round((clicks / impressions * 100), 2) if impressions > 0 else None,
-            "cpc": round(spend / float(clicks), 2) if clicks > 0 else None
-        })
-
-    return campaigns
+        campaign = campaign_rows.get(r.campaign_id)
+        rows.append((
+            r.campaign_id,
+            campaign.platform if campaign else None,
+            campaign.campaign_name if campaign else None,
+            campaign.funnel_stage if campaign else None,
+            campaign.campaign_type if campaign else None,
+            r.impressions or 0,
+            r.clicks or 0,
+            r.spend or 0,
+            r.conversions or 0,
+            r.revenue or 0,
+            r.roas,
+            r.cpa,
+            r.ctr,
+            r.cpc
+        ))
+
+    return table_response(CAMPAIGN_PERFORMANCE_COLUMNS, rows, layout)
 
 
 @router.get("/roas-by-platform")
 def get_roas_by_platform(
     period: str = Query("30d"),
+    model: str = Query(DEFAULT_MODEL, description="Attribution model"),
     db: Session = Depends(get_db)
 ):
     """Get ROAS breakdown by platform."""
-    start_date, end_date = get_date_range(period)
+    validate_model(model)
 
-    # Get spend by platform
-    spend_data = db.query(
-        Campaign.platform,
-        func.count(func.distinct(Campaign.campaign_id)).label("campaigns"),
-        func.sum(AdSpend.impressions).label("impressions"),
-        func.sum(AdSpend.clicks).label("clicks"),
-        func.sum(AdSpend.spend).label("spend"),
-        func.sum(AdSpend.conversions_platform).label("conversions")
-    ).join(
-        AdSpend, Campaign.campaign_id == AdSpend.campaign_id
-    ).join(
-        DateDimension, AdSpend.date_key == DateDimension.date_key
-    ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date
-    ).group_by(Campaign.platform).all()
+    window = resolve_period(period)
 
-    # Get revenue by platform
-    revenue_data = db.query(
-        Campaign.platform,
-        func.sum(Attribution.attributed_revenue).label("revenue"),
-        func.sum(Attribution.attributed_orders).label("orders")
-    ).join(
-        Attribution, Campaign.campaign_id == Attribution.campaign_id
-    ).join(
-        Order, Attribution.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Attribution.attribution_model == "last_click"
-    ).group_by(Campaign.platform).all()
-
-    revenue_map = {r.platform: (float(r.revenue or 0), float(r.orders or 0)) for r in revenue_data}
-
-    platforms = []
-    for r in spend_data:
-        spend = float(r.spend or 0)
-        revenue, orders = revenue_map.get(r.platform, (0, 0))
-
-        platforms.append({
-            "platform": r.platform,
-            "campaigns": r.campaigns,
-            "spend": spend,
-            "revenue": revenue,
-            "roas": round(revenue / spend, 2) if spend > 0 else None,
-            "conversions": int(orders),
-            "cpa": round(spend / orders, 2) if orders > 0 else None,
-            "impressions": r.impressions or 0,
-            "clicks": r.clicks or 0,
-            "ctr": round((r.clicks or 0) / (r.impressions or 1) * 100, 2)
-        })
-
-    return platforms
+    return [
+        {
+            "platform": g.group,
+            "campaigns": g.campaigns,
+            "spend": float(g.spend or 0),
+            "revenue": float(g.revenue or 0),
+            "roas": g.roas,
+            "conversions": int(g.orders or 0),
+            "cpa": g.cpa,
+            "impressions": int(g.impressions or 0),
+            "clicks": int(g.clicks or 0),
+            "ctr": g.ctr or 0
+        }
+        for g in campaign_groups(db, window, model, "platform")
+    ]
 
 
 @router.get("/spend-revenue")
 def get_spend_revenue_trend(
     period: str = Query("30d"),
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get daily spend vs revenue trend."""
-    start_date, end_date = get_date_range(period)
+    window = resolve_period(period)
 
-    # Get daily spend
+    # Spend is repeated on every model row, so read a single model
     spend_data = db.query(
-        DateDimension.full_date,
-        func.sum(AdSpend.spend).label("spend")
-    ).join(
-        AdSpend, DateDimension.date_key == AdSpend.date_key
+        CampaignDaily.date_key,
+        func.sum(CampaignDaily.spend).label("spend")
     ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date
-    ).group_by(DateDimension.full_date).all()
+        CampaignDaily.attribution_model == DEFAULT_MODEL,
+        CampaignDaily.date_key >= window.start_key,
+        CampaignDaily.date_key < window.end_key
+    ).group_by(CampaignDaily.date_key).all()
 
-    spend_map = {str(r.full_date): float(r.spend or 0) for r in spend_data}
+    spend_map = {r.date_key: float(r.spend or 0) for r in spend_data}
 
-    # Get daily revenue
     revenue_data = db.query(
-        DateDimension.full_date,
-        func.sum(Order.total_amount).label("revenue")
-    ).join(
-        Order, DateDimension.date_key == Order.date_key
+        SalesHourly.date_key,
+        func.sum(SalesHourly.revenue).label("revenue")
     ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date,
-        Order.order_status != "cancelled"
-    ).group_by(DateDimension.full_date).all()
+        SalesHourly.date_key >= window.start_key,
+        SalesHourly.date_key < window.end_key
+    ).group_by(SalesHourly.date_key).all()
 
-    revenue_map = {str(r.full_date): float(r.revenue or 0) for r in revenue_data}
+    revenue_map = {r.date_key: float(r.revenue or 0) for r in revenue_data}
 
     # Combine data
     all_dates = sorted(set(spend_map.keys()) | set(revenue_map.keys()))
 
-    return [
-        {
-            "date": d,
-            "spend": spend_map.get(d, 0),
-            "revenue": revenue_map.get(d, 0),
-            "roas": round(revenue_map.get(d, 0) / spend_map.get(d, 1), 2) if spend_map.get(d, 0) > 0 else None
-        }
-        for d in all_dates
-    ]
+    return table_response(
+        SPEND_REVENUE_COLUMNS,
+        [
+            (
+                from_date_key(d),
+                spend_map.get(d, 0),
+                revenue_map.get(d, 0),
+                round(revenue_map.get(d, 0) / spend_map[d], 2) if spend_map.get(d, 0) > 0 else None
+            )
+            for d in all_dates
+        ],
+        layout
+    )
 
 
 @router.get("/attribution")
+@coalesce
 def get_attribution_analysis(
     period: str = Query("30d"),
+    model: Optional[str] = Query(None, description="Attribution model (all models if omitted)"),
     db: Session = Depends(get_db)
 ):
     """Get attribution analysis by channel."""
-    start_date, end_date = get_date_range(period)
+    validate_model(model)
+
+    window = resolve_period(period)
 
-    results = db.query(
-        Channel.channel_name,
+    query = db.query(
+        Attribution.channel_id,
         Attribution.attribution_model,
         func.sum(Attribution.attributed_revenue).label("revenue"),
         func.sum(Attribution.attributed_orders).label("orders")
-    ).join(
-        Attribution, Channel.channel_id == Attribution.channel_id
-    ).join(
-        Order, Attribution.order_id == Order.order_id
     ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date
-    ).group_by(
-        Channel.channel_name,
+        Attribution.date_key >= window.start_key,
+        Attribution.date_key < window.end_key,
+        Attribution.is_cancelled == False,
+        Attribution.channel_id.isnot(None)
+    )
+
+    if model:
+        query = query.filter(Attribution.attribution_model == model)
+
+    results = query.group_by(
+        Attribution.channel_id,
         Attribution.attribution_model
     ).all()
 
-    total_revenue = sum(float(r.revenue or 0) for r in results)
+    channel_rows = dimension_cache.channels.get(db)
+
+    # Each model distributes the same revenue, so shares are per model
+    model_totals = {}
+    for r in results:
+        model_totals[r.attribution_model] = model_totals.get(r.attribution_model, 0) + float(r.revenue or 0)
 
     return [
         {
-            "channel": r.channel_name,
+            "channel": channel_rows[r.channel_id].channel_name if r.channel_id in channel_rows else None,
             "model": r.attribution_model,
             "attributed_revenue": float(r.revenue or 0),
             "attributed_orders": float(r.orders or 0),
-            "percentage": round((float(r.revenue or 0) / total_revenue * 100), 2) if total_revenue > 0 else 0
+            "percentage": round((float(r.revenue or 0) / model_totals[r.attribution_model] * 100), 2)
+            if model_totals[r.attribution_model] > 0 else 0
         }
         for r in results
     ]
@@ -263,60 +257,29 @@ def get_attribution_analysis(
 @router.get("/funnel-performance")
 def get_funnel_performance(
     period: str = Query("30d"),
+    model: str = Query(DEFAULT_MODEL, description="Attribution model"),
     db: Session = Depends(get_db)
 ):
     """Get performance by funnel stage."""
-    start_date, end_date = get_date_range(period)
-
-    # Get spend by funnel stage
-    spend_data = db.query(
-        Campaign.funnel_stage,
-        func.sum(AdSpend.spend).label("spend"),
-        func.sum(AdSpend.impressions).label("impressions"),
-        func.sum(AdSpend.clicks).label("clicks")
-    ).join(
-        AdSpend, Campaign.campaign_id == AdSpend.campaign_id
-    ).join(
-        DateDimension, AdSpend.date_key == DateDimension.date_key
-    ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date
-    ).group_by(Campaign.funnel_stage).all()
-
-    # Get revenue by funnel stage
-    revenue_data = db.query(
-        Campaign.funnel_stage,
-        func.sum(Attribution.attributed_revenue).label("revenue"),
-        func.sum(Attribution.attributed_orders).label("orders")
-    ).join(
-        Attribution, Campaign.campaign_id == Attribution.campaign_id
-    ).join(
-        Order, Attribution.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Attribution.attribution_model == "last_click"
-    ).group_by(Campaign.funnel_stage).all()
+    validate_model(model)
 
-    revenue_map = {r.funnel_stage: (float(r.revenue or 0), float(r.orders or 0)) for r in revenue_data}
+    window = resolve_period(period)
 
     funnel_order = {"TOFU": 1, "MOFU": 2, "BOFU": 3}
 
-    stages = []
-    for r in spend_data:
-        spend = float(r.spend or 0)
-        revenue, orders = revenue_map.get(r.funnel_stage, (0, 0))
-
-        stages.append({
-            "funnel_stage": r.funnel_stage,
-            "order": funnel_order.get(r.funnel_stage, 99),
-            "spend": spend,
-            "impressions": r.impressions or 0,
-            "clicks": r.clicks or 0,
-            "revenue": revenue,
-            "conversions": int(orders),
-            "roas": round(revenue / spend, 2) if spend > 0 else None,
-            "cpa": round(spend / orders, 2) if orders > 0 else None
-        })
+    stages = [
+        {
+            "funnel_stage": g.group,
+            "order": funnel_order.get(g.group, 99),
+            "spend": float(g.spend or 0),
+            "impressions": int(g.impressions or 0),
+            "clicks": int(g.clicks or 0),
+            "revenue": float(g.revenue or 0),
+            "conversions": int(g.orders or 0),
+            "roas": g.roas,
+            "cpa": g.cpa
+        }
+        for g in campaign_groups(db, window, model, "funnel_stage")
+    ]
 
     return sorted(stages, key=lambda x: x["order"])
@@ -8,9 +8,21 @@ from typing import List, Optional
 from ..database import get_db
 from ..models import Customer, Order, Channel
 from ..schemas.customer import CustomerResponse, CustomerList, RFMSegment
+from ..services.coalescing import coalesce
+from ..services.jobs import background_job
+from ..utils.dates import add_months
+from ..utils.periods import Window, month_window
+from ..utils.responses import fast_response, table_response, response_layout
 
 router = APIRouter(prefix="/customers", tags=["Customers"])
 
+CUSTOMER_COLUMNS = list(CustomerResponse.model_fields)
+
+COHORT_COLUMNS = [
+    "cohort_month", "months_since_acquisition", "cohort_size",
+    "active_customers", "revenue", "retention_rate", "ltv"
+]
+
 
 @router.get("/list", response_model=CustomerList)
 def get_customers(
@@ -19,6 +31,7 @@ def get_customers(
     segment: Optional[str] = None,
     channel: Optional[str] = None,
     search: Optional[str] = None,
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get paginated list of customers with filters."""
@@ -35,12 +48,17 @@ def get_customers(
         )
 
     total = query.count()
-    customers = query.order_by(
+    rows = query.with_entities(
+        *[getattr(Customer, column) for column in CUSTOMER_COLUMNS]
+    ).order_by(
         Customer.total_revenue.desc()
     ).offset((page - 1) * limit).limit(limit).all()
 
-    return CustomerList(
-        items=[CustomerResponse.model_validate(c) for c in customers],
+    # Columns come straight from dim_customers, so rows skip per-row CustomerResponse validation
+    return table_response(
+        CUSTOMER_COLUMNS,
+        [tuple(r) for r in rows],
+        layout,
         total=total,
         page=page,
         limit=limit,
@@ -67,7 +85,7 @@ def get_rfm_segments(
 
     total_customers = sum(r.count for r in results)
 
-    return [
+    return fast_response([
         RFMSegment(
             segment=r.rfm_segment,
             count=r.count,
@@ -77,11 +95,23 @@ def get_rfm_segments(
             avg_revenue=Decimal(r.avg_revenue or 0).quantize(Decimal("0.01"))
         )
         for r in results
-    ]
+    ])
+
+
+def cohort_offset_keys(month: Window, offset: int) -> tuple:
+    """date_key bounds holding every order placed `offset` months after a first order in `month`.
+
+    TIMESTAMPDIFF alone cannot prune fct_orders partitions; these bounds can.
+    """
+    first = add_months(month.start_key // 100, offset)
+    return first * 100 + 1, add_months(first, 2) * 100 + 1
 
 
 @router.get("/cohort-analysis")
+@background_job
+@coalesce
 def get_cohort_analysis(
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get cohort analysis data."""
@@ -102,16 +132,22 @@ def get_cohort_analysis(
 
     for cohort in cohorts:
         cohort_month = cohort.cohort_month
+        month = month_window(cohort_month)
 
         # For each month since acquisition, get metrics
         for month_offset in range(12):
+            offset_start, offset_end = cohort_offset_keys(month, month_offset)
+
             # Count active customers in this period
             active = db.query(
                 func.count(func.distinct(Order.customer_id))
             ).join(
                 Customer, Order.customer_id == Customer.customer_id
             ).filter(
-                func.date_format(Customer.first_order_date, '%Y-%m') == cohort_month,
+                Customer.first_order_date >= month.start,
+                Customer.first_order_date <= month.end,
+                Order.date_key >= offset_start,
+                Order.date_key < offset_end,
                 func.timestampdiff(
                     text("MONTH"),
                     Customer.first_order_date,
@@ -126,7 +162,10 @@ def get_cohort_analysis(
             ).join(
                 Customer, Order.customer_id == Customer.customer_id
             ).filter(
-                func.date_format(Customer.first_order_date, '%Y-%m') == cohort_month,
+                Customer.first_order_date >= month.start,
+                Customer.first_order_date <= month.end,
+                Order.date_key >= offset_start,
+                Order.date_key < offset_end,
                 func.timestampdiff(
                     text("MONTH"),
                     Customer.first_order_date,
@@ -137,20 +176,21 @@ def get_cohort_analysis(
 
             retention_rate = (active / cohort.cohort_size * 100) if cohort.cohort_size > 0 else 0
 
-            cohort_data.append({
-                "cohort_month": cohort_month,
-                "months_since_acquisition": month_offset,
-                "cohort_size": cohort.cohort_size,
-                "active_customers": active,
-                "revenue": float(revenue),
-                "retention_rate": round(retention_rate, 2),
-                "ltv": round(float(revenue) / cohort.cohort_size, 2) if cohort.cohort_size > 0 else 0
-            })
+            cohort_data.append((
+                cohort_month,
+                month_offset,
+                cohort.cohort_size,
+                active,
+                float(revenue),
+                round(retention_rate, 2),
+                round(float(revenue) / cohort.cohort_size, 2) if cohort.cohort_size > 0 else 0
+            ))
 
-    return cohort_data
+    return table_response(COHORT_COLUMNS, cohort_data, layout)
 
 
 @router.get("/ltv-by-cohort")
+@coalesce
 def get_ltv_by_cohort(
     db: Session = Depends(get_db)
 ):
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from ..services.jobs import find_job, job_events, job_response, result_response
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    """Get a background job's status (poll until `done` or `failed`)."""
+    return job_response(find_job(job_id))
+
+
+@router.get("/{job_id}/result")
+def get_job_result(job_id: str):
+    """Get a finished job's response; 202 with its status while it runs."""
+    return result_response(find_job(job_id))
+
+
+@router.get("/{job_id}/events")
+async def stream_job(request: Request, job_id: str):
+    """Stream a job's status changes as Server-Sent Events, ending when it finishes."""
+    await run_in_threadpool(find_job, job_id)
+
+    return StreamingResponse(
+        job_events(request, job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,34 +1,20 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, extract
-from datetime import date, timedelta
+from sqlalchemy import func, case
+from datetime import date
 from decimal import Decimal
 from typing import List, Optional
 
 from ..database import get_db
-from ..models import Order, OrderItem, Customer, Channel, DateDimension
+from ..models import Order, OrderItem, Customer, SalesHourly, SessionFunnelDaily, LandingPageDaily
+from ..services import dimension_cache, snapshots
+from ..utils.dates import from_date_key
+from ..utils.periods import resolve_period
+from ..utils.responses import table_response, response_layout
 
 router = APIRouter(prefix="/sales", tags=["Sales"])
 
 
-def get_date_range(period: str) -> tuple[date, date]:
-    """Get date range based on period string."""
-    end_date = date.today()
-    if period == "7d":
-        start_date = end_date - timedelta(days=7)
-    elif period == "30d":
-        start_date = end_date - timedelta(days=30)
-    elif period == "60d":
-        start_date = end_date - timedelta(days=60)
-    elif period == "90d":
-        start_date = end_date - timedelta(days=90)
-    elif period == "1y":
-        start_date = end_date - timedelta(days=365)
-    else:
-        start_date = end_date - timedelta(days=30)
-    return start_date, end_date
-
-
 @router.get("/overview")
 def get_sales_overview(
     start_date: Optional[date] = None,
@@ -37,12 +23,8 @@ def get_sales_overview(
     db: Session = Depends(get_db)
 ):
     """Get sales overview with comparison."""
-    if not start_date or not end_date:
-        start_date, end_date = get_date_range(period)
-
-    period_days = (end_date - start_date).days
-    prev_start = start_date - timedelta(days=period_days)
-    prev_end = start_date
+    window = resolve_period(period, start_date, end_date)
+    prev_window = window.previous()
 
     # Current period
     current = db.query(
@@ -52,8 +34,8 @@ def get_sales_overview(
         func.avg(Order.total_amount).label("aov"),
         func.sum(Order.total_quantity).label("units")
     ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
+        Order.date_key >= window.start_key,
+        Order.date_key < window.end_key,
         Order.order_status != "cancelled"
     ).first()
 
@@ -64,8 +46,8 @@ def get_sales_overview(
         func.count(func.distinct(Order.customer_id)).label("customers"),
         func.avg(Order.total_amount).label("aov")
     ).filter(
-        Order.order_created_at >= prev_start,
-        Order.order_created_at < start_date,
+        Order.date_key >= prev_window.start_key,
+        Order.date_key < prev_window.end_key,
         Order.order_status != "cancelled"
     ).first()
 
@@ -76,8 +58,8 @@ def get_sales_overview(
 
     return {
         "period": {
-            "start": start_date.isoformat(),
-            "end": end_date.isoformat()
+            "start": window.start.isoformat(),
+            "end": window.end.isoformat()
         },
         "current": {
             "orders": current.orders or 0,
@@ -107,33 +89,32 @@ def get_sales_by_channel(
     db: Session = Depends(get_db)
 ):
     """Get sales breakdown by channel."""
-    start_date, end_date = get_date_range(period)
+    window = resolve_period(period)
 
     results = db.query(
-        Channel.channel_name,
-        Channel.is_paid,
+        Order.channel_id,
         func.count(Order.order_id).label("orders"),
         func.sum(Order.total_amount).label("revenue"),
         func.count(func.distinct(Order.customer_id)).label("customers"),
         func.avg(Order.total_amount).label("aov")
-    ).join(
-        Order, Channel.channel_id == Order.channel_id
     ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
+        Order.date_key >= window.start_key,
+        Order.date_key < window.end_key,
+        Order.order_status != "cancelled",
+        Order.channel_id.isnot(None)
     ).group_by(
-        Channel.channel_id, Channel.channel_name, Channel.is_paid
+        Order.channel_id
     ).order_by(
         func.sum(Order.total_amount).desc()
     ).all()
 
+    channel_rows = dimension_cache.channels.get(db)
     total_revenue = sum(float(r.revenue or 0) for r in results)
 
     return [
         {
-            "channel": r.channel_name,
-            "is_paid": r.is_paid,
+            "channel": channel_rows[r.channel_id].channel_name if r.channel_id in channel_rows else None,
+            "is_paid": channel_rows[r.channel_id].is_paid if r.channel_id in channel_rows else None,
             "orders": r.orders,
             "revenue": float(r.revenue or 0),
             "customers": r.customers,
@@ -144,136 +125,280 @@ def get_sales_by_channel(
     ]
 
 
+SALES_PERIOD_COLUMNS = ["period", "orders", "revenue", "customers", "aov"]
+
+
 @router.get("/by-period")
 def get_sales_by_period(
     groupby: str = Query("day", description="day, week, month"),
     period: str = Query("30d"),
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get sales aggregated by time period."""
-    start_date, end_date = get_date_range(period)
+    window = resolve_period(period)
+
+    # Buckets are computed on the fact itself; periods are labelled by their first day with sales
+    results = sales_by_period_snapshot(window, groupby)
+    if results is not None:
+        return sales_period_response(results, layout)
 
     if groupby == "day":
-        group_expr = DateDimension.full_date
-        label_expr = DateDimension.full_date
+        group_expr = Order.date_key
     elif groupby == "week":
-        group_expr = func.yearweek(DateDimension.full_date)
-        label_expr = func.min(DateDimension.full_date)
+        group_expr = func.yearweek(Order.order_created_at)
     else:  # month
-        group_expr = func.date_format(DateDimension.full_date, '%Y-%m')
-        label_expr = func.min(DateDimension.full_date)
+        group_expr = func.floor(Order.date_key / 100)
 
     results = db.query(
-        label_expr.label("period"),
+        func.min(Order.date_key).label("period"),
         func.count(Order.order_id).label("orders"),
         func.sum(Order.total_amount).label("revenue"),
         func.count(func.distinct(Order.customer_id)).label("customers"),
         func.avg(Order.total_amount).label("aov")
-    ).join(
-        DateDimension, Order.date_key == DateDimension.date_key
     ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date,
+        Order.date_key >= window.start_key,
+        Order.date_key < window.end_key,
         Order.order_status != "cancelled"
     ).group_by(
         group_expr
     ).order_by(
-        label_expr
+        func.min(Order.date_key)
     ).all()
 
-    return [
-        {
-            "period": r.period.isoformat() if hasattr(r.period, 'isoformat') else str(r.period),
-            "orders": r.orders,
-            "revenue": float(r.revenue or 0),
-            "customers": r.customers,
-            "aov": round(float(r.aov or 0), 2)
-        }
-        for r in results
+    return sales_period_response(results, layout)
+
+
+# DuckDB equivalents of the buckets above; MySQL YEARWEEK() weeks start on Sunday
+SNAPSHOT_PERIOD_BUCKETS = {
+    "day": "date_key",
+    "week": "date_trunc('week', order_created_at + INTERVAL 1 DAY)",
+    "month": "date_key // 100",
+}
+
+
+def sales_by_period_snapshot(window, groupby: str):
+    condition, params = snapshots.month_filter(window)
+    bucket = SNAPSHOT_PERIOD_BUCKETS.get(groupby, SNAPSHOT_PERIOD_BUCKETS["month"])
+    return snapshots.fetch(["fct_orders"], window, f"""
+        SELECT MIN(date_key) AS period, COUNT(order_id) AS orders, SUM(total_amount) AS revenue,
+               COUNT(DISTINCT customer_id) AS customers, AVG(total_amount) AS aov
+        FROM fct_orders
+        WHERE {condition} AND order_status <> 'cancelled'
+        GROUP BY {bucket}
+        ORDER BY MIN(date_key)
+    """, params)
+
+
+def sales_period_response(results, layout: str):
+    return table_response(
+        SALES_PERIOD_COLUMNS,
+        [
+            (from_date_key(r.period), r.orders, r.revenue or 0, r.customers, round(float(r.aov or 0), 2))
+            for r in results
+        ],
+        layout
+    )
+
+
+FUNNEL_BREAKDOWNS = ["channel", "device", "landing_page"]
+
+
+def funnel_stages(sessions: int, add_to_cart: int, begin_checkout: int, purchases: int) -> list:
+    """Build the funnel stages with share of sessions and step conversion."""
+    stages = [
+        ("Sessions", sessions),
+        ("Add to Cart", add_to_cart),
+        ("Begin Checkout", begin_checkout),
+        ("Purchase", purchases)
     ]
 
+    funnel = []
+    previous = None
+    for stage, count in stages:
+        funnel.append({
+            "stage": stage,
+            "count": count,
+            "percentage": round((count / sessions * 100), 2) if sessions > 0 else 0,
+            "conversion_rate": None if previous is None else (
+                round((count / previous * 100), 2) if previous > 0 else 0
+            )
+        })
+        previous = count
+    return funnel
+
 
 @router.get("/funnel")
 def get_sales_funnel(
     period: str = Query("30d"),
+    channel_id: Optional[int] = None,
+    device: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get conversion funnel data."""
-    start_date, end_date = get_date_range(period)
-
-    # This would typically come from GA4 sessions data
-    # For demo, we'll calculate based on orders
-
-    total_sessions = 50000  # Mock data
-    add_to_cart = 15000
-    begin_checkout = 8000
-    purchase = db.query(func.count(Order.order_id)).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
-    ).scalar() or 0
+    """Get conversion funnel data from the daily session funnel rollup."""
+    window = resolve_period(period)
+
+    query = db.query(
+        func.sum(SessionFunnelDaily.sessions).label("sessions"),
+        func.sum(SessionFunnelDaily.add_to_cart).label("add_to_cart"),
+        func.sum(SessionFunnelDaily.begin_checkout).label("begin_checkout"),
+        func.sum(SessionFunnelDaily.purchases).label("purchases")
+    ).filter(
+        SessionFunnelDaily.date_key >= window.start_key,
+        SessionFunnelDaily.date_key < window.end_key
+    )
 
-    return [
-        {
-            "stage": "Sessions",
-            "count": total_sessions,
-            "percentage": 100,
-            "conversion_rate": None
-        },
-        {
-            "stage": "Add to Cart",
-            "count": add_to_cart,
-            "percentage": round((add_to_cart / total_sessions * 100), 2),
-            "conversion_rate": round((add_to_cart / total_sessions * 100), 2)
-        },
-        {
-            "stage": "Begin Checkout",
-            "count": begin_checkout,
-            "percentage": round((begin_checkout / total_sessions * 100), 2),
-            "conversion_rate": round((begin_checkout / add_to_cart * 100), 2)
-        },
-        {
-            "stage": "Purchase",
-            "count": purchase,
-            "percentage": round((purchase / total_sessions * 100), 2),
-            "conversion_rate": round((purchase / begin_checkout * 100), 2)
-        }
-    ]
+    if channel_id is not None:
+        query = query.filter(SessionFunnelDaily.channel_id == channel_id)
+    if device:
+        query = query.filter(SessionFunnelDaily.device_category == device)
 
+    totals = query.one()
 
-@router.get("/heatmap")
-def get_sales_heatmap(
+    return funnel_stages(
+        int(totals.sessions or 0),
+        int(totals.add_to_cart or 0),
+        int(totals.begin_checkout or 0),
+        int(totals.purchases or 0)
+    )
+
+
+@router.get("/funnel/breakdown")
+def get_funnel_breakdown(
     period: str = Query("30d"),
+    dimension: str = Query("channel", description="channel, device or landing_page"),
+    limit: int = Query(20, ge=1, le=100),
     db: Session = Depends(get_db)
 ):
-    """Get sales heatmap by day of week and hour."""
-    start_date, end_date = get_date_range(period)
+    """Get funnel stage counts and conversion rates by channel, device or landing page."""
+    if dimension not in FUNNEL_BREAKDOWNS:
+        raise HTTPException(status_code=400, detail=f"Invalid dimension: {dimension}")
+
+    window = resolve_period(period)
 
+    rollup = LandingPageDaily if dimension == "landing_page" else SessionFunnelDaily
+    group_column = {
+        "channel": SessionFunnelDaily.channel_id,
+        "device": SessionFunnelDaily.device_category,
+        "landing_page": LandingPageDaily.landing_page
+    }[dimension]
+
+    sessions = func.sum(rollup.sessions)
     results = db.query(
-        extract('dow', Order.order_created_at).label("day_of_week"),
-        extract('hour', Order.order_created_at).label("hour"),
-        func.count(Order.order_id).label("orders"),
-        func.sum(Order.total_amount).label("revenue")
+        group_column.label("key"),
+        sessions.label("sessions"),
+        func.sum(rollup.add_to_cart).label("add_to_cart"),
+        func.sum(rollup.begin_checkout).label("begin_checkout"),
+        func.sum(rollup.purchases).label("purchases")
     ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
+        rollup.date_key >= window.start_key,
+        rollup.date_key < window.end_key
     ).group_by(
-        extract('dow', Order.order_created_at),
-        extract('hour', Order.order_created_at)
+        group_column
+    ).order_by(
+        sessions.desc()
+    ).limit(limit).all()
+
+    labels = {}
+    if dimension == "channel":
+        labels = {
+            channel_id: row.channel_name
+            for channel_id, row in dimension_cache.channels.get(db).items()
+        }
+
+    breakdown = []
+    for r in results:
+        sessions_count = int(r.sessions or 0)
+        purchases = int(r.purchases or 0)
+        breakdown.append({
+            "key": r.key,
+            "label": labels.get(r.key, r.key) if dimension == "channel" else r.key,
+            "sessions": sessions_count,
+            "add_to_cart": int(r.add_to_cart or 0),
+            "begin_checkout": int(r.begin_checkout or 0),
+            "purchases": purchases,
+            "conversion_rate": round((purchases / sessions_count * 100), 2) if sessions_count > 0 else 0,
+            "stages": funnel_stages(
+                sessions_count, int(r.add_to_cart or 0), int(r.begin_checkout or 0), purchases
+            )
+        })
+
+    return {"dimension": dimension, "items": breakdown}
+
+
+@router.get("/heatmap")
+def get_sales_heatmap(
+    period: str = Query("30d"),
+    channel_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get sales heatmap by day of week (0=Sunday) and hour."""
+    window = resolve_period(period)
+
+    query = db.query(
+        SalesHourly.day_of_week,
+        SalesHourly.hour,
+        func.sum(SalesHourly.orders).label("orders"),
+        func.sum(SalesHourly.revenue).label("revenue")
+    ).filter(
+        SalesHourly.date_key >= window.start_key,
+        SalesHourly.date_key < window.end_key
+    )
+
+    if channel_id is not None:
+        query = query.filter(SalesHourly.channel_id == channel_id)
+
+    results = query.group_by(
+        SalesHourly.day_of_week,
+        SalesHourly.hour
     ).all()
 
     return [
         {
             "day_of_week": int(r.day_of_week),
             "hour": int(r.hour),
-            "orders": r.orders,
+            "orders": int(r.orders or 0),
             "revenue": float(r.revenue or 0)
         }
         for r in results
     ]
 
 
+@router.get("/hourly")
+def get_sales_by_hour(
+    period: str = Query("30d"),
+    channel_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get intraday sales curve (orders and revenue per hour of day)."""
+    window = resolve_period(period)
+
+    query = db.query(
+        SalesHourly.hour,
+        func.sum(SalesHourly.orders).label("orders"),
+        func.sum(SalesHourly.revenue).label("revenue"),
+        func.sum(SalesHourly.units).label("units")
+    ).filter(
+        SalesHourly.date_key >= window.start_key,
+        SalesHourly.date_key < window.end_key
+    )
+
+    if channel_id is not None:
+        query = query.filter(SalesHourly.channel_id == channel_id)
+
+    results = {r.hour: r for r in query.group_by(SalesHourly.hour).all()}
+
+    return [
+        {
+            "hour": hour,
+            "orders": int(results[hour].orders or 0) if hour in results else 0,
+            "revenue": float(results[hour].revenue or 0) if hour in results else 0,
+            "units": int(results[hour].units or 0) if hour in results else 0
+        }
+        for hour in range(24)
+    ]
+
+
 @router.get("/comparison")
 def get_period_comparison(
     db: Session = Depends(get_db)
@@ -281,27 +406,18 @@ def get_period_comparison(
     """Compare different time periods."""
     today = date.today()
 
-    periods = {
-        "today": (today, today),
-        "yesterday": (today - timedelta(days=1), today - timedelta(days=1)),
-        "last_7_days": (today - timedelta(days=7), today),
-        "last_30_days": (today - timedelta(days=30), today),
-        "this_month": (today.replace(day=1), today),
-        "last_month": (
-            (today.replace(day=1) - timedelta(days=1)).replace(day=1),
-            today.replace(day=1) - timedelta(days=1)
-        )
-    }
+    periods = ["today", "yesterday", "last_7_days", "last_30_days", "this_month", "last_month"]
 
     results = {}
-    for period_name, (start, end) in periods.items():
+    for period_name in periods:
+        window = resolve_period(period_name, today=today)
         data = db.query(
             func.count(Order.order_id).label("orders"),
             func.sum(Order.total_amount).label("revenue"),
             func.count(func.distinct(Order.customer_id)).label("customers")
         ).filter(
-            func.date(Order.order_created_at) >= start,
-            func.date(Order.order_created_at) <= end,
+            Order.date_key >= window.start_key,
+            Order.date_key < window.end_key,
             Order.order_status != "cancelled"
         ).first()
 
@@ -4,13 +4,19 @@ from sqlalchemy import func
 from datetime import date, timedelta
 from decimal import Decimal
 from typing import List, Optional
-import numpy as np
 import math
 
 from ..database import get_db
 
 
-from ..models import Customer, Order, Product, DateDimension
+from ..models import Customer, Order, Product
+from ..services.coalescing import coalesce
+from ..services.jobs import background_job
+from ..utils.lazy import lazy_import
+from ..utils.periods import Window, resolve_period, calendar
+
+# Imported on first use (see utils/lazy.py)
+np = lazy_import("numpy")
 
 
 def safe_float(value):
@@ -26,31 +32,34 @@ router = APIRouter(prefix="/predictions", tags=["Predictions"])
 
 
 @router.get("/sales-forecast")
+@background_job
+@coalesce
 def get_sales_forecast(
     days: int = Query(30, ge=7, le=90),
     db: Session = Depends(get_db)
 ):
     """Predict sales for the next N days using simple trend analysis."""
     # Get last 90 days of data
-    end_date = date.today()
-    start_date = end_date - timedelta(days=90)
-
-    historical = db.query(
-        DateDimension.full_date,
-        func.coalesce(func.sum(Order.total_amount), 0).label("revenue"),
-        func.coalesce(func.count(Order.order_id), 0).label("orders")
-    ).outerjoin(
-        Order, DateDimension.date_key == Order.date_key
-    ).filter(
-        DateDimension.full_date >= start_date,
-        DateDimension.full_date <= end_date
-    ).group_by(DateDimension.full_date).order_by(DateDimension.full_date).all()
+    window = resolve_period("90d")
+    end_date = window.end
+
+    daily_revenue = dict(
+        db.query(
+            Order.date_key,
+            func.sum(Order.total_amount)
+        ).filter(
+            Order.date_key >= window.start_key,
+            Order.date_key < window.end_key
+        ).group_by(Order.date_key).all()
+    )
+
+    historical = calendar.days(db, window)
 
     if len(historical) < 30:
         return {"error": "Not enough historical data for prediction"}
 
-    # Extract revenue values
-    revenues = [float(h.revenue) for h in historical]
+    # Extract revenue values (zero for days without orders)
+    revenues = [float(daily_revenue.get(h.date_key) or 0) for h in historical]
 
     # Calculate trend using simple linear regression
     x = np.arange(len(revenues))
@@ -111,11 +120,11 @@ def get_sales_forecast(
 
     # Compare with same period last year (if available)
     last_year_start = end_date - timedelta(days=365)
-    last_year_end = last_year_start + timedelta(days=days)
+    last_year = Window(last_year_start, last_year_start + timedelta(days=days))
 
     last_year_revenue = db.query(func.sum(Order.total_amount)).filter(
-        Order.order_created_at >= last_year_start,
-        Order.order_created_at <= last_year_end,
+        Order.date_key >= last_year.start_key,
+        Order.date_key < last_year.end_key,
         Order.order_status != "cancelled"
     ).scalar() or Decimal("0")
 
@@ -201,6 +210,8 @@ def predict_customer_ltv(
 
 
 @router.get("/churn-risk")
+@background_job
+@coalesce
 def get_churn_risk(
     db: Session = Depends(get_db)
 ):
@@ -303,11 +314,12 @@ def get_recommendations(
 
     # Check ROAS
     today = date.today()
-    last_7_days = today - timedelta(days=7)
+    last_7_days = resolve_period("7d", today=today)
 
     # Get recent metrics
     recent_orders = db.query(func.count(Order.order_id)).filter(
-        Order.order_created_at >= last_7_days,
+        Order.date_key >= last_7_days.start_key,
+        Order.date_key < last_7_days.end_key,
         Order.order_status != "cancelled"
     ).scalar() or 0
 
@@ -398,8 +410,7 @@ def simulate_scenario(
     db: Session = Depends(get_db)
 ):
     """Simulate business scenarios."""
-    today = date.today()
-    last_30_days = today - timedelta(days=30)
+    last_30_days = resolve_period("30d")
 
     # Get baseline metrics
     baseline = db.query(
@@ -407,7 +418,8 @@ def simulate_scenario(
         func.count(Order.order_id).label("orders"),
         func.avg(Order.total_amount).label("aov")
     ).filter(
-        Order.order_created_at >= last_30_days,
+        Order.date_key >= last_30_days.start_key,
+        Order.date_key < last_30_days.end_key,
         Order.order_status != "cancelled"
     ).first()
 
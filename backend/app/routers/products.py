@@ -1,30 +1,22 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import date, timedelta
-from decimal import Decimal
+from sqlalchemy import func, literal
 from typing import List, Optional
 
 from ..database import get_db
-from ..models import Product, OrderItem, Order, DateDimension
-from ..schemas.product import ProductResponse, ProductPerformance
+from ..models import Product, StockSnapshot
+from ..schemas.product import ProductResponse
+from ..services import dimension_cache
+from ..services.coalescing import coalesce
+from ..services.jobs import background_job
+from ..services.product_sales import product_totals
+from ..services.product_trends import detect_trends
+from ..utils.periods import resolve_period
+from ..utils.responses import table_response, response_layout
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
-
-def get_date_range(period: str) -> tuple[date, date]:
-    end_date = date.today()
-    if period == "7d":
-        start_date = end_date - timedelta(days=7)
-    elif period == "30d":
-        start_date = end_date - timedelta(days=30)
-    elif period == "60d":
-        start_date = end_date - timedelta(days=60)
-    elif period == "90d":
-        start_date = end_date - timedelta(days=90)
-    else:
-        start_date = end_date - timedelta(days=30)
-    return start_date, end_date
+PRODUCT_COLUMNS = list(ProductResponse.model_fields)
 
 
 @router.get("/list")
@@ -34,6 +26,7 @@ def get_products(
     category: Optional[str] = None,
     abc: Optional[str] = None,
     search: Optional[str] = None,
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
     """Get paginated list of products."""
@@ -50,51 +43,74 @@ def get_products(
         )
 
     total = query.count()
-    products = query.order_by(
+    rows = query.with_entities(
+        *[getattr(Product, column) for column in PRODUCT_COLUMNS]
+    ).order_by(
         Product.total_revenue.desc()
     ).offset((page - 1) * limit).limit(limit).all()
 
-    return {
-        "items": [ProductResponse.model_validate(p) for p in products],
-        "total": total,
-        "page": page,
-        "limit": limit,
-        "pages": (total + limit - 1) // limit
-    }
+    # Columns come straight from dim_products, so rows skip per-row ProductResponse validation
+    return table_response(
+        PRODUCT_COLUMNS,
+        [tuple(r) for r in rows],
+        layout,
+        total=total,
+        page=page,
+        limit=limit,
+        pages=(total + limit - 1) // limit
+    )
 
 
 @router.get("/abc-classification")
+@coalesce
 def get_abc_classification(
+    scope: str = Query("global", description="global, category"),
     db: Session = Depends(get_db)
 ):
-    """Get ABC classification summary."""
+    """Get ABC classification summary, overall or within each category."""
+    if scope == "category":
+        classification = Product.abc_category_classification
+        group = Product.category_level_1
+    else:
+        classification = Product.abc_classification
+        group = literal(None)
+
     results = db.query(
-        Product.abc_classification,
+        group.label("category"),
+        classification.label("classification"),
         func.count(Product.product_id).label("product_count"),
-        func.sum(Product.total_revenue).label("revenue")
+        func.sum(Product.abc_revenue).label("revenue")
     ).filter(
-        Product.abc_classification.isnot(None)
+        classification.isnot(None)
     ).group_by(
-        Product.abc_classification
+        group,
+        classification
     ).order_by(
-        Product.abc_classification
+        group,
+        classification
     ).all()
 
-    total_revenue = sum(float(r.revenue or 0) for r in results)
-    cumulative = 0
+    totals = {}
+    for r in results:
+        totals[r.category] = totals.get(r.category, 0) + float(r.revenue or 0)
 
+    cumulative = {}
     data = []
     for r in results:
         revenue = float(r.revenue or 0)
-        cumulative += revenue
+        total_revenue = totals[r.category]
+        cumulative[r.category] = cumulative.get(r.category, 0) + revenue
 
-        data.append({
-            "classification": r.abc_classification,
+        item = {
+            "classification": r.classification,
             "product_count": r.product_count,
             "revenue": revenue,
             "revenue_percentage": round((revenue / total_revenue * 100), 2) if total_revenue > 0 else 0,
-            "cumulative_percentage": round((cumulative / total_revenue * 100), 2) if total_revenue > 0 else 0
-        })
+            "cumulative_percentage": round((cumulative[r.category] / total_revenue * 100), 2) if total_revenue > 0 else 0
+        }
+        if scope == "category":
+            item = {"category": r.category, **item}
+        data.append(item)
 
     return data
 
@@ -106,44 +122,25 @@ def get_top_performers(
     db: Session = Depends(get_db)
 ):
     """Get top performing products by revenue."""
-    start_date, end_date = get_date_range(period)
+    window = resolve_period(period)
 
-    results = db.query(
-        Product.product_id,
-        Product.product_name,
-        Product.category_level_1,
-        Product.abc_classification,
-        Product.margin_percent,
-        func.sum(OrderItem.quantity).label("units_sold"),
-        func.sum(OrderItem.total_price).label("revenue")
-    ).join(
-        OrderItem, Product.product_id == OrderItem.product_id
-    ).join(
-        Order, OrderItem.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
-    ).group_by(
-        Product.product_id,
-        Product.product_name,
-        Product.category_level_1,
-        Product.abc_classification,
-        Product.margin_percent
-    ).order_by(
-        func.sum(OrderItem.total_price).desc()
-    ).limit(limit).all()
+    totals = product_totals(window)
+    results = db.execute(
+        totals.order_by(totals.selected_columns.revenue.desc()).limit(limit)
+    ).all()
+
+    products = dimension_cache.products.get(db)
 
     return [
         {
             "rank": i + 1,
             "product_id": r.product_id,
-            "product_name": r.product_name,
-            "category": r.category_level_1,
-            "abc_classification": r.abc_classification,
+            "product_name": products[r.product_id].product_name if r.product_id in products else None,
+            "category": products[r.product_id].category_level_1 if r.product_id in products else None,
+            "abc_classification": products[r.product_id].abc_classification if r.product_id in products else None,
             "units_sold": r.units_sold,
             "revenue": float(r.revenue or 0),
-            "margin_percent": float(r.margin_percent or 0)
+            "margin_percent": float(products[r.product_id].margin_percent or 0) if r.product_id in products else 0
         }
         for i, r in enumerate(results)
     ]
@@ -155,185 +152,177 @@ def get_products_by_category(
     db: Session = Depends(get_db)
 ):
     """Get product performance by category."""
-    start_date, end_date = get_date_range(period)
+    window = resolve_period(period)
 
-    results = db.query(
-        Product.category_level_1,
-        func.count(func.distinct(Product.product_id)).label("products"),
-        func.sum(OrderItem.quantity).label("units_sold"),
-        func.sum(OrderItem.total_price).label("revenue"),
-        func.avg(Product.margin_percent).label("avg_margin")
-    ).join(
-        OrderItem, Product.product_id == OrderItem.product_id
-    ).join(
-        Order, OrderItem.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
-    ).group_by(
-        Product.category_level_1
-    ).order_by(
-        func.sum(OrderItem.total_price).desc()
-    ).all()
+    # Aggregate per product on the rollup first, then group by cached category
+    results = db.execute(product_totals(window)).all()
+    products = dimension_cache.products.get(db)
 
-    total_revenue = sum(float(r.revenue or 0) for r in results)
+    categories = {}
+    for r in results:
+        if r.product_id not in products:
+            continue
+        product = products[r.product_id]
+        category = categories.setdefault(product.category_level_1, {
+            "products": 0, "units_sold": 0, "revenue": 0.0, "margins": []
+        })
+        category["products"] += 1
+        category["units_sold"] += int(r.units_sold or 0)
+        category["revenue"] += float(r.revenue or 0)
+        if product.margin_percent is not None:
+            category["margins"].append(float(product.margin_percent))
+
+    total_revenue = sum(c["revenue"] for c in categories.values())
 
     return [
         {
-            "category": r.category_level_1,
-            "products": r.products,
-            "units_sold": r.units_sold,
-            "revenue": float(r.revenue or 0),
-            "avg_margin": round(float(r.avg_margin or 0), 2),
-            "percentage": round((float(r.revenue or 0) / total_revenue * 100), 2) if total_revenue > 0 else 0
+            "category": name,
+            "products": c["products"],
+            "units_sold": c["units_sold"],
+            "revenue": c["revenue"],
+            "avg_margin": round(sum(c["margins"]) / len(c["margins"]), 2) if c["margins"] else 0,
+            "percentage": round((c["revenue"] / total_revenue * 100), 2) if total_revenue > 0 else 0
         }
-        for r in results
+        for name, c in sorted(categories.items(), key=lambda item: item[1]["revenue"], reverse=True)
     ]
 
 
 @router.get("/trends")
 def get_product_trends(
     period: str = Query("30d"),
+    recent_days: Optional[int] = Query(None, ge=1, le=365, description="Recent window (default: half the period)"),
+    baseline_days: Optional[int] = Query(None, ge=1, le=365, description="Comparison window before it (default: half the period)"),
+    buckets: int = Query(4, ge=1, le=52),
+    threshold: float = Query(20, ge=0),
+    limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
     """Identify trending and declining products."""
-    start_date, end_date = get_date_range(period)
-    period_days = (end_date - start_date).days
-    mid_date = start_date + timedelta(days=period_days // 2)
-
-    # First half performance
-    first_half = db.query(
-        Product.product_id,
-        func.sum(OrderItem.total_price).label("revenue")
-    ).join(
-        OrderItem, Product.product_id == OrderItem.product_id
-    ).join(
-        Order, OrderItem.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= start_date,
-        Order.order_created_at < mid_date,
-        Order.order_status != "cancelled"
-    ).group_by(Product.product_id).all()
-
-    first_half_dict = {r.product_id: float(r.revenue or 0) for r in first_half}
-
-    # Second half performance
-    second_half = db.query(
-        Product.product_id,
-        Product.product_name,
-        Product.category_level_1,
-        func.sum(OrderItem.total_price).label("revenue")
-    ).join(
-        OrderItem, Product.product_id == OrderItem.product_id
-    ).join(
-        Order, OrderItem.order_id == Order.order_id
-    ).filter(
-        Order.order_created_at >= mid_date,
-        Order.order_created_at <= end_date,
-        Order.order_status != "cancelled"
-    ).group_by(
-        Product.product_id,
-        Product.product_name,
-        Product.category_level_1
-    ).all()
-
-    trending = []
-    declining = []
-
-    for r in second_half:
-        first_revenue = first_half_dict.get(r.product_id, 0)
-        second_revenue = float(r.revenue or 0)
-
-        if first_revenue > 0:
-            change = ((second_revenue - first_revenue) / first_revenue) * 100
-        elif second_revenue > 0:
-            change = 100  # New product
-        else:
-            change = 0
-
-        product_data = {
-            "product_id": r.product_id,
-            "product_name": r.product_name,
-            "category": r.category_level_1,
-            "first_half_revenue": first_revenue,
-            "second_half_revenue": second_revenue,
-            "change_percent": round(change, 2)
+    window = resolve_period(period)
+    half = max(1, window.days // 2)
+
+    trends = detect_trends(
+        db,
+        end_date=window.end,
+        recent_days=recent_days or half,
+        baseline_days=baseline_days or half,
+        buckets=buckets,
+        threshold=threshold,
+        limit=limit
+    )
+
+    product_ids = trends["product_ids"]
+    metrics = trends["metrics"]
+
+    products = dimension_cache.products.get(db)
+
+    def product_data(i):
+        product = products.get(int(product_ids[i]))
+        return {
+            "product_id": int(product_ids[i]),
+            "product_name": product.product_name if product else None,
+            "category": product.category_level_1 if product else None,
+            "baseline_revenue": round(float(metrics["baseline_revenue"][i]), 2),
+            "recent_revenue": round(float(metrics["recent_revenue"][i]), 2),
+            "change_percent": round(float(metrics["change_percent"][i]), 2),
+            "slope": round(float(metrics["slope"][i]), 2),
+            "acceleration": round(float(metrics["acceleration"][i]), 2)
         }
 
-        if change >= 20:
-            trending.append(product_data)
-        elif change <= -20:
-            declining.append(product_data)
-
     return {
-        "trending": sorted(trending, key=lambda x: x["change_percent"], reverse=True)[:10],
-        "declining": sorted(declining, key=lambda x: x["change_percent"])[:10]
+        "recent_days": recent_days or half,
+        "baseline_days": baseline_days or half,
+        "trending": [product_data(i) for i in trends["trending"]],
+        "declining": [product_data(i) for i in trends["declining"]]
     }
 
 
+STOCK_COLUMNS = [
+    "product_id", "product_name", "category", "stock_quantity",
+    "daily_velocity", "days_of_stock", "stock_value", "status"
+]
+
+STOCK_SORT_COLUMNS = {
+    "days_of_stock": StockSnapshot.days_of_stock,
+    "daily_velocity": StockSnapshot.daily_velocity,
+    "stock_value": StockSnapshot.stock_value,
+    "stock_quantity": StockSnapshot.stock_quantity,
+    "product_name": StockSnapshot.product_name
+}
+
+
 @router.get("/stock-analysis")
+@background_job
+@coalesce
 def get_stock_analysis(
+    status: Optional[str] = Query(None, description="critical, low, healthy, overstock"),
+    category: Optional[str] = None,
+    sort: str = Query("days_of_stock", description=", ".join(STOCK_SORT_COLUMNS)),
+    order: str = Query("asc", description="asc, desc"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    layout: str = Depends(response_layout),
     db: Session = Depends(get_db)
 ):
-    """Analyze stock levels vs sales velocity."""
-    # Calculate average daily sales for last 30 days
-    start_date = date.today() - timedelta(days=30)
+    """Analyze stock levels vs sales velocity (from the stock snapshot)."""
+    if sort not in STOCK_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort column: {sort}")
 
-    results = db.query(
-        Product.product_id,
-        Product.product_name,
-        Product.stock_quantity,
-        Product.current_price,
-        func.sum(OrderItem.quantity).label("units_sold")
-    ).outerjoin(
-        OrderItem, Product.product_id == OrderItem.product_id
-    ).outerjoin(
-        Order, OrderItem.order_id == Order.order_id
-    ).filter(
-        (Order.order_created_at >= start_date) | (Order.order_id.is_(None)),
-        (Order.order_status != "cancelled") | (Order.order_id.is_(None))
-    ).group_by(
-        Product.product_id,
-        Product.product_name,
-        Product.stock_quantity,
-        Product.current_price
-    ).all()
-
-    analysis = []
-    for r in results:
-        daily_velocity = (r.units_sold or 0) / 30
-        stock = r.stock_quantity or 0
-        days_of_stock = stock / daily_velocity if daily_velocity > 0 else float('inf')
-
-        if days_of_stock < 7:
-            status = "critical"
-        elif days_of_stock < 14:
-            status = "low"
-        elif days_of_stock < 60:
-            status = "healthy"
-        else:
-            status = "overstock"
-
-        analysis.append({
-            "product_id": r.product_id,
-            "product_name": r.product_name,
-            "stock_quantity": stock,
-            "daily_velocity": round(daily_velocity, 2),
-            "days_of_stock": round(days_of_stock, 1) if days_of_stock != float('inf') else None,
-            "stock_value": float(stock * (r.current_price or 0)),
-            "status": status
-        })
+    base = db.query(StockSnapshot)
+    if category:
+        base = base.filter(StockSnapshot.category_level_1 == category)
+
+    # Summary: one GROUP BY over the (category-filtered) snapshot
+    summary_rows = base.with_entities(
+        StockSnapshot.stock_status,
+        func.count(StockSnapshot.product_id).label("products"),
+        func.sum(StockSnapshot.stock_value).label("stock_value"),
+        func.max(StockSnapshot.snapshot_date).label("snapshot_date")
+    ).group_by(StockSnapshot.stock_status).all()
+
+    summary = {"critical": 0, "low": 0, "healthy": 0, "overstock": 0}
+    summary_value = dict.fromkeys(summary, 0.0)
+    for r in summary_rows:
+        summary[r.stock_status] = r.products
+        summary_value[r.stock_status] = float(r.stock_value or 0)
+    snapshot_date = max((r.snapshot_date for r in summary_rows), default=None)
+
+    if status and status not in summary:
+        raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
+
+    query = base.filter(StockSnapshot.stock_status == status) if status else base
+    total = summary[status] if status else sum(summary.values())
+
+    column = STOCK_SORT_COLUMNS[sort]
+    ordering = column.desc() if order == "desc" else column.asc()
+    rows = query.with_entities(
+        StockSnapshot.product_id,
+        StockSnapshot.product_name,
+        StockSnapshot.category_level_1,
+        StockSnapshot.stock_quantity,
+        func.round(func.coalesce(StockSnapshot.daily_velocity, 0), 2),
+        StockSnapshot.days_of_stock,
+        func.coalesce(StockSnapshot.stock_value, 0),
+        StockSnapshot.stock_status
+    ).order_by(
+        column.is_(None),  # Products without sales (no days of stock) go last
+        ordering,
+        StockSnapshot.product_id
+    ).offset((page - 1) * limit).limit(limit).all()
 
-    return {
-        "products": sorted(analysis, key=lambda x: x["days_of_stock"] or 9999),
-        "summary": {
-            "critical": len([p for p in analysis if p["status"] == "critical"]),
-            "low": len([p for p in analysis if p["status"] == "low"]),
-            "healthy": len([p for p in analysis if p["status"] == "healthy"]),
-            "overstock": len([p for p in analysis if p["status"] == "overstock"])
-        }
-    }
+    return table_response(
+        STOCK_COLUMNS,
+        [tuple(r) for r in rows],
+        layout,
+        records_key="products",
+        total=total,
+        page=page,
+        limit=limit,
+        pages=(total + limit - 1) // limit,
+        summary=summary,
+        summary_stock_value=summary_value,
+        snapshot_date=snapshot_date
+    )
 
 
 @router.get("/{product_id}")
@@ -0,0 +1,248 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Optional
+
+from ..database import get_db
+from ..models import SessionTrafficDaily, SessionDeviceDaily, SessionGeoDaily
+from ..services import dimension_cache
+from ..utils.dates import from_date_key
+from ..utils.periods import Window, resolve_period
+
+router = APIRouter(prefix="/sessions", tags=["Sessions"])
+
+# Group-by options per endpoint, mapped to rollup columns
+TRAFFIC_DIMENSIONS = {
+    "channel": [SessionTrafficDaily.channel_id],
+    "source": [SessionTrafficDaily.source],
+    "medium": [SessionTrafficDaily.medium],
+    "source_medium": [SessionTrafficDaily.source, SessionTrafficDaily.medium],
+}
+
+DEVICE_DIMENSIONS = {
+    "device": SessionDeviceDaily.device_category,
+    "browser": SessionDeviceDaily.browser,
+    "os": SessionDeviceDaily.operating_system,
+}
+
+GEO_LEVELS = {
+    "country": [SessionGeoDaily.country],
+    "region": [SessionGeoDaily.country, SessionGeoDaily.region],
+}
+
+
+def metric_columns(rollup) -> list:
+    """Summed metric columns shared by every session rollup."""
+    return [
+        func.sum(rollup.sessions).label("sessions"),
+        func.sum(rollup.engaged_sessions).label("engaged_sessions"),
+        func.sum(rollup.duration_seconds).label("duration_seconds"),
+        func.sum(rollup.pageviews).label("pageviews"),
+        func.sum(rollup.purchases).label("purchases"),
+    ]
+
+
+def session_metrics(row) -> dict:
+    """Derive engagement and conversion metrics from summed rollup columns."""
+    sessions = int(row.sessions or 0)
+    engaged = int(row.engaged_sessions or 0)
+    purchases = int(row.purchases or 0)
+
+    return {
+        "sessions": sessions,
+        "engaged_sessions": engaged,
+        "engagement_rate": round((engaged / sessions * 100), 2) if sessions > 0 else 0,
+        "avg_session_duration": round(float(row.duration_seconds or 0) / sessions, 1) if sessions > 0 else 0,
+        "pages_per_session": round(float(row.pageviews or 0) / sessions, 2) if sessions > 0 else 0,
+        "purchases": purchases,
+        "conversion_rate": round((purchases / sessions * 100), 2) if sessions > 0 else 0,
+    }
+
+
+@router.get("/overview")
+def get_sessions_overview(
+    period: str = Query("30d"),
+    db: Session = Depends(get_db)
+):
+    """Get session KPIs for the period compared with the previous period."""
+    window = resolve_period(period)
+
+    def totals(span: Window) -> dict:
+        row = db.query(*metric_columns(SessionTrafficDaily)).filter(
+            SessionTrafficDaily.date_key >= span.start_key,
+            SessionTrafficDaily.date_key < span.end_key
+        ).one()
+        return session_metrics(row)
+
+    current = totals(window)
+    previous = totals(window.previous())
+
+    def calc_change(current_value, previous_value):
+        if previous_value == 0:
+            return 0
+        return round(((current_value - previous_value) / previous_value * 100), 2)
+
+    return {
+        **current,
+        "changes": {key: calc_change(current[key], previous[key]) for key in current}
+    }
+
+
+@router.get("/engagement")
+def get_engagement_trend(
+    period: str = Query("30d"),
+    channel_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """Get daily sessions and engagement metrics."""
+    window = resolve_period(period)
+
+    query = db.query(
+        SessionTrafficDaily.date_key,
+        *metric_columns(SessionTrafficDaily)
+    ).filter(
+        SessionTrafficDaily.date_key >= window.start_key,
+        SessionTrafficDaily.date_key < window.end_key
+    )
+
+    if channel_id is not None:
+        query = query.filter(SessionTrafficDaily.channel_id == channel_id)
+
+    results = query.group_by(
+        SessionTrafficDaily.date_key
+    ).order_by(
+        SessionTrafficDaily.date_key
+    ).all()
+
+    return [
+        {"date": from_date_key(r.date_key).isoformat(), **session_metrics(r)}
+        for r in results
+    ]
+
+
+@router.get("/traffic")
+def get_traffic_sources(
+    period: str = Query("30d"),
+    group_by: str = Query("channel", description="channel, source, medium or source_medium"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Get sessions and engagement by traffic source."""
+    if group_by not in TRAFFIC_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid group_by: {group_by}")
+
+    window = resolve_period(period)
+    columns = TRAFFIC_DIMENSIONS[group_by]
+    sessions = func.sum(SessionTrafficDaily.sessions)
+
+    results = db.query(
+        *columns,
+        *metric_columns(SessionTrafficDaily)
+    ).filter(
+        SessionTrafficDaily.date_key >= window.start_key,
+        SessionTrafficDaily.date_key < window.end_key
+    ).group_by(
+        *columns
+    ).order_by(
+        sessions.desc()
+    ).limit(limit).all()
+
+    channel_rows = dimension_cache.channels.get(db) if group_by == "channel" else {}
+
+    total_sessions = db.query(func.sum(SessionTrafficDaily.sessions)).filter(
+        SessionTrafficDaily.date_key >= window.start_key,
+        SessionTrafficDaily.date_key < window.end_key
+    ).scalar() or 0
+
+    items = []
+    for r in results:
+        item = {column.key: getattr(r, column.key) for column in columns}
+        if group_by == "channel":
+            item["channel_name"] = channel_rows[r.channel_id].channel_name if r.channel_id in channel_rows else None
+        item.update(session_metrics(r))
+        item["share"] = round((item["sessions"] / total_sessions * 100), 2) if total_sessions > 0 else 0
+        items.append(item)
+
+    return items
+
+
+@router.get("/devices")
+def get_device_breakdown(
+    period: str = Query("30d"),
+    dimension: str = Query("device", description="device, browser or os"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Get sessions and engagement by device category, browser or operating system."""
+    if dimension not in DEVICE_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid dimension: {dimension}")
+
+    window = resolve_period(period)
+    column = DEVICE_DIMENSIONS[dimension]
+
+    results = db.query(
+        column.label("name"),
+        *metric_columns(SessionDeviceDaily)
+    ).filter(
+        SessionDeviceDaily.date_key >= window.start_key,
+        SessionDeviceDaily.date_key < window.end_key
+    ).group_by(
+        column
+    ).order_by(
+        func.sum(SessionDeviceDaily.sessions).desc()
+    ).limit(limit).all()
+
+    total_sessions = db.query(func.sum(SessionDeviceDaily.sessions)).filter(
+        SessionDeviceDaily.date_key >= window.start_key,
+        SessionDeviceDaily.date_key < window.end_key
+    ).scalar() or 0
+
+    return [
+        {
+            "name": r.name,
+            **session_metrics(r),
+            "share": round((int(r.sessions or 0) / total_sessions * 100), 2) if total_sessions > 0 else 0
+        }
+        for r in results
+    ]
+
+
+@router.get("/geo")
+def get_geo_breakdown(
+    period: str = Query("30d"),
+    level: str = Query("country", description="country or region"),
+    country: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Get sessions and engagement by country or region."""
+    if level not in GEO_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level: {level}")
+
+    window = resolve_period(period)
+    columns = GEO_LEVELS[level]
+
+    query = db.query(
+        *columns,
+        *metric_columns(SessionGeoDaily)
+    ).filter(
+        SessionGeoDaily.date_key >= window.start_key,
+        SessionGeoDaily.date_key < window.end_key
+    )
+
+    if country:
+        query = query.filter(SessionGeoDaily.country == country)
+
+    results = query.group_by(
+        *columns
+    ).order_by(
+        func.sum(SessionGeoDaily.sessions).desc()
+    ).limit(limit).all()
+
+    return [
+        {
+            **{column.key: getattr(r, column.key) for column in columns},
+            **session_metrics(r)
+        }
+        for r in results
+    ]
@@ -29,6 +29,7 @@ class ProductResponse(BaseModel):
     total_units_sold: int = 0
     total_revenue: Decimal = Decimal("0.00")
     abc_classification: Optional[str] = None
+    abc_category_classification: Optional[str] = None
 
     class Config:
         from_attributes = True
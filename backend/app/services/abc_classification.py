@@ -0,0 +1,138 @@
+"""ABC (Pareto) classification of products by revenue.
+
+Classes are computed globally (abc_classification) and within each
+category_level_1 (abc_category_classification) from one revenue-per-product
+query, using a sorted cumulative sum per group.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Product, ProductSalesDaily
+from ..utils.dates import to_date_key
+from ..utils.lazy import lazy_import
+from .product_sales import latest_sales_date
+
+# Imported on first use (see utils/lazy.py)
+np = lazy_import("numpy")
+
+
+def classify(
+    revenue: np.ndarray,
+    groups: np.ndarray,
+    threshold_a: float = 0.8,
+    threshold_b: float = 0.95
+) -> np.ndarray:
+    """Return 'A'/'B'/'C' per item, ranked within its group (None for zero revenue).
+
+    An item belongs to A while the cumulative share of the items ranked above
+    it is below threshold_a, so the top seller of a group is always A.
+    """
+    classes = np.full(len(revenue), None, dtype=object)
+    if len(revenue) == 0:
+        return classes
+
+    order = np.lexsort((-revenue, groups))
+    sorted_revenue = revenue[order]
+    sorted_groups = groups[order]
+
+    is_start = np.r_[True, sorted_groups[1:] != sorted_groups[:-1]]
+    starts = np.flatnonzero(is_start)
+    group_idx = np.cumsum(is_start) - 1
+
+    cumulative = np.cumsum(sorted_revenue)
+    group_before = cumulative[starts] - sorted_revenue[starts]
+    group_total = np.add.reduceat(sorted_revenue, starts)
+
+    share_before = np.divide(
+        cumulative - sorted_revenue - group_before[group_idx],
+        group_total[group_idx],
+        out=np.ones(len(sorted_revenue)),
+        where=group_total[group_idx] > 0
+    )
+
+    sorted_classes = np.where(
+        share_before < threshold_a, "A",
+        np.where(share_before < threshold_b, "B", "C")
+    ).astype(object)
+    sorted_classes[sorted_revenue <= 0] = None
+
+    classes[order] = sorted_classes
+    return classes
+
+
+def refresh_abc_classification(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    window_days: Optional[int] = None
+) -> int:
+    """Recompute global and per-category ABC classes for every product.
+
+    Revenue comes from the trailing `window_days` ending on the latest day
+    with sales (settings.ABC_WINDOW_DAYS by default; 0 means lifetime).
+    start_date and end_date are unused: a backfill of an old range must not
+    classify against it, and classes are relative, so every product is
+    reclassified.
+    """
+    if window_days is None:
+        window_days = settings.ABC_WINDOW_DAYS
+    as_of = latest_sales_date(db)
+
+    sales = select(
+        ProductSalesDaily.product_id,
+        func.sum(ProductSalesDaily.revenue).label("revenue")
+    ).where(
+        ProductSalesDaily.date_key <= to_date_key(as_of)
+    )
+    if window_days:
+        sales = sales.where(
+            ProductSalesDaily.date_key >= to_date_key(as_of - timedelta(days=window_days - 1))
+        )
+    sales = sales.group_by(ProductSalesDaily.product_id).subquery()
+
+    rows = db.execute(
+        select(
+            Product.product_id,
+            Product.category_level_1,
+            func.coalesce(sales.c.revenue, 0)
+        ).outerjoin(
+            sales, Product.product_id == sales.c.product_id
+        )
+    ).all()
+
+    if not rows:
+        return 0
+
+    product_ids = [r[0] for r in rows]
+    revenue = np.fromiter((float(r[2]) for r in rows), dtype=np.float64, count=len(rows))
+
+    category_codes = {}
+    categories = np.fromiter(
+        (category_codes.setdefault(r[1], len(category_codes)) for r in rows),
+        dtype=np.int64,
+        count=len(rows)
+    )
+
+    thresholds = (settings.ABC_THRESHOLD_A, settings.ABC_THRESHOLD_B)
+    global_classes = classify(revenue, np.zeros(len(rows), dtype=np.int64), *thresholds)
+    category_classes = classify(revenue, categories, *thresholds)
+
+    db.execute(
+        update(Product),
+        [
+            {
+                "product_id": product_id,
+                "abc_classification": global_classes[i],
+                "abc_category_classification": category_classes[i],
+                "abc_revenue": round(float(revenue[i]), 2)
+            }
+            for i, product_id in enumerate(product_ids)
+        ]
+    )
+    return len(product_ids)
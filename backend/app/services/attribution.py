@@ -0,0 +1,253 @@
+"""Batch multi-touch attribution writing fct_attribution.
+
+For each order, the touchpoint path is built from the customer's sessions in
+fct_sessions within the lookback window, followed by the order's own UTMs as
+the final touch. Consecutive touches from the same channel/campaign count
+once. Credit is computed for every model at once with group-wise pandas
+operations over chunks of orders and written back in bulk.
+
+Each row carries the order's date_key and cancelled flag so marketing
+queries never need to join back to fct_orders. Cancelled orders keep their
+rows (flagged) and readers filter on is_cancelled.
+"""
+import logging
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Attribution, Campaign, Order, Session as WebSession
+from ..utils.dates import to_date_key
+from .campaign_daily import ATTRIBUTION_MODELS
+
+logger = logging.getLogger(__name__)
+
+# Position-based (U-shaped) weights for the first and last touch
+POSITION_ENDS_WEIGHT = 0.4
+
+
+def campaign_lookup(db: Session) -> dict:
+    """Map (utm_source, utm_campaign) and utm_campaign alone to campaign_id."""
+    lookup = {}
+    ambiguous = set()
+
+    for c in db.query(Campaign.campaign_id, Campaign.utm_source, Campaign.utm_campaign).all():
+        if not c.utm_campaign:
+            continue
+        name = c.utm_campaign.lower()
+        lookup.setdefault(((c.utm_source or "").lower(), name), c.campaign_id)
+        if name in lookup and lookup[name] != c.campaign_id:
+            ambiguous.add(name)
+        lookup.setdefault(name, c.campaign_id)
+
+    for name in ambiguous:
+        del lookup[name]
+    return lookup
+
+
+def resolve_campaigns(sources: pd.Series, campaigns: pd.Series, lookup: dict) -> pd.Series:
+    """Vector of campaign_ids for (source, campaign) pairs, NaN where unmatched."""
+    source = sources.fillna("").str.lower()
+    name = campaigns.fillna("").str.lower()
+    exact = pd.Series(list(zip(source, name)), index=sources.index).map(lookup)
+    return exact.fillna(name.map(lookup)).where(name != "")
+
+
+def build_paths(orders: pd.DataFrame, sessions: pd.DataFrame, lookback_days: int) -> pd.DataFrame:
+    """Return one row per touchpoint: order_id, touch_at, channel_id, campaign_id, revenue, order_at."""
+    final = orders[["order_id", "order_at", "channel_id", "campaign_id", "revenue"]].assign(
+        touch_at=orders["order_at"]
+    )
+
+    if len(sessions):
+        earlier = orders[["order_id", "customer_id", "order_at", "revenue"]].merge(
+            sessions, on="customer_id"
+        )
+        earlier = earlier[
+            (earlier["touch_at"] < earlier["order_at"]) &
+            (earlier["touch_at"] >= earlier["order_at"] - pd.Timedelta(days=lookback_days))
+        ].drop(columns="customer_id")
+        touches = pd.concat([earlier, final], ignore_index=True)
+    else:
+        touches = final
+
+    touches = touches.sort_values(["order_id", "touch_at"], kind="stable").reset_index(drop=True)
+
+    # Collapse consecutive touches from the same source, keeping the latest
+    key = touches["channel_id"].fillna(-1).astype(np.int64) * 10**12 + touches["campaign_id"].fillna(-1).astype(np.int64)
+    same_as_next = (
+        (touches["order_id"].values[:-1] == touches["order_id"].values[1:]) &
+        (key.values[:-1] == key.values[1:])
+    )
+    return touches[~np.r_[same_as_next, False]].reset_index(drop=True)
+
+
+def compute_credits(touches: pd.DataFrame, half_life_days: float) -> pd.DataFrame:
+    """Add one credit column per attribution model; credits sum to 1 per order."""
+    grouped = touches.groupby("order_id", sort=False)
+    position = grouped.cumcount().to_numpy()
+    length = grouped["order_id"].transform("size").to_numpy()
+    is_first = position == 0
+    is_last = position == length - 1
+
+    credits = pd.DataFrame(index=touches.index)
+    credits["last_click"] = is_last.astype(float)
+    credits["first_click"] = is_first.astype(float)
+    credits["linear"] = 1.0 / length
+
+    age_days = (touches["order_at"] - touches["touch_at"]).dt.total_seconds().to_numpy() / 86400
+    decay = np.power(0.5, age_days / half_life_days)
+    credits["time_decay"] = decay / pd.Series(decay, index=touches.index).groupby(touches["order_id"]).transform("sum").to_numpy()
+
+    middle = np.where(length > 2, (1 - 2 * POSITION_ENDS_WEIGHT) / np.maximum(length - 2, 1), 0.0)
+    credits["position_based"] = np.select(
+        [length == 1, length == 2, is_first | is_last],
+        [1.0, 0.5, POSITION_ENDS_WEIGHT],
+        default=middle
+    )
+
+    positions = np.where(is_last, "last", np.where(is_first, "first", "middle"))
+    return touches.assign(position=positions, **{m: credits[m] for m in ATTRIBUTION_MODELS})
+
+
+def to_attribution_rows(touches: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate credits to one row per order x model x campaign (or channel when no campaign)."""
+    long = touches.melt(
+        id_vars=["order_id", "touch_at", "order_at", "channel_id", "campaign_id", "revenue", "position"],
+        value_vars=ATTRIBUTION_MODELS,
+        var_name="attribution_model",
+        value_name="credit"
+    )
+    long = long[long["credit"] > 0]
+
+    # One row per campaign; touches without a campaign are kept per channel
+    long["group_channel"] = long["channel_id"].where(long["campaign_id"].isna(), -1).fillna(-2)
+    long["group_campaign"] = long["campaign_id"].fillna(-1)
+    long = long.sort_values("touch_at", kind="stable")
+
+    rows = long.groupby(
+        ["order_id", "attribution_model", "group_campaign", "group_channel"], sort=False
+    ).agg(
+        campaign_id=("campaign_id", "last"),
+        channel_id=("channel_id", "last"),
+        credit=("credit", "sum"),
+        revenue=("revenue", "first"),
+        order_at=("order_at", "first"),
+        first_touch_at=("touch_at", "first"),
+        position=("position", "last")
+    ).reset_index().drop(columns=["group_campaign", "group_channel"])
+
+    rows["attributed_orders"] = rows["credit"].round(4)
+    rows["attributed_revenue"] = (rows["revenue"] * rows["credit"]).round(2)
+    rows["days_to_conversion"] = (rows["order_at"] - rows["first_touch_at"]).dt.days
+    return rows
+
+
+def refresh_attribution(db: Session, start_date: date, end_date: date) -> int:
+    """Recompute every attribution model for orders dated in [start_date, end_date]."""
+    start_key, end_key = to_date_key(start_date), to_date_key(end_date)
+    lookback_days = settings.ATTRIBUTION_LOOKBACK_DAYS
+    chunk_size = settings.ATTRIBUTION_CHUNK_SIZE
+    lookup = campaign_lookup(db)
+
+    written = 0
+    last_order_id = 0
+
+    while True:
+        chunk = db.query(
+            Order.order_id,
+            Order.customer_id,
+            Order.date_key,
+            Order.order_created_at,
+            Order.order_status,
+            Order.total_amount,
+            Order.utm_source,
+            Order.utm_campaign,
+            Order.channel_id
+        ).filter(
+            Order.date_key >= start_key,
+            Order.date_key <= end_key,
+            Order.order_id > last_order_id
+        ).order_by(Order.order_id).limit(chunk_size).all()
+
+        if not chunk:
+            break
+        last_order_id = chunk[-1].order_id
+
+        order_ids = [o.order_id for o in chunk]
+        db.execute(
+            delete(Attribution).where(
+                Attribution.order_id.in_(order_ids),
+                Attribution.attribution_model.in_(ATTRIBUTION_MODELS)
+            )
+        )
+
+        orders = pd.DataFrame(
+            chunk,
+            columns=["order_id", "customer_id", "date_key", "order_at", "order_status", "revenue",
+                     "utm_source", "utm_campaign", "channel_id"]
+        )
+        order_info = {
+            o.order_id: (o.date_key, o.order_status == "cancelled")
+            for o in chunk
+        }
+
+        orders["order_at"] = pd.to_datetime(orders["order_at"])
+        orders["revenue"] = orders["revenue"].astype(float)
+        orders["campaign_id"] = resolve_campaigns(orders["utm_source"], orders["utm_campaign"], lookup)
+
+        customer_ids = orders["customer_id"].dropna().unique().tolist()
+        touch_from = orders["order_at"].min().to_pydatetime() - timedelta(days=lookback_days)
+        touch_to = orders["order_at"].max().to_pydatetime()
+        sessions = pd.DataFrame(
+            db.query(
+                WebSession.customer_id,
+                WebSession.session_start_at,
+                WebSession.channel_id,
+                WebSession.source,
+                WebSession.campaign
+            ).filter(
+                WebSession.customer_id.in_(customer_ids),
+                # date_key bounds let MySQL prune fct_sessions partitions
+                WebSession.date_key >= to_date_key(touch_from.date()),
+                WebSession.date_key <= to_date_key(touch_to.date()),
+                WebSession.session_start_at >= touch_from,
+                WebSession.session_start_at < touch_to
+            ).all(),
+            columns=["customer_id", "touch_at", "channel_id", "source", "campaign"]
+        )
+        if len(sessions):
+            sessions["touch_at"] = pd.to_datetime(sessions["touch_at"])
+            sessions["campaign_id"] = resolve_campaigns(sessions["source"], sessions["campaign"], lookup)
+            sessions = sessions.drop(columns=["source", "campaign"])
+
+        touches = compute_credits(
+            build_paths(orders, sessions, lookback_days),
+            settings.ATTRIBUTION_HALF_LIFE_DAYS
+        )
+        rows = to_attribution_rows(touches)
+
+        records = [
+            {
+                "order_id": int(r.order_id),
+                "date_key": order_info[int(r.order_id)][0],
+                "is_cancelled": order_info[int(r.order_id)][1],
+                "campaign_id": None if pd.isna(r.campaign_id) else int(r.campaign_id),
+                "channel_id": None if pd.isna(r.channel_id) else int(r.channel_id),
+                "attribution_model": r.attribution_model,
+                "attributed_revenue": float(r.attributed_revenue),
+                "attributed_orders": float(r.attributed_orders),
+                "days_to_conversion": int(r.days_to_conversion),
+                "touchpoint_position": r.position
+            }
+            for r in rows.itertuples(index=False)
+        ]
+        db.execute(insert(Attribution), records)
+        written += len(records)
+
+        logger.debug(f"Attributed orders up to {last_order_id}: {len(records)} rows")
+
+    return written
@@ -0,0 +1,126 @@
+"""Campaign-day performance rollup (fct_campaign_daily).
+
+One row per date_key x campaign_id x attribution_model, holding the day's
+delivery metrics from fct_ad_spend next to the revenue and orders credited
+to the campaign by that model. Delivery metrics are repeated on every model
+row, so queries must always filter a single attribution_model.
+"""
+from datetime import date
+
+from sqlalchemy import func, case, insert, select, literal
+from sqlalchemy.orm import Session
+
+from ..models import AdSpend, Attribution, CampaignDaily
+from ..utils.periods import Window
+
+ATTRIBUTION_MODELS = ["last_click", "first_click", "linear", "time_decay", "position_based"]
+DEFAULT_MODEL = "last_click"
+
+
+def refresh_campaign_daily(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_campaign_daily for every date_key in [start_date, end_date]."""
+    window = Window(start_date, end_date)
+
+    db.query(CampaignDaily).filter(
+        CampaignDaily.date_key >= window.start_key,
+        CampaignDaily.date_key < window.end_key
+    ).delete(synchronize_session=False)
+
+    models = {m for (m,) in db.query(Attribution.attribution_model).distinct()}
+    models.add(DEFAULT_MODEL)
+
+    spend = db.query(
+        AdSpend.date_key,
+        AdSpend.campaign_id,
+        func.sum(AdSpend.impressions).label("impressions"),
+        func.sum(AdSpend.clicks).label("clicks"),
+        func.sum(AdSpend.spend).label("spend"),
+        func.sum(AdSpend.conversions_platform).label("conversions_platform"),
+        func.sum(AdSpend.conversions_value_platform).label("conversions_value_platform")
+    ).filter(
+        AdSpend.date_key >= window.start_key,
+        AdSpend.date_key < window.end_key
+    ).group_by(
+        AdSpend.date_key,
+        AdSpend.campaign_id
+    ).all()
+
+    attributed = db.query(
+        Attribution.date_key,
+        Attribution.campaign_id,
+        Attribution.attribution_model,
+        func.sum(Attribution.attributed_revenue).label("revenue"),
+        func.sum(Attribution.attributed_orders).label("orders")
+    ).filter(
+        Attribution.date_key >= window.start_key,
+        Attribution.date_key < window.end_key,
+        Attribution.is_cancelled == False,
+        Attribution.campaign_id.isnot(None)
+    ).group_by(
+        Attribution.date_key,
+        Attribution.campaign_id,
+        Attribution.attribution_model
+    ).all()
+
+    def empty_row(date_key, campaign_id, model):
+        return {
+            "date_key": date_key,
+            "campaign_id": campaign_id,
+            "attribution_model": model,
+            "impressions": 0,
+            "clicks": 0,
+            "spend": 0,
+            "conversions_platform": 0,
+            "conversions_value_platform": 0,
+            "attributed_revenue": 0,
+            "attributed_orders": 0
+        }
+
+    rows = {}
+    for s in spend:
+        for model in models:
+            row = empty_row(s.date_key, s.campaign_id, model)
+            row.update(
+                impressions=s.impressions or 0,
+                clicks=s.clicks or 0,
+                spend=s.spend or 0,
+                conversions_platform=s.conversions_platform or 0,
+                conversions_value_platform=s.conversions_value_platform or 0
+            )
+            rows[(s.date_key, s.campaign_id, model)] = row
+
+    for a in attributed:
+        key = (a.date_key, a.campaign_id, a.attribution_model)
+        row = rows.setdefault(key, empty_row(*key))
+        row.update(attributed_revenue=a.revenue or 0, attributed_orders=a.orders or 0)
+
+    if rows:
+        db.execute(insert(CampaignDaily), list(rows.values()))
+    return len(rows)
+
+
+def ratio(numerator, denominator, scale: float = 1.0):
+    """SQL expression for round(numerator * scale / denominator, 2), NULL when denominator is 0."""
+    return case(
+        (denominator > 0, func.round(numerator * literal(scale) / denominator, 2)),
+        else_=None
+    )
+
+
+def campaign_totals(window: Window, model: str = DEFAULT_MODEL):
+    """Select per-campaign totals over the window for one attribution model."""
+    return select(
+        CampaignDaily.campaign_id,
+        func.sum(CampaignDaily.impressions).label("impressions"),
+        func.sum(CampaignDaily.clicks).label("clicks"),
+        func.sum(CampaignDaily.spend).label("spend"),
+        func.sum(CampaignDaily.conversions_platform).label("conversions"),
+        func.sum(CampaignDaily.attributed_revenue).label("revenue"),
+        func.sum(CampaignDaily.attributed_orders).label("orders")
+    ).where(
+        CampaignDaily.attribution_model == model,
+        CampaignDaily.date_key >= window.start_key,
+        CampaignDaily.date_key < window.end_key
+    ).group_by(
+        CampaignDaily.campaign_id
+    )
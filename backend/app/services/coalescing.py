@@ -0,0 +1,115 @@
+"""Single-flight coalescing of identical expensive requests.
+
+When a load lands (new data version, new ETags) every open dashboard asks for
+the same heavy endpoints at once. Handlers decorated with `coalesce` share one
+in-flight computation per key: the first request runs the handler and every
+identical request arriving while it runs awaits its result instead of running
+the same queries again.
+
+The key is the endpoint, its parameters after FastAPI has parsed them
+(defaults filled in, so `?period=30d` and no period are the same request), the
+tenant and the data version. Flights only last while the computation runs;
+nothing is cached afterwards (repeat views are answered by the ETag
+middleware). Coalescing is per worker process.
+"""
+import asyncio
+import copy
+import functools
+
+from fastapi import Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from ..tenancy import current_tenant
+from .data_version import data_version
+
+
+def normalize(value):
+    """Hashable form of a parsed parameter value."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(normalize(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize(v)) for k, v in value.items()))
+    return value
+
+
+def request_key(endpoint: str, kwargs: dict) -> tuple:
+    params = tuple(sorted(
+        (name, normalize(value))
+        for name, value in kwargs.items()
+        # Per-request objects: never part of what is computed
+        if not isinstance(value, (Session, Request))
+    ))
+    return (endpoint, current_tenant(), data_version.cached(), params)
+
+
+def copy_result(result):
+    """A response for one request: middleware edits headers in place, so each gets its own."""
+    if isinstance(result, Response):
+        result = copy.copy(result)
+        result.raw_headers = list(result.raw_headers)
+    return result
+
+
+class SingleFlight:
+    """In-flight computations by key, shared by the requests that ask for the same one."""
+
+    def __init__(self):
+        self._flights = {}
+        self.coalesced = 0
+
+    async def run(self, key, compute):
+        while True:
+            future = self._flights.get(key)
+            if future is None:
+                break
+            self.coalesced += 1
+            try:
+                return copy_result(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # This request was cancelled, not the flight
+                    raise
+                # The leading request went away mid-flight: retry, leading a new flight
+
+        future = self._flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Waiters re-raise it; mark it retrieved in case there are none
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return copy_result(result)
+        finally:
+            self._flights.pop(key, None)
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+flights = SingleFlight()
+
+
+def coalesce(handler):
+    """Route decorator: concurrent identical calls of a (sync) handler run it once.
+
+    Apply below `@router.get`. The handler keeps running in the thread pool;
+    requests waiting on its flight hold no thread and no DB connection.
+    """
+    endpoint = f"{handler.__module__}.{handler.__qualname__}"
+
+    @functools.wraps(handler)
+    async def wrapper(**kwargs):
+        return await flights.run(
+            request_key(endpoint, kwargs),
+            lambda: run_in_threadpool(handler, **kwargs)
+        )
+
+    return wrapper
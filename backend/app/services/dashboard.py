@@ -0,0 +1,432 @@
+"""Dashboard widgets, built once from shared aggregates.
+
+The widget builders take already-aggregated values so the single-widget
+endpoints and `/dashboard/bundle` format results identically. `load_bundle`
+plans the bundle's queries: fct_orders and fct_ad_spend are each scanned once
+by date_key over the span covering every window the widgets need (period,
+previous period and the alert weeks), the fct_orders scan also yielding the
+channel totals and distinct customers, and the independent queries run
+concurrently, each on its own session.
+"""
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import and_, func, case
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import read_session
+from ..models import Customer, Order, AdSpend
+from ..schemas.analytics import KPIResponse, RevenueChartData, AlertResponse
+from . import dimension_cache
+from .product_sales import product_totals
+from ..utils.periods import Window, resolve_period, calendar
+
+REVENUE_CHART_COLUMNS = list(RevenueChartData.model_fields)
+
+# Bundle aggregates built from daily_channel_orders rows
+DayTotals = namedtuple("DayTotals", ["orders", "revenue", "customers", "buyers", "new_customers", "repeat_orders"])
+ChannelTotals = namedtuple("ChannelTotals", ["channel_id", "orders", "revenue"])
+
+
+def percent_change(current, previous) -> float:
+    current, previous = float(current or 0), float(previous or 0)
+    return ((current - previous) / previous * 100) if previous > 0 else 0
+
+
+def build_kpis(current: dict, previous: dict, ad_spend) -> KPIResponse:
+    """KPIs from period totals (orders, revenue, customers, new_customers, repeat_orders)."""
+    total_revenue = Decimal(str(current["revenue"] or 0))
+    total_orders = current["orders"] or 0
+    total_customers = current["customers"] or 0
+    new_customers = current["new_customers"] or 0
+    ad_spend = Decimal(str(ad_spend or 0))
+
+    prev_revenue = Decimal(str(previous["revenue"] or 0))
+    prev_orders = previous["orders"] or 0
+
+    repeat_rate = (current["repeat_orders"] / total_orders * 100) if total_orders > 0 else 0
+
+    avg_order_value = (total_revenue / total_orders) if total_orders > 0 else Decimal("0")
+    prev_aov = (prev_revenue / prev_orders) if prev_orders > 0 else Decimal("0")
+
+    roas = (total_revenue / ad_spend) if ad_spend > 0 else None
+    cac = (ad_spend / new_customers) if new_customers > 0 else None
+
+    return KPIResponse(
+        total_revenue=total_revenue,
+        total_orders=total_orders,
+        total_customers=total_customers,
+        avg_order_value=avg_order_value.quantize(Decimal("0.01")),
+        new_customers=new_customers,
+        repeat_rate=round(repeat_rate, 2),
+        total_ad_spend=ad_spend,
+        roas=roas.quantize(Decimal("0.01")) if roas else None,
+        cac=cac.quantize(Decimal("0.01")) if cac else None,
+        revenue_change=round(percent_change(total_revenue, prev_revenue), 2),
+        orders_change=round(percent_change(total_orders, prev_orders), 2),
+        customers_change=round(percent_change(total_customers, previous["customers"]), 2),
+        aov_change=round(percent_change(avg_order_value, prev_aov), 2)
+    )
+
+
+def order_totals(db: Session, window: Window) -> dict:
+    row = db.query(
+        func.count(Order.order_id).label("orders"),
+        func.sum(Order.total_amount).label("revenue"),
+        func.count(func.distinct(Order.customer_id)).label("customers"),
+        func.sum(case((Order.is_first_order == True, 1), else_=0)).label("new_customers"),
+        func.sum(case((Order.is_repeat_order == True, 1), else_=0)).label("repeat_orders")
+    ).filter(
+        Order.date_key >= window.start_key,
+        Order.date_key < window.end_key,
+        Order.order_status != "cancelled"
+    ).one()
+    return row._asdict()
+
+
+def period_kpis(db: Session, window: Window) -> KPIResponse:
+    """KPIs for a window compared with the one before it."""
+    ad_spend = db.query(func.sum(AdSpend.spend)).filter(
+        AdSpend.date_key >= window.start_key,
+        AdSpend.date_key < window.end_key
+    ).scalar()
+
+    return build_kpis(order_totals(db, window), order_totals(db, window.previous()), ad_spend)
+
+
+def build_revenue_chart(db: Session, window: Window, daily: dict) -> list:
+    """(date, revenue, orders, customers) per day, zero-filled from the calendar."""
+    rows = []
+    for day in calendar.days(db, window):
+        r = daily.get(day.date_key)
+        rows.append((
+            day.full_date,
+            (r.revenue or 0) if r else 0,
+            r.orders if r else 0,
+            r.customers if r else 0
+        ))
+    return rows
+
+
+def build_top_products(db: Session, results) -> list:
+    products = dimension_cache.products.get(db)
+    return [
+        {
+            "product_id": r.product_id,
+            "product_name": products[r.product_id].product_name if r.product_id in products else "",
+            "category": products[r.product_id].category_level_1 if r.product_id in products else None,
+            "units_sold": r.units_sold or 0,
+            "revenue": r.revenue or Decimal("0"),
+            "rank": i + 1
+        }
+        for i, r in enumerate(results)
+    ]
+
+
+def build_top_channels(db: Session, results) -> list:
+    channel_rows = dimension_cache.channels.get(db)
+    total_revenue = sum(r.revenue or 0 for r in results)
+    return [
+        {
+            "channel": channel_rows[r.channel_id].channel_name if r.channel_id in channel_rows else "",
+            "orders": r.orders or 0,
+            "revenue": r.revenue or Decimal("0"),
+            "percentage": round((float(r.revenue or 0) / float(total_revenue) * 100), 2) if total_revenue > 0 else 0
+        }
+        for r in results
+    ]
+
+
+def build_alerts(
+    today: date,
+    current_revenue,
+    prev_revenue,
+    current_spend,
+    prev_spend,
+    churned_count: int,
+    total_customers: int
+) -> list:
+    """Smart alerts from week-over-week revenue/spend and the churn counts."""
+    alerts = []
+    current_revenue = Decimal(str(current_revenue or 0))
+    prev_revenue = Decimal(str(prev_revenue or 0))
+    current_spend = Decimal(str(current_spend or 0))
+    prev_spend = Decimal(str(prev_spend or 0))
+
+    # Revenue alert
+    if prev_revenue > 0:
+        revenue_change = ((float(current_revenue) - float(prev_revenue)) / float(prev_revenue)) * 100
+
+        if revenue_change < -10:
+            alerts.append(AlertResponse(
+                alert_id="rev_drop",
+                alert_type="danger",
+                title="Queda na Receita",
+                message=f"A receita caiu {abs(revenue_change):.1f}% comparado com a semana anterior",
+                metric="revenue",
+                current_value=float(current_revenue),
+                threshold=float(prev_revenue) * 0.9,
+                change_percent=round(revenue_change, 2),
+                created_at=today.isoformat()
+            ))
+        elif revenue_change > 20:
+            alerts.append(AlertResponse(
+                alert_id="rev_spike",
+                alert_type="info",
+                title="Aumento na Receita",
+                message=f"A receita aumentou {revenue_change:.1f}% comparado com a semana anterior",
+                metric="revenue",
+                current_value=float(current_revenue),
+                threshold=float(prev_revenue) * 1.2,
+                change_percent=round(revenue_change, 2),
+                created_at=today.isoformat()
+            ))
+
+    # Ad spend efficiency alert
+    if current_spend > 0 and current_revenue > 0 and prev_spend > 0:
+        current_roas = float(current_revenue) / float(current_spend)
+        prev_roas = float(prev_revenue) / float(prev_spend)
+        roas_change = ((current_roas - prev_roas) / prev_roas) * 100 if prev_roas > 0 else 0
+
+        if current_roas < 2:
+            alerts.append(AlertResponse(
+                alert_id="low_roas",
+                alert_type="warning",
+                title="ROAS Baixo",
+                message=f"O ROAS atual é {current_roas:.2f}x, abaixo do recomendado (2x)",
+                metric="roas",
+                current_value=current_roas,
+                threshold=2.0,
+                change_percent=round(roas_change, 2),
+                created_at=today.isoformat()
+            ))
+
+    # Churn alert
+    total_customers = total_customers or 1
+    churn_rate = (churned_count / total_customers) * 100
+
+    if churn_rate > 15:
+        alerts.append(AlertResponse(
+            alert_id="high_churn",
+            alert_type="warning",
+            title="Taxa de Churn Alta",
+            message=f"{churned_count} clientes ({churn_rate:.1f}%) não compram há mais de 90 dias",
+            metric="churn_rate",
+            current_value=churn_rate,
+            threshold=15.0,
+            created_at=today.isoformat()
+        ))
+
+    return alerts
+
+
+def churn_counts(db: Session) -> tuple:
+    """(churned, total) among customers with at least one order."""
+    row = db.query(
+        func.count(Customer.customer_id),
+        func.sum(case((Customer.is_churned == True, 1), else_=0))
+    ).filter(
+        Customer.total_orders > 0
+    ).one()
+    return int(row[1] or 0), int(row[0] or 0)
+
+
+def alert_windows(today: date) -> tuple:
+    """Current and previous week compared by the alerts."""
+    current = resolve_period("7d", today=today)
+    return current, current.previous()
+
+
+def sum_days(daily: dict, window: Window, attribute: str):
+    return sum(
+        (getattr(r, attribute) or 0 for key, r in daily.items() if window.start_key <= key < window.end_key),
+        0
+    )
+
+
+# Queries of the bundle; each takes its own session and returns plain rows
+
+def daily_channel_orders(db: Session, span: Window, windows: list) -> list:
+    """Orders per (date_key, channel_id) over the span, from one scan of fct_orders.
+
+    Besides the sums, `customers` counts each buyer on their first order of the
+    day and `buyers` on their first order within each of `windows` (disjoint),
+    so distinct customers per day and per window are sums of these rows.
+    """
+    bucket = case(
+        *[(and_(Order.date_key >= w.start_key, Order.date_key < w.end_key), i + 1) for i, w in enumerate(windows)],
+        else_=0
+    )
+    orders = db.query(
+        Order.date_key,
+        Order.channel_id,
+        Order.customer_id,
+        Order.total_amount,
+        Order.is_first_order,
+        Order.is_repeat_order,
+        bucket.label("bucket"),
+        func.row_number().over(
+            partition_by=[Order.customer_id, Order.date_key], order_by=Order.order_id
+        ).label("day_rank"),
+        func.row_number().over(
+            partition_by=[Order.customer_id, bucket], order_by=Order.order_id
+        ).label("window_rank")
+    ).filter(
+        Order.date_key >= span.start_key,
+        Order.date_key < span.end_key,
+        Order.order_status != "cancelled"
+    ).subquery()
+
+    def first_orders(*conditions):
+        return func.sum(case((and_(orders.c.customer_id.isnot(None), *conditions), 1), else_=0))
+
+    return db.query(
+        orders.c.date_key,
+        orders.c.channel_id,
+        func.count().label("orders"),
+        func.sum(orders.c.total_amount).label("revenue"),
+        first_orders(orders.c.day_rank == 1).label("customers"),
+        first_orders(orders.c.bucket > 0, orders.c.window_rank == 1).label("buyers"),
+        func.sum(case((orders.c.is_first_order == True, 1), else_=0)).label("new_customers"),
+        func.sum(case((orders.c.is_repeat_order == True, 1), else_=0)).label("repeat_orders")
+    ).group_by(
+        orders.c.date_key,
+        orders.c.channel_id
+    ).all()
+
+
+def daily_totals(rows: list) -> dict:
+    """daily_channel_orders rows summed over channels, by date_key."""
+    days = {}
+    for r in rows:
+        day = days.setdefault(r.date_key, dict.fromkeys(DayTotals._fields, 0))
+        for field in DayTotals._fields:
+            day[field] += getattr(r, field) or 0
+    return {key: DayTotals(**values) for key, values in days.items()}
+
+
+def channel_totals(rows: list, window: Window) -> list:
+    """daily_channel_orders rows summed over the window's days, by channel, highest revenue first."""
+    channels = {}
+    for r in rows:
+        if r.channel_id is None or not window.start_key <= r.date_key < window.end_key:
+            continue
+        orders, revenue = channels.get(r.channel_id, (0, 0))
+        channels[r.channel_id] = (orders + r.orders, revenue + (r.revenue or 0))
+    return sorted(
+        (ChannelTotals(channel_id, orders, revenue) for channel_id, (orders, revenue) in channels.items()),
+        key=lambda c: c.revenue,
+        reverse=True
+    )
+
+
+def channel_orders(db: Session, window: Window) -> list:
+    return db.query(
+        Order.channel_id,
+        func.count(Order.order_id).label("orders"),
+        func.sum(Order.total_amount).label("revenue")
+    ).filter(
+        Order.date_key >= window.start_key,
+        Order.date_key < window.end_key,
+        Order.order_status != "cancelled",
+        Order.channel_id.isnot(None)
+    ).group_by(
+        Order.channel_id
+    ).order_by(
+        func.sum(Order.total_amount).desc()
+    ).all()
+
+
+def daily_spend(db: Session, span: Window) -> dict:
+    return dict(
+        db.query(
+            AdSpend.date_key,
+            func.sum(AdSpend.spend)
+        ).filter(
+            AdSpend.date_key >= span.start_key,
+            AdSpend.date_key < span.end_key
+        ).group_by(AdSpend.date_key).all()
+    )
+
+
+def top_product_rows(db: Session, window: Window, limit: int) -> list:
+    totals = product_totals(window)
+    return db.execute(
+        totals.order_by(totals.selected_columns.revenue.desc()).limit(limit)
+    ).all()
+
+
+def run_query(query, *args):
+    db = read_session()
+    try:
+        return query(db, *args)
+    finally:
+        db.close()
+
+
+def load_bundle(db: Session, period: str, limit: int, today: date = None) -> dict:
+    """Every dashboard widget for a period from four concurrent queries."""
+    today = today or date.today()
+    window = resolve_period(period, today=today)
+    previous = window.previous()
+    alert_current, alert_previous = alert_windows(today)
+
+    windows = [window, previous, alert_current, alert_previous]
+    span = Window(min(w.start for w in windows), max(w.end for w in windows))
+
+    with ThreadPoolExecutor(max_workers=settings.DASHBOARD_BUNDLE_WORKERS) as pool:
+        def submit(query, *args):
+            # Pool threads don't inherit context variables (the request's tenant)
+            return pool.submit(contextvars.copy_context().run, run_query, query, *args)
+
+        orders_future = submit(daily_channel_orders, span, [window, previous])
+        spend_future = submit(daily_spend, span)
+        products_future = submit(top_product_rows, window, limit)
+        churn_future = submit(churn_counts)
+
+        order_rows = orders_future.result()
+        spend = spend_future.result()
+        products = products_future.result()
+        churned, total_customers = churn_future.result()
+
+    daily = daily_totals(order_rows)
+
+    def totals(span_window: Window) -> dict:
+        return {
+            "orders": sum_days(daily, span_window, "orders"),
+            "revenue": sum_days(daily, span_window, "revenue"),
+            "customers": sum_days(daily, span_window, "buyers"),
+            "new_customers": sum_days(daily, span_window, "new_customers"),
+            "repeat_orders": sum_days(daily, span_window, "repeat_orders"),
+        }
+
+    def spend_in(span_window: Window):
+        return sum(
+            (value or 0 for key, value in spend.items() if span_window.start_key <= key < span_window.end_key),
+            0
+        )
+
+    chart_days = {key: r for key, r in daily.items() if window.start_key <= key < window.end_key}
+
+    return {
+        "period": {"start": window.start, "end": window.end},
+        "kpis": build_kpis(totals(window), totals(previous), spend_in(window)),
+        "revenue_chart": [
+            dict(zip(REVENUE_CHART_COLUMNS, row)) for row in build_revenue_chart(db, window, chart_days)
+        ],
+        "top_products": build_top_products(db, products),
+        "top_channels": build_top_channels(db, channel_totals(order_rows, window)),
+        "alerts": build_alerts(
+            today,
+            sum_days(daily, alert_current, "revenue"),
+            sum_days(daily, alert_previous, "revenue"),
+            spend_in(alert_current),
+            spend_in(alert_previous),
+            churned,
+            total_customers
+        ),
+    }
@@ -0,0 +1,78 @@
+"""Version of the data served by the API.
+
+Every completed `refresh_after_load` records a row in etl_loads; the latest
+load_id is the data version. Responses derived from the warehouse only change
+when it does, so it keys HTTP validators (ETags). The value is polled at most
+every DATA_VERSION_POLL_SECONDS, so checking it is usually free. Each tenant
+has its own version.
+"""
+import threading
+import time
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import primary_session, tenant_database
+from ..models import DataLoad
+from ..tenancy import TenantScoped
+from ..utils.dates import to_date_key
+
+
+class DataVersion:
+    """Latest etl_loads.load_id, re-read when the poll interval elapses."""
+
+    def __init__(self):
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def cached(self) -> Optional[int]:
+        """The version if it was checked recently, else None."""
+        if self._version is not None and time.monotonic() - self._checked_at < settings.DATA_VERSION_POLL_SECONDS:
+            return self._version
+        return None
+
+    def get(self, db: Session) -> int:
+        version = self.cached()
+        if version is not None:
+            return version
+
+        with self._lock:
+            version = self.cached()
+            if version is None:
+                version = db.query(func.max(DataLoad.load_id)).scalar() or 0
+                if self._version is not None and version != self._version:
+                    # Don't serve the new version's ETags from replicas still on the old one
+                    tenant_database().replicas.invalidate()
+                self._version = version
+                self._checked_at = time.monotonic()
+        return version
+
+    def load(self) -> int:
+        """`get` with a session of its own (for middleware, outside request dependencies)."""
+        db = primary_session()
+        try:
+            return self.get(db)
+        finally:
+            db.close()
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+
+data_version = TenantScoped(DataVersion)
+
+
+def record_load(db: Session, start_date: date, end_date: date) -> int:
+    """Register a completed load, bumping the data version."""
+    load = DataLoad(start_date_key=to_date_key(start_date), end_date_key=to_date_key(end_date))
+    db.add(load)
+    db.commit()
+    data_version.invalidate()
+    # Replicas must catch up with this load before serving reads again
+    tenant_database().replicas.invalidate()
+    return load.load_id
@@ -0,0 +1,89 @@
+"""In-process cache of the small, slowly changing dimensions.
+
+Fact queries aggregate on bare ids and hydrate display attributes from here
+afterwards, so dim_channels / dim_campaigns / dim_products stay out of the
+hot GROUP BYs. Each cache polls a cheap version query (row count and latest
+updated_at) at most every DIMENSION_CACHE_POLL_SECONDS and reloads when it
+changes; `invalidate_dimensions()` forces a reload after a load. Each tenant
+has its own caches.
+"""
+import threading
+import time
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Channel, Campaign, Product
+from ..tenancy import TenantScoped
+
+
+class DimensionCache:
+    """Rows of one dimension table held in memory, keyed by id."""
+
+    def __init__(self, key, columns: list, version_column):
+        self.key = key
+        self.columns = columns
+        self.version_column = version_column
+        self._rows = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _current_version(self, db: Session) -> tuple:
+        return tuple(db.query(func.count(self.key), func.max(self.version_column)).one())
+
+    def get(self, db: Session) -> dict:
+        """All rows as {id: row}, reloading if the table changed."""
+        now = time.monotonic()
+        if self._rows is not None and now - self._checked_at < settings.DIMENSION_CACHE_POLL_SECONDS:
+            return self._rows
+
+        with self._lock:
+            if self._rows is None or now - self._checked_at >= settings.DIMENSION_CACHE_POLL_SECONDS:
+                version = self._current_version(db)
+                if self._rows is None or version != self._version:
+                    self._rows = {
+                        row[0]: row
+                        for row in db.query(self.key.label("id"), *self.columns).all()
+                    }
+                    self._version = version
+                self._checked_at = now
+        return self._rows
+
+    def ids_where(self, db: Session, **attributes) -> list:
+        """Ids of the rows whose attributes equal the given values."""
+        return [
+            row_id for row_id, row in self.get(db).items()
+            if all(getattr(row, name) == value for name, value in attributes.items())
+        ]
+
+    def invalidate(self):
+        with self._lock:
+            self._rows = None
+            self._version = None
+
+
+channels = TenantScoped(lambda: DimensionCache(
+    Channel.channel_id,
+    [Channel.channel_name, Channel.channel_group, Channel.is_paid],
+    Channel.created_at
+))
+
+campaigns = TenantScoped(lambda: DimensionCache(
+    Campaign.campaign_id,
+    [Campaign.platform, Campaign.campaign_name, Campaign.funnel_stage, Campaign.campaign_type],
+    Campaign.updated_at
+))
+
+products = TenantScoped(lambda: DimensionCache(
+    Product.product_id,
+    [Product.product_name, Product.category_level_1, Product.abc_classification, Product.margin_percent],
+    Product.updated_at
+))
+
+
+def invalidate_dimensions():
+    """Drop the current tenant's cached dimensions; called after each load."""
+    for cache in (channels, campaigns, products):
+        cache.invalidate()
@@ -0,0 +1,52 @@
+from datetime import date
+
+from sqlalchemy import func, extract, insert, select
+from sqlalchemy.orm import Session
+
+from ..models import Order, SalesHourly, DateDimension
+from ..utils.dates import to_date_key
+
+
+def refresh_hourly_sales(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_sales_hourly for every date_key in [start_date, end_date].
+
+    The range is deleted and re-aggregated from fct_orders, so reloading a
+    day (late payments, cancellations) simply replaces its rows.
+    """
+    start_key, end_key = to_date_key(start_date), to_date_key(end_date)
+
+    db.query(SalesHourly).filter(
+        SalesHourly.date_key >= start_key,
+        SalesHourly.date_key <= end_key
+    ).delete(synchronize_session=False)
+
+    hour = extract("hour", Order.order_created_at)
+
+    source = select(
+        Order.date_key,
+        hour,
+        DateDimension.day_of_week - 1,
+        Order.channel_id,
+        func.count(Order.order_id),
+        func.coalesce(func.sum(Order.total_amount), 0),
+        func.coalesce(func.sum(Order.total_quantity), 0)
+    ).join(
+        DateDimension, Order.date_key == DateDimension.date_key
+    ).where(
+        Order.date_key >= start_key,
+        Order.date_key <= end_key,
+        Order.order_status != "cancelled"
+    ).group_by(
+        Order.date_key,
+        hour,
+        DateDimension.day_of_week,
+        Order.channel_id
+    )
+
+    result = db.execute(
+        insert(SalesHourly).from_select(
+            ["date_key", "hour", "day_of_week", "channel_id", "orders", "revenue", "units"],
+            source
+        )
+    )
+    return result.rowcount
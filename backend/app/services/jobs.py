@@ -0,0 +1,342 @@
+"""Background jobs for long-running analytics requests.
+
+Routes decorated with `background_job` answer synchronously as before unless
+the request sends `Prefer: respond-async` (RFC 7240). Then they answer 202 with
+a job id, and the handler runs on a worker pool (JOB_WORKERS threads) with a
+session of its own. Its response (body, media type and status) is stored in
+the api_jobs table. Clients poll GET /api/jobs/{id} or subscribe to
+/api/jobs/{id}/events, then fetch /api/jobs/{id}/result.
+
+Jobs are deduplicated: a request with the same endpoint, parameters, tenant
+and data version as a queued, running or finished job that has not expired
+gets that job. Results are kept JOB_RESULT_TTL_SECONDS. Jobs still queued or
+running after JOB_TIMEOUT_SECONDS are treated as lost (e.g. the process
+restarted) and are submitted again on the next request.
+
+api_jobs lives in each tenant's database by default. With JOB_STORE_URL (e.g.
+a local SQLite file) one database holds every tenant's jobs; create api_jobs
+there from schema_ecommerce.sql, like every other table.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import hashlib
+import inspect
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+import orjson
+from fastapi import HTTPException, Request
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from ..config import settings
+from ..database import make_engine, read_session, tenant_database
+from ..models import Job
+from ..tenancy import TenantScoped, current_tenant
+from ..utils.responses import FastJSONResponse, dumps, fast_response
+from .coalescing import request_key
+from .live_kpis import sse_event
+
+logger = logging.getLogger(__name__)
+
+RESPOND_ASYNC = "respond-async"
+
+FINISHED = {"done", "failed"}
+
+# Seconds between expired-job purges, and between status checks of an events stream
+PURGE_SECONDS = 60
+EVENT_POLL_SECONDS = 1
+
+# Suggested polling interval for clients (Retry-After)
+RETRY_AFTER_SECONDS = 2
+
+
+def wants_async(request: Request) -> bool:
+    """The request sent `Prefer: respond-async`."""
+    preferences = request.headers.get("prefer", "").split(",")
+    return any(p.split(";")[0].strip().lower() == RESPOND_ASYNC for p in preferences)
+
+
+class JobStore:
+    """api_jobs rows in one database."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
+        self._purged_at = 0.0
+
+    def session(self) -> Session:
+        return self.SessionLocal()
+
+    def find(self, tenant: str, params_key: str) -> Optional[Job]:
+        """The live job for identical parameters (failed jobs are not reused)."""
+        with self.session() as db:
+            return db.query(Job).filter(
+                Job.tenant == tenant,
+                Job.params_key == params_key,
+                Job.expires_at > datetime.now(),
+                Job.status != "failed"
+            ).order_by(Job.created_at.desc()).first()
+
+    def get(self, tenant: str, job_id: str) -> Optional[Job]:
+        with self.session() as db:
+            return db.query(Job).filter(
+                Job.job_id == job_id,
+                Job.tenant == tenant,
+                Job.expires_at > datetime.now()
+            ).first()
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        with self.session() as db:
+            return db.query(Job.result).filter(Job.job_id == job_id).scalar()
+
+    def add(self, job: Job) -> Job:
+        with self.session() as db:
+            db.add(job)
+            db.commit()
+        return job
+
+    def update(self, job_id: str, **values):
+        with self.session() as db:
+            db.query(Job).filter(Job.job_id == job_id).update(values)
+            db.commit()
+
+    def purge(self):
+        """Delete expired jobs, at most every PURGE_SECONDS."""
+        if time.monotonic() - self._purged_at < PURGE_SECONDS:
+            return
+        self._purged_at = time.monotonic()
+        with self.session() as db:
+            db.query(Job).filter(Job.expires_at <= datetime.now()).delete()
+            db.commit()
+
+
+tenant_stores = TenantScoped(lambda: JobStore(tenant_database().engine))
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+
+def job_store() -> JobStore:
+    """JOB_STORE_URL's store, else the current tenant's database."""
+    global _shared_store
+    if not settings.JOB_STORE_URL:
+        return tenant_stores.instance()
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = JobStore(make_engine(settings.JOB_STORE_URL))
+    return _shared_store
+
+
+def as_response(result) -> Response:
+    return result if isinstance(result, Response) else fast_response(result)
+
+
+class JobQueue:
+    """Worker pool running submitted handlers and recording their responses."""
+
+    def __init__(self):
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # Per-key locks serializing lookup and creation of a job (deduplication),
+        # with the number of threads holding or waiting on each
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="job")
+        return self._pool
+
+    @contextlib.contextmanager
+    def locked(self, key):
+        """Hold the lock of one job key; requests for other keys don't wait."""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._key_locks[key]
+
+    def submit(self, endpoint: str, handler, kwargs: dict) -> Job:
+        """The live job for these parameters, else a new one queued on the pool."""
+        tenant = current_tenant()
+        params_key = hashlib.sha1(repr(request_key(endpoint, kwargs)).encode()).hexdigest()
+        params = {
+            name: value for name, value in kwargs.items()
+            if not isinstance(value, (Session, Request))
+        }
+        store = job_store()
+
+        with self.locked((tenant, params_key)):
+            job = store.find(tenant, params_key)
+            if job is None:
+                now = datetime.now()
+                job = store.add(Job(
+                    job_id=uuid.uuid4().hex,
+                    tenant=tenant,
+                    endpoint=endpoint,
+                    params=dumps(params).decode(),
+                    params_key=params_key,
+                    status="queued",
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+                ))
+                # Pool threads don't inherit context variables (the request's tenant)
+                self.pool().submit(contextvars.copy_context().run, self.run, store, job.job_id, handler, kwargs)
+
+        store.purge()
+        return job
+
+    def run(self, store: JobStore, job_id: str, handler, kwargs: dict):
+        store.update(job_id, status="running", started_at=datetime.now())
+        # The request's session closed with the 202; the job gets its own
+        db = read_session()
+        try:
+            kwargs = {name: db if isinstance(value, Session) else value for name, value in kwargs.items()}
+            response = as_response(handler(**kwargs))
+        except HTTPException as exc:
+            self.finish(store, job_id, "failed", status_code=exc.status_code, error=str(exc.detail))
+        except Exception:
+            logger.exception(f"Job {job_id} failed")
+            self.finish(store, job_id, "failed", status_code=500, error="Job failed")
+        else:
+            self.finish(
+                store, job_id, "done",
+                status_code=response.status_code,
+                media_type=response.media_type,
+                result=response.body
+            )
+        finally:
+            db.close()
+
+    def finish(self, store: JobStore, job_id: str, status: str, **values):
+        now = datetime.now()
+        store.update(
+            job_id,
+            status=status,
+            finished_at=now,
+            expires_at=now + timedelta(seconds=settings.JOB_RESULT_TTL_SECONDS),
+            **values
+        )
+
+    def shutdown(self):
+        """Stop the workers; jobs still queued expire after JOB_TIMEOUT_SECONDS."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+jobs = JobQueue()
+
+
+def find_job(job_id: str) -> Job:
+    job = job_store().get(current_tenant(), job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
+
+
+def job_status(job: Job) -> dict:
+    url = f"{settings.API_V1_PREFIX}/jobs/{job.job_id}"
+    return {
+        "job_id": job.job_id,
+        "status": job.status,
+        "endpoint": job.endpoint,
+        "params": orjson.loads(job.params) if job.params else {},
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "expires_at": job.expires_at,
+        "error": job.error,
+        "status_url": url,
+        "events_url": f"{url}/events",
+        "result_url": f"{url}/result",
+    }
+
+
+def job_response(job: Job, status_code: int = 200, **headers) -> FastJSONResponse:
+    """A job's status; never cached (it changes without a new data version)."""
+    headers = {"Cache-Control": "no-store", **headers}
+    if job.status not in FINISHED:
+        headers["Retry-After"] = str(RETRY_AFTER_SECONDS)
+    return FastJSONResponse(job_status(job), status_code=status_code, headers=headers)
+
+
+def result_response(job: Job) -> Response:
+    """The stored response of a finished job, else its status with 202."""
+    if job.status == "done":
+        return Response(job_store().result(job.job_id), status_code=job.status_code, media_type=job.media_type)
+    if job.status == "failed":
+        return FastJSONResponse({"detail": job.error}, status_code=job.status_code or 500)
+    return job_response(job, status_code=202)
+
+
+async def job_events(request: Request, job_id: str):
+    """SSE body: a `status` event on connect and on every change, until the job finishes."""
+    last_status = None
+    idle = 0.0
+    while not await request.is_disconnected():
+        job = await run_in_threadpool(job_store().get, current_tenant(), job_id)
+        if job is None:
+            yield sse_event("error", {"detail": "Job not found or expired"})
+            return
+        if job.status != last_status:
+            last_status, idle = job.status, 0.0
+            yield sse_event("status", job_status(job))
+            if job.status in FINISHED:
+                return
+        elif idle >= settings.LIVE_KEEPALIVE_SECONDS:
+            idle = 0.0
+            yield b": keep-alive\n\n"
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+        idle += EVENT_POLL_SECONDS
+
+
+def background_job(handler):
+    """Route decorator: run the handler as a background job when the request prefers it.
+
+    Apply below `@router.get` (and above `@coalesce`).
+    """
+    endpoint = f"{handler.__module__}.{handler.__qualname__}"
+    # Workers call the plain (sync) handler
+    run = inspect.unwrap(handler)
+
+    @functools.wraps(handler)
+    async def wrapper(job_request: Request, **kwargs):
+        if not wants_async(job_request):
+            if asyncio.iscoroutinefunction(handler):
+                return await handler(**kwargs)
+            return await run_in_threadpool(handler, **kwargs)
+
+        job = await run_in_threadpool(jobs.submit, endpoint, run, kwargs)
+        return job_response(
+            job,
+            status_code=202,
+            Location=f"{settings.API_V1_PREFIX}/jobs/{job.job_id}",
+            **{"Preference-Applied": RESPOND_ASYNC}
+        )
+
+    # FastAPI reads the handler's parameters plus the request
+    signature = inspect.signature(handler)
+    wrapper.__signature__ = signature.replace(parameters=[
+        *signature.parameters.values(),
+        inspect.Parameter("job_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+    ])
+    return wrapper
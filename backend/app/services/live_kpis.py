@@ -0,0 +1,158 @@
+"""Live KPI push for wallboards (Server-Sent Events).
+
+Instead of every open screen polling `/dashboard/kpis`, clients subscribe to a
+period on `/dashboard/live`. One background task watches the data version;
+when a new load lands (or the day rolls over) it computes the KPIs once per
+subscribed (tenant, period) and fans the changed fields out to every
+subscriber.
+"""
+import asyncio
+import logging
+from datetime import date
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import settings
+from ..database import read_session
+from ..tenancy import current_tenant, use_tenant
+from ..utils.periods import resolve_period
+from ..utils.responses import dumps
+from .dashboard import period_kpis
+from .data_version import data_version
+
+logger = logging.getLogger(__name__)
+
+# Events waiting per subscriber before it is considered slow and resynced
+SUBSCRIBER_QUEUE_SIZE = 8
+
+
+def compute_kpis(tenant: str, period: str) -> dict:
+    with use_tenant(tenant):
+        db = read_session()
+        try:
+            return period_kpis(db, resolve_period(period)).model_dump()
+        finally:
+            db.close()
+
+
+def kpi_changes(previous: dict, current: dict) -> dict:
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+def sse_event(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {dumps(data).decode()}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class KPIBroadcaster:
+    """Subscribers per (tenant, period), the last KPIs pushed to them, and the watcher task."""
+
+    def __init__(self):
+        self._subscribers = {}  # (tenant, period) -> set of asyncio.Queue
+        self._snapshots = {}  # (tenant, period) -> (state, kpis)
+        self._locks = {}
+        self._task = None
+
+    @staticmethod
+    async def current_state(tenant: str) -> tuple:
+        """What the tenant's KPIs depend on: its data version and the current day."""
+        version = data_version.instance(tenant).cached()
+        if version is None:
+            with use_tenant(tenant):
+                version = await run_in_threadpool(data_version.load)
+        return version, date.today()
+
+    async def snapshot(self, key: tuple, state: tuple) -> dict:
+        """KPIs for (tenant, period) at `state`, computed once however many subscribers ask."""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._snapshots.get(key)
+            if cached and cached[0] == state:
+                return cached[1]
+            kpis = await run_in_threadpool(compute_kpis, *key)
+            self._snapshots[key] = (state, kpis)
+            return kpis
+
+    async def subscribe(self, period: str) -> tuple:
+        """Register a subscriber of the current tenant; returns its key, queue and initial snapshot event."""
+        key = (current_tenant(), period)
+        state = await self.current_state(key[0])
+        kpis = await self.snapshot(key, state)
+
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(key, set()).add(queue)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.watch())
+
+        return key, queue, sse_event("snapshot", {"period": period, "kpis": kpis}, str(state[0]))
+
+    def unsubscribe(self, key: tuple, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(key)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[key]
+                self._snapshots.pop(key, None)
+                self._locks.pop(key, None)
+
+    def publish(self, key: tuple, event: bytes, resync: bytes):
+        for queue in list(self._subscribers.get(key, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow client: drop its backlog and send the full state instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(resync)
+
+    async def watch(self):
+        """Poll the data version while anyone is subscribed; push deltas on change."""
+        while self._subscribers:
+            await asyncio.sleep(settings.DATA_VERSION_POLL_SECONDS)
+            states = {}
+            for key in list(self._subscribers):
+                tenant, period = key
+                try:
+                    if tenant not in states:
+                        states[tenant] = await self.current_state(tenant)
+                    state = states[tenant]
+                    previous = self._snapshots.get(key)
+                    if previous is None or previous[0] == state:
+                        continue
+                    kpis = await self.snapshot(key, state)
+                    changes = kpi_changes(previous[1], kpis)
+                    if changes:
+                        self.publish(
+                            key,
+                            sse_event("delta", {"period": period, "changes": changes}, str(state[0])),
+                            sse_event("snapshot", {"period": period, "kpis": kpis}, str(state[0]))
+                        )
+                except Exception:
+                    logger.exception(f"Live KPI refresh failed for tenant {tenant}")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+broadcaster = KPIBroadcaster()
+
+
+async def kpi_stream(request, period: str):
+    """SSE body: a snapshot, then deltas, with keep-alive comments in between."""
+    key, queue, first = await broadcaster.subscribe(period)
+    try:
+        yield first
+        while not await request.is_disconnected():
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=settings.LIVE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+    finally:
+        broadcaster.unsubscribe(key, queue)
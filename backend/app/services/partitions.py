@@ -0,0 +1,163 @@
+"""Monthly RANGE partitions on date_key for the large fact tables (MySQL).
+
+schema_ecommerce.sql declares fct_orders, fct_order_items, fct_ad_spend and
+fct_sessions with a single catch-all `p_future` partition. Maintenance keeps
+one partition per month:
+
+- `ensure_partitions` splits p_future into monthly partitions pYYYYMM up to
+  PARTITION_MONTHS_AHEAD months past the current one, so loads land in a
+  monthly partition and a 30-day query touches one or two of them;
+- `expire_partitions` removes months older than PARTITION_RETENTION_MONTHS
+  (0 keeps all history). With PARTITION_ARCHIVE, each month is first swapped
+  into a plain `<table>_archive_YYYYMM` table (EXCHANGE PARTITION is a
+  metadata operation), so nothing is deleted row by row. Each step can be
+  re-run after a failed run. The expired months' rows in fct_order_keys are
+  deleted with the fct_orders partition, so those orders can be loaded again.
+
+Other databases (e.g. SQLite in development) have no partitions; maintenance
+is skipped for them.
+"""
+import logging
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..utils.dates import add_months, months_between, next_month, to_date_key
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ["fct_orders", "fct_order_items", "fct_ad_spend", "fct_sessions"]
+
+FUTURE_PARTITION = "p_future"
+
+PARTITIONS_SQL = text("""
+    SELECT PARTITION_NAME
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+""")
+
+
+def partitioning_supported(db: Session) -> bool:
+    return db.get_bind().dialect.name == "mysql"
+
+
+def partition_name(month: int) -> str:
+    return f"p{month}"
+
+
+def month_definition(month: int) -> str:
+    """Partition holding the YYYYMM month's date_keys."""
+    return f"PARTITION {partition_name(month)} VALUES LESS THAN ({next_month(month) * 100 + 1})"
+
+
+def monthly_partitions(db: Session, table: str) -> Optional[dict]:
+    """YYYYMM -> partition name for the table's monthly partitions; None if it has no p_future."""
+    rows = db.execute(PARTITIONS_SQL, {"table": table}).all()
+    if FUTURE_PARTITION not in {r.PARTITION_NAME for r in rows}:
+        return None
+    return {
+        int(r.PARTITION_NAME[1:]): r.PARTITION_NAME
+        for r in rows
+        if r.PARTITION_NAME != FUTURE_PARTITION
+    }
+
+
+def ensure_partitions(db: Session, table: str, current_month: int, through_month: int) -> list:
+    """Split p_future into monthly partitions up to through_month (YYYYMM); returns the months added."""
+    existing = monthly_partitions(db, table)
+    if existing is None:
+        logger.warning(f"{table} is not partitioned by month; see schema_ecommerce.sql")
+        return []
+
+    if existing:
+        first_month = next_month(max(existing))
+    else:
+        # First run: start at the oldest month with data (its partition also holds anything older)
+        oldest = db.execute(text(f"SELECT MIN(date_key) FROM {table}")).scalar()
+        first_month = min(oldest // 100, current_month) if oldest else current_month
+
+    months = months_between(first_month * 100 + 1, through_month * 100 + 1)
+    if not months:
+        return []
+
+    definitions = [month_definition(month) for month in months]
+    definitions.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+    db.execute(text(
+        f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(definitions)})"
+    ))
+    return months
+
+
+def table_partitioned(db: Session, table: str) -> bool:
+    return bool(db.execute(PARTITIONS_SQL, {"table": table}).first())
+
+
+def has_rows(db: Session, source: str) -> bool:
+    return db.execute(text(f"SELECT 1 FROM {source} LIMIT 1")).first() is not None
+
+
+def archive_partition(db: Session, table: str, month: int) -> str:
+    """Swap a month's partition into `<table>_archive_YYYYMM`.
+
+    Safe to re-run after a failure at any step: the archive table is reused,
+    and a month already swapped in (archive filled, partition empty) is not
+    exchanged again.
+    """
+    archive = f"{table}_archive_{month}"
+    partition = f"{table} PARTITION ({partition_name(month)})"
+
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {archive} LIKE {table}"))
+    if table_partitioned(db, archive):
+        db.execute(text(f"ALTER TABLE {archive} REMOVE PARTITIONING"))
+
+    if has_rows(db, archive):
+        if has_rows(db, partition):
+            raise RuntimeError(f"{archive} and partition {partition_name(month)} of {table} both hold rows")
+        logger.info(f"{table} {month} already swapped into {archive}")
+    else:
+        db.execute(text(f"ALTER TABLE {table} EXCHANGE PARTITION {partition_name(month)} WITH TABLE {archive}"))
+    return archive
+
+
+def expire_partitions(db: Session, table: str, keep_from_month: int, archive: bool) -> list:
+    """Drop (optionally archiving first) the monthly partitions before keep_from_month; returns the months removed."""
+    existing = monthly_partitions(db, table) or {}
+    expired = [month for month in sorted(existing) if month < keep_from_month]
+
+    for month in expired:
+        if archive:
+            archived = archive_partition(db, table, month)
+            logger.info(f"Archived {table} {month} into {archived}")
+        db.execute(text(f"ALTER TABLE {table} DROP PARTITION {partition_name(month)}"))
+        if table == "fct_orders":
+            # DROP PARTITION skips trg_fct_orders_key_delete
+            db.execute(
+                text("DELETE FROM fct_order_keys WHERE date_key BETWEEN :first AND :last"),
+                {"first": month * 100 + 1, "last": month * 100 + 31}
+            )
+    return expired
+
+
+def maintain_partitions(db: Session, today: Optional[date] = None) -> dict:
+    """Create partitions ahead and expire old ones for every partitioned fact table."""
+    if not partitioning_supported(db):
+        logger.info("Database does not support partitions; skipping maintenance")
+        return {}
+
+    current_month = to_date_key(today or date.today()) // 100
+    through_month = add_months(current_month, settings.PARTITION_MONTHS_AHEAD)
+    keep_from_month = None
+    if settings.PARTITION_RETENTION_MONTHS > 0:
+        keep_from_month = add_months(current_month, 1 - settings.PARTITION_RETENTION_MONTHS)
+
+    changes = {}
+    for table in PARTITIONED_TABLES:
+        created = ensure_partitions(db, table, current_month, through_month)
+        expired = expire_partitions(db, table, keep_from_month, settings.PARTITION_ARCHIVE) if keep_from_month else []
+        changes[table] = {"created": created, "expired": expired}
+        logger.info(f"Partitions of {table}: {len(created)} created, {len(expired)} expired")
+    return changes
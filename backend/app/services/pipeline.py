@@ -0,0 +1,74 @@
+"""Post-load refresh of the aggregate tables served by the API.
+
+The ETL calls `refresh_after_load` (or `scripts/refresh_rollups.py`) with the
+date range it just (re)loaded; each step rebuilds only that range.
+"""
+import logging
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from .hourly_sales import refresh_hourly_sales
+from .product_sales import refresh_product_sales
+from .dimension_cache import invalidate_dimensions
+from .data_version import record_load
+from .snapshots import export_snapshots
+from .abc_classification import refresh_abc_classification
+from .attribution import refresh_attribution
+from .campaign_daily import refresh_campaign_daily
+from .stock_snapshot import refresh_stock_snapshot
+from .session_rollups import (
+    refresh_session_funnel, refresh_landing_pages,
+    refresh_session_traffic, refresh_session_devices, refresh_session_geo
+)
+
+logger = logging.getLogger(__name__)
+
+# Steps run in order; product-level steps read fct_product_sales_daily and
+# fct_campaign_daily reads fct_attribution
+REFRESH_STEPS = [
+    ("fct_sales_hourly", refresh_hourly_sales),
+    ("fct_product_sales_daily", refresh_product_sales),
+    ("fct_stock_snapshot", refresh_stock_snapshot),
+    ("dim_products.abc_classification", refresh_abc_classification),
+    ("fct_attribution", refresh_attribution),
+    ("fct_campaign_daily", refresh_campaign_daily),
+    ("fct_session_funnel_daily", refresh_session_funnel),
+    ("fct_landing_page_daily", refresh_landing_pages),
+    ("fct_session_traffic_daily", refresh_session_traffic),
+    ("fct_session_device_daily", refresh_session_devices),
+    ("fct_session_geo_daily", refresh_session_geo),
+]
+
+
+def refresh_after_load(db: Session, start_date: date, end_date: date) -> dict:
+    """Run every refresh step for the loaded range, committing after each one."""
+    refreshed = {}
+
+    for table, step in REFRESH_STEPS:
+        try:
+            refreshed[table] = step(db, start_date, end_date)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception(f"Refresh of {table} failed for {start_date} to {end_date}")
+            raise
+
+        logger.info(f"Refreshed {table}: {refreshed[table]} rows ({start_date} to {end_date})")
+
+    # Loads may add campaigns/products and the ABC step rewrites products
+    invalidate_dimensions()
+
+    # New data version: cached HTTP responses (ETags) go stale
+    load_id = record_load(db, start_date, end_date)
+    logger.info(f"Recorded load {load_id} ({start_date} to {end_date})")
+
+    # Snapshots are optional: on failure the API keeps reading the database
+    try:
+        exported = export_snapshots(db, start_date, end_date, load_id)
+        if exported:
+            logger.info(f"Exported {exported} rows to Parquet snapshots")
+    except Exception:
+        logger.exception(f"Snapshot export failed for {start_date} to {end_date}")
+
+    return refreshed
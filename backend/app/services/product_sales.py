@@ -0,0 +1,76 @@
+from datetime import date
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from ..models import Order, OrderItem, ProductSalesDaily
+from ..utils.dates import from_date_key
+from ..utils.periods import Window
+
+
+def refresh_product_sales(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_product_sales_daily for every date_key in [start_date, end_date]."""
+    window = Window(start_date, end_date)
+
+    db.query(ProductSalesDaily).filter(
+        ProductSalesDaily.date_key >= window.start_key,
+        ProductSalesDaily.date_key < window.end_key
+    ).delete(synchronize_session=False)
+
+    source = select(
+        OrderItem.date_key,
+        OrderItem.product_id,
+        func.coalesce(func.sum(OrderItem.quantity), 0),
+        func.coalesce(func.sum(OrderItem.total_price), 0),
+        func.coalesce(func.sum(OrderItem.gross_margin), 0),
+        func.count(func.distinct(OrderItem.order_id))
+    ).join(
+        # Items carry their order's date_key; joining on it keeps the lookup in one partition
+        Order, (OrderItem.order_id == Order.order_id) & (OrderItem.date_key == Order.date_key)
+    ).where(
+        OrderItem.date_key >= window.start_key,
+        OrderItem.date_key < window.end_key,
+        Order.order_status != "cancelled"
+    ).group_by(
+        OrderItem.date_key,
+        OrderItem.product_id
+    )
+
+    result = db.execute(
+        insert(ProductSalesDaily).from_select(
+            ["date_key", "product_id", "units", "revenue", "gross_margin", "orders"],
+            source
+        )
+    )
+    return result.rowcount
+
+
+def latest_sales_date(db: Session) -> date:
+    """Latest day in fct_product_sales_daily (at most today; today if empty).
+
+    Snapshots of current state anchor their trailing windows here rather than
+    at the end of the range just loaded, which is in the past for a backfill.
+    """
+    latest = db.query(func.max(ProductSalesDaily.date_key)).scalar()
+    today = date.today()
+    return min(from_date_key(latest), today) if latest else today
+
+
+def product_totals(window: Window):
+    """Select per-product totals over the window from the rollup.
+
+    Only product_id is grouped on; callers resolve product attributes
+    (name, category, margin) after aggregation.
+    """
+    return select(
+        ProductSalesDaily.product_id,
+        func.sum(ProductSalesDaily.units).label("units_sold"),
+        func.sum(ProductSalesDaily.revenue).label("revenue"),
+        func.sum(ProductSalesDaily.gross_margin).label("gross_margin"),
+        func.sum(ProductSalesDaily.orders).label("orders")
+    ).where(
+        ProductSalesDaily.date_key >= window.start_key,
+        ProductSalesDaily.date_key < window.end_key
+    ).group_by(
+        ProductSalesDaily.product_id
+    )
@@ -0,0 +1,146 @@
+"""Vectorized product trend detection.
+
+Per-product daily revenue for the whole window is read from
+fct_product_sales_daily in a single range scan and laid out as a (products x days) matrix. Change, slope and
+acceleration are then computed for every product at once with NumPy, and the
+trending/declining sets are picked with a partial sort.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from ..models import ProductSalesDaily
+from ..utils.dates import to_date_key, from_date_key
+from ..utils.lazy import lazy_import
+
+# Imported on first use (see utils/lazy.py)
+np = lazy_import("numpy")
+
+
+def load_daily_product_revenue(db: Session, start_date: date, days: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (product_ids, revenue matrix) for `days` consecutive days from start_date.
+
+    Row i of the matrix holds the daily revenue of product_ids[i]; days without
+    sales are zero.
+    """
+    end_date = start_date + timedelta(days=days - 1)
+
+    rows = db.query(
+        ProductSalesDaily.product_id,
+        ProductSalesDaily.date_key,
+        ProductSalesDaily.revenue
+    ).filter(
+        ProductSalesDaily.date_key >= to_date_key(start_date),
+        ProductSalesDaily.date_key <= to_date_key(end_date)
+    ).all()
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.zeros((0, days))
+
+    product_col = np.fromiter((r.product_id for r in rows), dtype=np.int64, count=len(rows))
+    day_col = np.fromiter(
+        ((from_date_key(r.date_key) - start_date).days for r in rows),
+        dtype=np.int64,
+        count=len(rows)
+    )
+    revenue_col = np.fromiter((float(r.revenue or 0) for r in rows), dtype=np.float64, count=len(rows))
+
+    product_ids, product_idx = np.unique(product_col, return_inverse=True)
+    matrix = np.zeros((len(product_ids), days))
+    np.add.at(matrix, (product_idx, day_col), revenue_col)
+
+    return product_ids, matrix
+
+
+def compute_trends(
+    matrix: np.ndarray,
+    recent_days: int,
+    baseline_days: int,
+    buckets: int = 4
+) -> dict[str, np.ndarray]:
+    """Compute trend metrics for every row of a (products x days) revenue matrix.
+
+    The last `recent_days` columns are compared with the `baseline_days` before
+    them on a per-day basis, so windows of different length (e.g. last 7d vs
+    previous 28d) are comparable. Slope and acceleration are fitted over
+    `buckets` equal-width buckets spanning both windows.
+    """
+    window = matrix[:, -(recent_days + baseline_days):]
+    baseline = window[:, :baseline_days].sum(axis=1)
+    recent = window[:, baseline_days:].sum(axis=1)
+
+    baseline_rate = baseline / baseline_days
+    recent_rate = recent / recent_days
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = np.where(
+            baseline_rate > 0,
+            (recent_rate - baseline_rate) / baseline_rate * 100,
+            np.where(recent_rate > 0, 100.0, 0.0)  # New product
+        )
+
+    # Bucketed series: bucket revenue expressed per day so uneven splits compare fairly
+    buckets = max(1, min(buckets, window.shape[1]))
+    edges = np.linspace(0, window.shape[1], buckets + 1).astype(int)
+    series = np.add.reduceat(window, edges[:-1], axis=1) / np.diff(edges)
+
+    if buckets > 1:
+        x = np.arange(buckets) - (buckets - 1) / 2
+        slope = series @ x / (x @ x)
+    else:
+        slope = np.zeros(len(window))
+
+    if buckets > 2:
+        acceleration = np.diff(series, n=2, axis=1).mean(axis=1)
+    else:
+        acceleration = np.zeros(len(window))
+
+    return {
+        "baseline_revenue": baseline,
+        "recent_revenue": recent,
+        "change_percent": change,
+        "slope": slope,
+        "acceleration": acceleration
+    }
+
+
+def top_k(values: np.ndarray, mask: np.ndarray, k: int, descending: bool = True) -> np.ndarray:
+    """Indices of the k largest (or smallest) values where mask is set, in order."""
+    candidates = np.flatnonzero(mask)
+    if len(candidates) == 0 or k <= 0:
+        return candidates[:0]
+
+    keys = -values[candidates] if descending else values[candidates]
+    if len(candidates) > k:
+        part = np.argpartition(keys, k - 1)[:k]
+        candidates, keys = candidates[part], keys[part]
+
+    return candidates[np.argsort(keys, kind="stable")]
+
+
+def detect_trends(
+    db: Session,
+    end_date: date,
+    recent_days: int,
+    baseline_days: int,
+    buckets: int = 4,
+    threshold: float = 20,
+    limit: int = 10
+) -> dict:
+    """Return product ids and metrics for the trending and declining sets."""
+    start_date = end_date - timedelta(days=recent_days + baseline_days - 1)
+    product_ids, matrix = load_daily_product_revenue(db, start_date, recent_days + baseline_days)
+    metrics = compute_trends(matrix, recent_days, baseline_days, buckets)
+
+    change = metrics["change_percent"]
+    trending = top_k(change, change >= threshold, limit, descending=True)
+    declining = top_k(change, change <= -threshold, limit, descending=False)
+
+    return {
+        "product_ids": product_ids,
+        "metrics": metrics,
+        "trending": trending,
+        "declining": declining
+    }
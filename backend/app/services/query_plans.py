@@ -0,0 +1,213 @@
+"""EXPLAIN-based query plan checks and index suggestions (MySQL).
+
+`capture_queries` records every SELECT the app issues while a block runs (a
+SQLAlchemy cursor event), `explain` runs EXPLAIN FORMAT=JSON for one of them
+and `summarize_plan` reduces the JSON to what we track: per table the access
+type, index, rows examined and partitions read; per query whether it needs a
+filesort or a temporary table.
+
+On top of a summary:
+
+- `plan_issues` flags full table/index scans over at least `min_rows` rows,
+  filesorts and temporary tables;
+- `suggest_indexes` proposes a composite index for each flagged table from its
+  condition (equality columns, then range columns, then ORDER BY columns),
+  widened to a covering index while it stays narrow;
+- `plan_regressions` compares the plan with its recorded baseline.
+
+scripts/check_query_plans.py runs this over every API route.
+"""
+import hashlib
+import json
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# MySQL access types, best to worst
+ACCESS_TYPES = [
+    "system", "const", "eq_ref", "ref", "fulltext", "ref_or_null", "index_merge",
+    "unique_subquery", "index_subquery", "range", "index", "ALL",
+]
+FULL_SCANS = {"index", "ALL"}
+
+# Widest index proposed as covering; past this only the filter/sort columns are suggested
+MAX_COVERING_COLUMNS = 6
+
+# `schema`.`table`.`column` <op> in an attached_condition (schema optional)
+CONDITION_COLUMN_RE = re.compile(
+    r"(?:`\w+`\.)?`(\w+)`\.`(\w+)`\s*(<=>|<>|!=|>=|<=|=|<|>|between|in|like|is)",
+    re.IGNORECASE
+)
+EQUALITY_OPERATORS = {"=", "<=>", "is"}
+
+SELECT_RE = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+# Bound IN lists, whatever their length
+IN_LIST_RE = re.compile(r"\bIN \((?:%s|%\(\w+\)s)(?:, (?:%s|%\(\w+\)s))*\)", re.IGNORECASE)
+
+
+def fingerprint(statement: str) -> str:
+    """Stable id for a query shape: whitespace and IN-list lengths normalized."""
+    normalized = re.sub(r"\s+", " ", statement).strip()
+    normalized = IN_LIST_RE.sub("IN (...)", normalized)
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+@contextmanager
+def capture_queries():
+    """Collect (statement, parameters) of the SELECTs executed inside the block."""
+    queries = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        if not executemany and SELECT_RE.match(statement):
+            queries.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        yield queries
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+
+def explain(connection, statement: str, parameters) -> dict:
+    return json.loads(connection.exec_driver_sql(f"EXPLAIN FORMAT=JSON {statement}", parameters).scalar())
+
+
+def summarize_plan(plan: dict) -> dict:
+    tables = []
+    flags = {"filesort": False, "temporary": False}
+
+    def walk(node):
+        if isinstance(node, list):
+            for value in node:
+                walk(value)
+            return
+        if not isinstance(node, dict):
+            return
+        if node.get("using_filesort"):
+            flags["filesort"] = True
+        if node.get("using_temporary_table"):
+            flags["temporary"] = True
+        table = node.get("table")
+        if isinstance(table, dict) and "access_type" in table:
+            tables.append({
+                "table": table.get("table_name"),
+                "access_type": table["access_type"],
+                "key": table.get("key"),
+                "rows": table.get("rows_examined_per_scan", 0),
+                "partitions": len(table["partitions"]) if "partitions" in table else None,
+                "condition": table.get("attached_condition"),
+                "used_columns": table.get("used_columns", []),
+            })
+        for value in node.values():
+            walk(value)
+
+    walk(plan)
+    return {"tables": tables, **flags}
+
+
+def access_rank(access_type: str) -> int:
+    return ACCESS_TYPES.index(access_type) if access_type in ACCESS_TYPES else len(ACCESS_TYPES)
+
+
+def baseline_entry(summary: dict) -> dict:
+    """The part of a summary recorded in the baseline (independent of data volume)."""
+    return {
+        "tables": [
+            {"table": t["table"], "access_type": t["access_type"], "key": t["key"]}
+            for t in summary["tables"]
+        ],
+        "filesort": summary["filesort"],
+        "temporary": summary["temporary"],
+    }
+
+
+def is_full_scan(table: dict, min_rows: int) -> bool:
+    return table["access_type"] in FULL_SCANS and (table["rows"] or 0) >= min_rows
+
+
+def plan_issues(summary: dict, min_rows: int) -> list:
+    issues = []
+    for t in summary["tables"]:
+        if is_full_scan(t, min_rows):
+            kind = "index" if t["access_type"] == "index" else "table"
+            issues.append(f"full {kind} scan on {t['table']} (~{t['rows']} rows)")
+    if summary["filesort"]:
+        issues.append("filesort")
+    if summary["temporary"]:
+        issues.append("temporary table")
+    return issues
+
+
+def condition_columns(condition: str, table: str) -> tuple:
+    """Equality and range columns of `table` in an attached_condition, in order of appearance."""
+    equality, ranges = [], []
+    for table_name, column, operator in CONDITION_COLUMN_RE.findall(condition or ""):
+        if table_name != table:
+            continue
+        target = equality if operator.lower() in EQUALITY_OPERATORS else ranges
+        if column not in equality and column not in ranges:
+            target.append(column)
+    return equality, ranges
+
+
+def order_by_columns(statement: str, table: str) -> list:
+    match = re.search(r"\bORDER BY (.+?)(?:\bLIMIT\b|$)", re.sub(r"\s+", " ", statement), re.IGNORECASE)
+    if not match:
+        return []
+    columns = []
+    for part in match.group(1).split(","):
+        column = re.match(rf"\s*`?{table}`?\.`?(\w+)`?", part)
+        if column and column.group(1) not in columns:
+            columns.append(column.group(1))
+    return columns
+
+
+def suggest_indexes(summary: dict, statement: str, min_rows: int) -> list:
+    """CREATE INDEX statements for the flagged tables (heuristic; review before applying)."""
+    single_table = len(summary["tables"]) == 1
+    suggestions = []
+
+    for t in summary["tables"]:
+        sorts_here = summary["filesort"] and single_table
+        if not is_full_scan(t, min_rows) and not sorts_here:
+            continue
+
+        equality, ranges = condition_columns(t["condition"], t["table"])
+        columns = equality + ranges
+        if sorts_here and not ranges:
+            columns += [c for c in order_by_columns(statement, t["table"]) if c not in columns]
+        if not columns:
+            continue
+
+        covering = columns + [c for c in t["used_columns"] if c not in columns]
+        if len(covering) <= MAX_COVERING_COLUMNS:
+            columns = covering
+
+        name = f"idx_{'_'.join(columns)}"[:64]
+        suggestions.append(f"CREATE INDEX {name} ON {t['table']} ({', '.join(columns)})")
+    return suggestions
+
+
+def plan_regressions(baseline: dict, summary: dict) -> list:
+    """Ways the plan got worse than the baseline: access type, lost index, new filesort/temporary."""
+    regressions = []
+    previous = {}
+    for t in baseline["tables"]:
+        previous.setdefault(t["table"], t)
+
+    for t in summary["tables"]:
+        old = previous.get(t["table"])
+        if old is None:
+            continue
+        if access_rank(t["access_type"]) > access_rank(old["access_type"]):
+            regressions.append(f"{t['table']}: access {old['access_type']} -> {t['access_type']}")
+        if old["key"] and not t["key"]:
+            regressions.append(f"{t['table']}: no longer uses index {old['key']}")
+
+    for flag, label in (("filesort", "filesort"), ("temporary", "temporary table")):
+        if summary[flag] and not baseline[flag]:
+            regressions.append(f"new {label}")
+    return regressions
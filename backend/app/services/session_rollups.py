@@ -0,0 +1,101 @@
+"""Daily rollups of fct_sessions.
+
+Session volume is far larger than order volume, so the API never scans
+fct_sessions; each rollup is rebuilt for the reloaded date range only.
+"""
+from datetime import date
+
+from sqlalchemy import func, case, insert, select
+from sqlalchemy.orm import Session
+
+from ..models import (
+    Session as WebSession, SessionFunnelDaily, LandingPageDaily,
+    SessionTrafficDaily, SessionDeviceDaily, SessionGeoDaily
+)
+from ..utils.dates import to_date_key
+
+
+def flag_count(column):
+    """Count of sessions where a boolean flag is set."""
+    return func.coalesce(func.sum(case((column == True, 1), else_=0)), 0)
+
+
+FUNNEL_MEASURES = {
+    "sessions": func.count(WebSession.session_id),
+    "add_to_cart": flag_count(WebSession.did_add_to_cart),
+    "begin_checkout": flag_count(WebSession.did_begin_checkout),
+    "purchases": flag_count(WebSession.did_purchase),
+}
+
+ENGAGEMENT_MEASURES = {
+    "sessions": func.count(WebSession.session_id),
+    "engaged_sessions": flag_count(WebSession.is_engaged),
+    "duration_seconds": func.coalesce(func.sum(WebSession.session_duration_seconds), 0),
+    "pageviews": func.coalesce(func.sum(WebSession.pageviews), 0),
+    "purchases": flag_count(WebSession.did_purchase),
+}
+
+
+def rebuild_daily(db: Session, rollup, start_date: date, end_date: date, dimensions: list, measures: dict) -> int:
+    """Replace the rollup's rows in [start_date, end_date] with a fresh GROUP BY of fct_sessions."""
+    start_key, end_key = to_date_key(start_date), to_date_key(end_date)
+
+    db.query(rollup).filter(
+        rollup.date_key >= start_key,
+        rollup.date_key <= end_key
+    ).delete(synchronize_session=False)
+
+    group_by = [WebSession.date_key] + [getattr(WebSession, d) for d in dimensions]
+
+    source = select(
+        *group_by, *measures.values()
+    ).where(
+        WebSession.date_key >= start_key,
+        WebSession.date_key <= end_key
+    ).group_by(*group_by)
+
+    result = db.execute(
+        insert(rollup).from_select(["date_key", *dimensions, *measures.keys()], source)
+    )
+    return result.rowcount
+
+
+def refresh_session_funnel(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_session_funnel_daily (date x channel x device)."""
+    return rebuild_daily(
+        db, SessionFunnelDaily, start_date, end_date,
+        ["channel_id", "device_category"], FUNNEL_MEASURES
+    )
+
+
+def refresh_landing_pages(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_landing_page_daily (date x landing page)."""
+    measures = dict(FUNNEL_MEASURES, engaged_sessions=flag_count(WebSession.is_engaged))
+    return rebuild_daily(
+        db, LandingPageDaily, start_date, end_date,
+        ["landing_page"], measures
+    )
+
+
+def refresh_session_traffic(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_session_traffic_daily (date x channel x source/medium)."""
+    return rebuild_daily(
+        db, SessionTrafficDaily, start_date, end_date,
+        ["channel_id", "source", "medium"], ENGAGEMENT_MEASURES
+    )
+
+
+def refresh_session_devices(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_session_device_daily (date x device x browser x OS)."""
+    return rebuild_daily(
+        db, SessionDeviceDaily, start_date, end_date,
+        ["device_category", "browser", "operating_system"], ENGAGEMENT_MEASURES
+    )
+
+
+def refresh_session_geo(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_session_geo_daily (date x country x region)."""
+    return rebuild_daily(
+        db, SessionGeoDaily, start_date, end_date,
+        ["country", "region"], ENGAGEMENT_MEASURES
+    )
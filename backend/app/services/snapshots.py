@@ -0,0 +1,224 @@
+"""Parquet snapshots of the large fact tables, queried in-process with DuckDB.
+
+Optional: enabled when SNAPSHOT_DIR is set and duckdb is installed. After each
+load the pipeline re-exports the months it touched of fct_orders,
+fct_order_items, fct_ad_spend and fct_attribution as
+
+    SNAPSHOT_DIR/<table>/month=YYYYMM/data.parquet
+
+and records the load_id and the exported months in SNAPSHOT_DIR/manifest.json.
+Wide-window router queries call `fetch`, which runs them with DuckDB over the
+files when the snapshot matches the current data version and covers the
+window, and returns None otherwise so the caller falls back to MySQL.
+"""
+import importlib.util
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Numeric, select
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Order, OrderItem, AdSpend, Attribution
+from ..tenancy import DEFAULT_TENANT, TenantScoped, current_tenant
+from ..utils.dates import months_between, to_date_key
+from ..utils.lazy import lazy_import
+from ..utils.periods import Window
+from .data_version import data_version
+
+# Imported on first use (see utils/lazy.py)
+duckdb = lazy_import("duckdb")
+pd = lazy_import("pandas")
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLES = {
+    "fct_orders": Order,
+    "fct_order_items": OrderItem,
+    "fct_ad_spend": AdSpend,
+    "fct_attribution": Attribution,
+}
+
+MANIFEST_FILE = "manifest.json"
+
+
+def snapshot_dir() -> str:
+    """The current tenant's snapshot directory (SNAPSHOT_DIR/<tenant> for tenants other than the default)."""
+    tenant = current_tenant()
+    return settings.SNAPSHOT_DIR if tenant == DEFAULT_TENANT else os.path.join(settings.SNAPSHOT_DIR, tenant)
+
+
+def snapshots_enabled() -> bool:
+    return bool(settings.SNAPSHOT_DIR) and importlib.util.find_spec("duckdb") is not None
+
+
+def read_manifest() -> dict:
+    path = os.path.join(snapshot_dir(), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"load_id": None, "months": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def clear_manifest():
+    """Forget every exported month, e.g. after the database is reseeded; the next export starts over."""
+    path = os.path.join(snapshot_dir(), MANIFEST_FILE)
+    if os.path.exists(path):
+        os.remove(path)
+    invalidate()
+
+
+def write_atomically(path: str, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def snapshot_columns(model) -> str:
+    """Select list that keeps DECIMAL columns exact (pandas holds them as objects)."""
+    columns = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, Numeric) and column.type.scale is not None:
+            columns.append(
+                f'CAST("{column.name}" AS DECIMAL({column.type.precision}, {column.type.scale})) AS "{column.name}"'
+            )
+        else:
+            columns.append(f'"{column.name}"')
+    return ", ".join(columns)
+
+
+def month_filter(window: Window) -> tuple:
+    """SQL condition and params restricting a snapshot query to the window's partitions."""
+    return (
+        "month BETWEEN ? AND ? AND date_key >= ? AND date_key < ?",
+        [window.start_key // 100, (window.end_key - 1) // 100, window.start_key, window.end_key]
+    )
+
+
+def export_month(db: Session, connection, table: str, model, month: int):
+    result = db.execute(
+        select(model.__table__).where(
+            model.date_key >= month * 100,
+            model.date_key < (month + 1) * 100
+        )
+    )
+    frame = pd.DataFrame.from_records(result.all(), columns=list(result.keys()))
+    connection.register("month_rows", frame)
+    try:
+        path = os.path.join(snapshot_dir(), table, f"month={month}", "data.parquet")
+        write_atomically(
+            path,
+            lambda tmp: connection.execute(
+                f"COPY (SELECT {snapshot_columns(model)} FROM month_rows) TO '{tmp}' (FORMAT PARQUET)"
+            )
+        )
+    finally:
+        connection.unregister("month_rows")
+    return len(frame)
+
+
+def export_snapshots(db: Session, start_date: date, end_date: date, load_id: int) -> int:
+    """Re-export the months touched by [start_date, end_date] and stamp the manifest with load_id."""
+    if not snapshots_enabled():
+        return 0
+
+    manifest = read_manifest()
+    months = months_between(to_date_key(start_date), to_date_key(end_date))
+    exported = 0
+
+    connection = duckdb.connect()
+    try:
+        for table, model in SNAPSHOT_TABLES.items():
+            for month in months:
+                exported += export_month(db, connection, table, model, month)
+            manifest["months"][table] = sorted(set(manifest["months"].get(table, [])) | set(months))
+    finally:
+        connection.close()
+
+    manifest["load_id"] = load_id
+
+    def write_manifest(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+
+    write_atomically(os.path.join(snapshot_dir(), MANIFEST_FILE), write_manifest)
+    invalidate()
+    return exported
+
+
+class SnapshotReader:
+    """Per-thread DuckDB connections with a view per snapshot table."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    self._manifest = read_manifest()
+        return self._manifest
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = duckdb.connect()
+            for table in SNAPSHOT_TABLES:
+                pattern = os.path.join(snapshot_dir(), table, "*", "*.parquet")
+                connection.execute(
+                    f"CREATE VIEW {table} AS "
+                    f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+                )
+            self._local.connection = connection
+        return connection
+
+    def covers(self, tables: list, window: Window) -> bool:
+        """Snapshot is at the current data version and has every month of the window."""
+        version = data_version.load()
+        manifest = self.manifest()
+        if manifest["load_id"] != version:
+            # The pipeline (usually another process) may have re-exported since we read it
+            self.invalidate()
+            manifest = self.manifest()
+        if manifest["load_id"] != version:
+            return False
+        needed = set(months_between(window.start_key, window.end_key - 1))
+        return all(needed <= set(manifest["months"].get(table, [])) for table in tables)
+
+    def invalidate(self):
+        with self._lock:
+            self._manifest = None
+
+
+reader = TenantScoped(SnapshotReader)
+
+
+def invalidate():
+    reader.invalidate()
+
+
+def fetch(tables: list, window: Window, sql: str, params: list) -> Optional[list]:
+    """Run `sql` on the snapshot if it is fresh and covers the window, else None.
+
+    `sql` may use the `month` partition column to prune files; rows come back
+    as named tuples like SQLAlchemy rows.
+    """
+    if not snapshots_enabled():
+        return None
+    try:
+        if not reader.covers(tables, window):
+            return None
+        cursor = reader.connection().execute(sql, params)
+        Row = namedtuple("Row", [column[0] for column in cursor.description])
+        return [Row(*values) for values in cursor.fetchall()]
+    except Exception:
+        logger.exception("Snapshot query failed; falling back to the database")
+        return None
@@ -0,0 +1,76 @@
+from datetime import date, timedelta
+
+from sqlalchemy import func, case, insert, select, delete, literal
+from sqlalchemy.orm import Session
+
+from ..models import Product, ProductSalesDaily, StockSnapshot
+from ..utils.dates import to_date_key
+from .product_sales import latest_sales_date
+
+VELOCITY_DAYS = 30
+
+# Upper bounds (in days of stock) for each status; anything above is overstock
+STATUS_THRESHOLDS = [("critical", 7), ("low", 14), ("healthy", 60)]
+
+
+def refresh_stock_snapshot(db: Session, start_date: date, end_date: date) -> int:
+    """Rebuild fct_stock_snapshot as of the latest day with sales.
+
+    Velocity is units sold over the VELOCITY_DAYS ending on that day, against
+    the current stock_quantity. Sales are aggregated in a subquery before the
+    outer join, so products without recent sales keep their row with zero
+    velocity. start_date and end_date are unused: a backfill of an old range
+    must not date the snapshot back to it, and it always covers every product.
+    """
+    as_of = latest_sales_date(db)
+    window_start = as_of - timedelta(days=VELOCITY_DAYS - 1)
+
+    sales = select(
+        ProductSalesDaily.product_id,
+        func.sum(ProductSalesDaily.units).label("units")
+    ).where(
+        ProductSalesDaily.date_key >= to_date_key(window_start),
+        ProductSalesDaily.date_key <= to_date_key(as_of)
+    ).group_by(
+        ProductSalesDaily.product_id
+    ).subquery()
+
+    units = func.coalesce(sales.c.units, 0)
+    stock = func.coalesce(Product.stock_quantity, 0)
+    days_of_stock = case(
+        (units > 0, stock * literal(float(VELOCITY_DAYS)) / units),
+        else_=None
+    )
+    status = case(
+        *[(days_of_stock < limit, literal(name)) for name, limit in STATUS_THRESHOLDS],
+        else_=literal("overstock")
+    )
+
+    source = select(
+        Product.product_id,
+        literal(as_of),
+        Product.product_name,
+        Product.category_level_1,
+        stock,
+        Product.current_price,
+        units,
+        units / literal(float(VELOCITY_DAYS)),
+        days_of_stock,
+        stock * func.coalesce(Product.current_price, 0),
+        status
+    ).outerjoin(
+        sales, Product.product_id == sales.c.product_id
+    )
+
+    db.execute(delete(StockSnapshot))
+    result = db.execute(
+        insert(StockSnapshot).from_select(
+            [
+                "product_id", "snapshot_date", "product_name", "category_level_1",
+                "stock_quantity", "current_price", "units_sold", "daily_velocity",
+                "days_of_stock", "stock_value", "stock_status"
+            ],
+            source
+        )
+    )
+    return result.rowcount
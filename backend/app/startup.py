@@ -0,0 +1,122 @@
+"""Startup: connection pre-opening, cache warm-up and readiness.
+
+`lifespan` starts the warm-up in the background so the process accepts
+connections (and `/health` answers) immediately; `/ready` only reports ready
+once the pool is primed and the in-process caches and the default dashboard
+queries have run. Warm-up is retried until the database is reachable.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from .config import settings
+from .database import databases, engine, replica_engines, read_session
+from .services import dimension_cache
+from .services.dashboard import load_bundle
+from .services.data_version import data_version
+from .services.jobs import jobs
+from .services.live_kpis import broadcaster
+from .utils.periods import resolve_period, calendar
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Warm-up progress reported by `/ready`."""
+
+    def __init__(self):
+        self.ready = False
+        self.warmup_seconds = None
+        self.attempts = 0
+        self.last_error = None
+        self.steps = {}
+
+    def status(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "warmup_seconds": self.warmup_seconds,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "steps": self.steps,
+        }
+
+
+readiness = Readiness()
+
+
+def open_connections(count: int):
+    """Open `count` connections per pool (primary and replicas) at once so first requests find them established."""
+    def ping(bind):
+        with bind.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    binds = [bind for bind in [engine, *replica_engines] for _ in range(count)]
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        list(pool.map(ping, binds))
+
+
+def warm_caches():
+    db = read_session()
+    try:
+        data_version.get(db)
+        calendar.days(db, resolve_period(settings.WARMUP_PERIOD))
+        for cache in (dimension_cache.channels, dimension_cache.campaigns, dimension_cache.products):
+            cache.get(db)
+    finally:
+        db.close()
+
+
+def warm_dashboard():
+    """Run the default dashboard bundle once (fact index ranges into the DB buffer pool)."""
+    db = read_session()
+    try:
+        load_bundle(db, settings.WARMUP_PERIOD, 5)
+    finally:
+        db.close()
+
+
+WARMUP_STEPS = [
+    ("connections", lambda: open_connections(settings.WARMUP_CONNECTIONS)),
+    ("caches", warm_caches),
+    ("dashboard", warm_dashboard),
+]
+
+
+def run_warmup():
+    started = time.perf_counter()
+    for name, step in WARMUP_STEPS:
+        step_started = time.perf_counter()
+        step()
+        readiness.steps[name] = round(time.perf_counter() - step_started, 4)
+    return round(time.perf_counter() - started, 4)
+
+
+async def warm_up():
+    """Run the warm-up steps, retrying until they succeed."""
+    while not readiness.ready:
+        readiness.attempts += 1
+        try:
+            readiness.warmup_seconds = await run_in_threadpool(run_warmup)
+            readiness.ready = True
+            readiness.last_error = None
+            logger.info(f"Warm-up finished in {readiness.warmup_seconds}s")
+        except Exception as e:
+            readiness.last_error = str(e)
+            logger.exception(f"Warm-up attempt {readiness.attempts} failed")
+            await asyncio.sleep(settings.WARMUP_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(warm_up())
+    yield
+    task.cancel()
+    await broadcaster.stop()
+    jobs.shutdown()
+    databases.dispose()
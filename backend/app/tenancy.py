@@ -0,0 +1,110 @@
+"""Tenant (client database) of the current request.
+
+Each client has its own database, named as the ETL template creates them
+(`setup_database.sh <client_code>` -> `cortex_<client_code>`). With
+TENANT_DATABASE_TEMPLATE set, `TenantMiddleware` resolves every API request's
+tenant from the subdomain under TENANT_BASE_DOMAIN and stores it in a context
+variable, which thread-pool handlers inherit. The X-Tenant header and a
+`tenant` query parameter (EventSource cannot send headers) are unauthenticated,
+so they are only honoured with TENANT_HEADER_SELECTION (off by default), e.g.
+behind a gateway that sets them or in local development.
+database.py picks the tenant's engines from it, and `TenantScoped` keeps one
+instance of each in-process cache per tenant.
+
+Without a template the API serves DATABASE_URL alone, as tenant "default".
+"""
+import contextvars
+import re
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+from starlette.datastructures import Headers, QueryParams
+
+from .config import settings
+
+DEFAULT_TENANT = "default"
+
+TENANT_HEADER = "X-Tenant"
+
+# Tenant codes end up in database names
+TENANT_RE = re.compile(r"^[a-z0-9][a-z0-9_]{0,62}$")
+
+_current_tenant = contextvars.ContextVar("tenant", default=DEFAULT_TENANT)
+
+
+def multi_tenant() -> bool:
+    return bool(settings.TENANT_DATABASE_TEMPLATE)
+
+
+def current_tenant() -> str:
+    return _current_tenant.get()
+
+
+@contextmanager
+def use_tenant(tenant: str):
+    """Run the block as `tenant` (background tasks, scripts)."""
+    token = _current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def header_selection() -> bool:
+    """Clients may name their tenant (X-Tenant header or `tenant` parameter)."""
+    return multi_tenant() and settings.TENANT_HEADER_SELECTION
+
+
+def resolve_tenant(headers: Headers, query_params: QueryParams) -> Optional[str]:
+    """Tenant named by the host's subdomain, else by X-Tenant or `tenant` if header selection is on."""
+    tenant = None
+    if settings.TENANT_BASE_DOMAIN:
+        host = headers.get("host", "").split(":")[0].lower()
+        suffix = f".{settings.TENANT_BASE_DOMAIN.lower()}"
+        if host.endswith(suffix):
+            tenant = host[:-len(suffix)]
+    if not tenant and settings.TENANT_HEADER_SELECTION:
+        tenant = headers.get(TENANT_HEADER) or query_params.get("tenant")
+    return tenant.strip().lower() if tenant else None
+
+
+def valid_tenant(tenant: str) -> bool:
+    return bool(TENANT_RE.match(tenant))
+
+
+# Every TenantScoped object, so an evicted tenant's caches can be dropped
+_scoped = []
+
+
+class TenantScoped:
+    """One `factory()` instance per tenant; attribute access goes to the current tenant's."""
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+        _scoped.append(self)
+
+    def instance(self, tenant: Optional[str] = None):
+        tenant = tenant or current_tenant()
+        instance = self._instances.get(tenant)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(tenant)
+                if instance is None:
+                    instance = self._instances[tenant] = self._factory()
+        return instance
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
+
+    def discard(self, tenant: str):
+        with self._lock:
+            self._instances.pop(tenant, None)
+
+
+def forget_tenant(tenant: str):
+    """Drop every per-tenant cache of `tenant`."""
+    for scoped in _scoped:
+        scoped.discard(tenant)
@@ -0,0 +1,31 @@
+from datetime import date
+
+
+def to_date_key(value: date) -> int:
+    """Convert a date to the YYYYMMDD integer used by dim_dates.date_key."""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def from_date_key(date_key: int) -> date:
+    """Convert a YYYYMMDD date_key back to a date."""
+    return date(date_key // 10000, date_key // 100 % 100, date_key % 100)
+
+
+def add_months(month: int, count: int) -> int:
+    """YYYYMM month `count` months after `month` (before it if negative)."""
+    year, index = divmod(month // 100 * 12 + month % 100 - 1 + count, 12)
+    return year * 100 + index + 1
+
+
+def next_month(month: int) -> int:
+    return add_months(month, 1)
+
+
+def months_between(start_key: int, end_key: int) -> list:
+    """YYYYMM months from start_key through end_key (inclusive date_keys)."""
+    months = []
+    month = start_key // 100
+    while month <= end_key // 100:
+        months.append(month)
+        month = next_month(month)
+    return months
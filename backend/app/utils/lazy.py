@@ -0,0 +1,55 @@
+"""Deferred imports for heavy numerical libraries.
+
+NumPy (and pandas in the pipeline) cost a noticeable part of process start,
+yet only a few endpoints use them. `lazy_import` returns a stand-in module
+that performs the real import on first attribute access, so they load on the
+first request that needs them instead of at boot. `import_timings` records
+how long each import took (also for modules timed with `timed`), and is
+reported by the readiness endpoint.
+"""
+import importlib
+import threading
+import time
+import types
+from contextlib import contextmanager
+
+# module name -> seconds spent importing it
+import_timings = {}
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def timed(name: str):
+    """Record the time spent in the block as the import time of `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        import_timings[name] = round(time.perf_counter() - started, 4)
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    with timed(self.__name__):
+                        self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> LazyModule:
+    return LazyModule(name)
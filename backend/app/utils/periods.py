@@ -0,0 +1,169 @@
+"""Period windows shared by the routers.
+
+A `Window` maps a named period ("30d", "this_month", ...) or an explicit
+date range to half-open bounds on `date_key` and on timestamps, so facts are
+filtered directly on their indexed columns instead of joining dim_dates:
+
+    window = resolve_period("30d")
+    query.filter(Order.date_key >= window.start_key, Order.date_key < window.end_key)
+
+`calendar` keeps dim_dates in memory (loaded on first use) for the few places
+that need the calendar itself, e.g. zero-filled daily series.
+"""
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import DateDimension
+from ..tenancy import TenantScoped
+from .dates import to_date_key
+
+DEFAULT_PERIOD = "30d"
+
+# Trailing windows: today minus N days through today (inclusive)
+TRAILING_PERIODS = {
+    "7d": 7,
+    "30d": 30,
+    "60d": 60,
+    "90d": 90,
+    "1y": 365,
+}
+
+
+@dataclass(frozen=True)
+class Window:
+    """Inclusive [start, end] days with half-open key and timestamp bounds."""
+
+    start: date
+    end: date
+
+    @property
+    def days(self) -> int:
+        return (self.end - self.start).days + 1
+
+    @property
+    def start_key(self) -> int:
+        return to_date_key(self.start)
+
+    @property
+    def end_key(self) -> int:
+        """Exclusive upper bound: date_key of the day after `end`."""
+        return to_date_key(self.end + timedelta(days=1))
+
+    @property
+    def start_at(self) -> datetime:
+        return datetime.combine(self.start, time.min)
+
+    @property
+    def end_at(self) -> datetime:
+        """Exclusive upper bound: midnight after `end`."""
+        return datetime.combine(self.end + timedelta(days=1), time.min)
+
+    def previous(self) -> "Window":
+        """Window of the same length ending the day before this one starts."""
+        end = self.start - timedelta(days=1)
+        return Window(end - timedelta(days=self.days - 1), end)
+
+    def dates(self) -> list:
+        return [self.start + timedelta(days=i) for i in range(self.days)]
+
+
+def named_periods(today: date) -> dict:
+    """Calendar-relative periods available by name."""
+    month_start = today.replace(day=1)
+    last_month_end = month_start - timedelta(days=1)
+    week_start = today - timedelta(days=today.weekday())
+
+    return {
+        "today": Window(today, today),
+        "yesterday": Window(today - timedelta(days=1), today - timedelta(days=1)),
+        "last_7_days": Window(today - timedelta(days=7), today),
+        "last_30_days": Window(today - timedelta(days=30), today),
+        "this_week": Window(week_start, today),
+        "last_week": Window(week_start - timedelta(days=7), week_start - timedelta(days=1)),
+        "this_month": Window(month_start, today),
+        "last_month": Window(last_month_end.replace(day=1), last_month_end),
+        "this_year": Window(today.replace(month=1, day=1), today),
+    }
+
+
+def month_window(month: str) -> Window:
+    """Window covering a calendar month given as "YYYY-MM"."""
+    start = date(int(month[:4]), int(month[5:7]), 1)
+    next_month = (start + timedelta(days=32)).replace(day=1)
+    return Window(start, next_month - timedelta(days=1))
+
+
+def resolve_period(
+    period: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    today: Optional[date] = None
+) -> Window:
+    """Resolve an explicit range or a period name to a Window.
+
+    Unknown period names fall back to the last 30 days, as the routers'
+    `period` query parameters always have.
+    """
+    if start_date and end_date:
+        return Window(start_date, end_date)
+
+    today = today or date.today()
+    period = period or DEFAULT_PERIOD
+
+    if period in TRAILING_PERIODS:
+        return Window(today - timedelta(days=TRAILING_PERIODS[period]), today)
+
+    named = named_periods(today)
+    if period in named:
+        return named[period]
+
+    return Window(today - timedelta(days=TRAILING_PERIODS[DEFAULT_PERIOD]), today)
+
+
+class Calendar:
+    """dim_dates held in memory, loaded lazily on first use."""
+
+    def __init__(self):
+        self._days = None
+        self._lock = threading.Lock()
+
+    def _load(self, db: Session) -> dict:
+        if self._days is None:
+            with self._lock:
+                if self._days is None:
+                    self._days = {
+                        d.date_key: d
+                        for d in db.query(
+                            DateDimension.date_key,
+                            DateDimension.full_date,
+                            DateDimension.week_of_year,
+                            DateDimension.month_number,
+                            DateDimension.year,
+                            DateDimension.is_weekend,
+                            DateDimension.is_holiday,
+                            DateDimension.holiday_name
+                        ).all()
+                    }
+        return self._days
+
+    def days(self, db: Session, window: Window) -> list:
+        """Calendar rows for every day of the window present in dim_dates."""
+        days = self._load(db)
+        return [
+            days[key]
+            for key in (to_date_key(d) for d in window.dates())
+            if key in days
+        ]
+
+    def invalidate(self):
+        """Drop the cached calendar (e.g. after dim_dates is extended)."""
+        with self._lock:
+            self._days = None
+
+
+# One calendar per tenant database
+calendar = TenantScoped(Calendar)
@@ -0,0 +1,134 @@
+"""orjson-based responses.
+
+`FastJSONResponse` is the app's default response class: orjson encodes
+dates, datetimes and numpy values natively, and Decimals as JSON numbers.
+
+FastAPI still runs `jsonable_encoder` (or response_model validation) on
+whatever a handler returns. Handlers whose output is already built from
+typed rows return `fast_response(...)` / `table_response(...)` instead,
+which hands the content straight to orjson.
+
+Table endpoints negotiate their layout with `response_layout`: the Accept
+header can ask for columnar JSON or an Arrow IPC stream (pyarrow, optional),
+otherwise the `layout` query parameter applies.
+"""
+import importlib.util
+from decimal import Decimal
+from typing import Any, Iterable, Sequence
+
+import orjson
+from fastapi import HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from .lazy import lazy_import
+
+# Imported on first Arrow response (see utils/lazy.py)
+pa = lazy_import("pyarrow")
+
+# Row layouts accepted by table_response
+TABLE_LAYOUTS = ["records", "rows", "columns", "arrow"]
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_JSON_MEDIA_TYPE = "application/vnd.cortex.columns+json"
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def encode_default(value: Any):
+    """Fallback for types orjson does not serialize natively."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=encode_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def fast_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Return content as-is, skipping FastAPI's encoding/validation pass."""
+    return FastJSONResponse(content, status_code=status_code)
+
+
+def response_layout(
+    request: Request,
+    layout: str = Query("records", description="records, rows, columns or arrow")
+) -> str:
+    """Dependency: layout requested through Accept, else the `layout` parameter."""
+    accept = request.headers.get("accept", "")
+    if ARROW_STREAM_MEDIA_TYPE in accept:
+        return "arrow"
+    if COLUMNAR_JSON_MEDIA_TYPE in accept:
+        return "columns"
+    return layout
+
+
+def arrow_response(columns: Sequence[str], rows: list, extra: dict) -> Response:
+    """Rows as an Arrow IPC stream; `extra` travels as JSON in the schema metadata."""
+    if importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=406, detail="Arrow responses are not available (pyarrow not installed)")
+
+    arrays = []
+    for values in (zip(*rows) if rows else [[] for _ in columns]):
+        # Decimals (possibly mixed with zero-filled ints) become float64
+        if any(isinstance(v, Decimal) for v in values):
+            values = [float(v) if v is not None else None for v in values]
+        arrays.append(pa.array(values))
+
+    metadata = {"extra": dumps(extra)} if extra else None
+    batch = pa.RecordBatch.from_arrays(arrays, names=list(columns))
+    batch = batch.replace_schema_metadata(metadata) if metadata else batch
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+
+    return Response(sink.getvalue().to_pybytes(), media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+def table_response(
+    columns: Sequence[str],
+    rows: Iterable[Sequence],
+    layout: str = "records",
+    records_key: str = "items",
+    **extra
+) -> FastJSONResponse:
+    """Serialize rows of plain tuples in the requested layout.
+
+    - records: [{column: value, ...}, ...] (the classic shape)
+    - rows:    {"columns": [...], "rows": [[...], ...]}
+    - columns: {"columns": [...], "data": {column: [...], ...}}
+    - arrow:   Arrow IPC stream (see arrow_response)
+
+    Extra keyword arguments (totals, paging) are merged into the object
+    layouts; with `records` they sit next to the list under `records_key`,
+    and with no extras the bare list is returned.
+    """
+    if layout not in TABLE_LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Invalid layout: {layout}")
+
+    rows = rows if isinstance(rows, list) else list(rows)
+
+    if layout == "arrow":
+        return arrow_response(columns, rows, extra)
+    if layout == "rows":
+        content = {"columns": list(columns), "rows": rows, **extra}
+    elif layout == "columns":
+        data = {column: list(values) for column, values in zip(columns, zip(*rows))} if rows \
+            else {column: [] for column in columns}
+        content = {"columns": list(columns), "data": data, **extra}
+    else:
+        records = [dict(zip(columns, row)) for row in rows]
+        content = {records_key: records, **extra} if extra else records
+
+    return fast_response(content)
@@ -0,0 +1,148 @@
+"""
+EXPLAIN every query the API issues and check the plans against a baseline.
+
+Calls each GET route under /api (defaults, plus period=1y where the route takes
+a period) against the configured MySQL database, runs EXPLAIN FORMAT=JSON for
+every SELECT it issued and reports full scans, filesorts and temporary tables
+with suggested indexes. Use a database at benchmark scale, e.g. one seeded with
+`SEED_SCALE=50 python scripts/seed_data.py`: on small tables the optimizer
+prefers scans and the plans say little.
+
+Usage: python scripts/check_query_plans.py [--baseline PATH] [--update-baseline] [--min-rows N] [--report PATH]
+
+Exits with status 1 when a query recorded in the baseline now has a worse plan.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import logging
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import engine
+from app.main import app
+from app.services.query_plans import (
+    capture_queries, explain, summarize_plan, fingerprint, baseline_entry,
+    plan_issues, suggest_indexes, plan_regressions
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "query_plans.json")
+
+# Streaming endpoints never finish a request
+SKIPPED_ROUTES = {"/api/dashboard/live"}
+
+# Values for path parameters
+PATH_SAMPLES = {
+    "customer_id": "SELECT customer_id FROM dim_customers ORDER BY total_orders DESC LIMIT 1",
+    "product_id": "SELECT product_id FROM dim_products ORDER BY product_id LIMIT 1",
+}
+
+# Extra query strings for routes whose parameters change the SQL
+EXTRA_REQUESTS = {
+    "/api/sales/by-period": ["groupby=week", "groupby=month&period=1y"],
+}
+
+
+def route_requests(connection) -> list:
+    samples = {name: connection.execute(text(sql)).scalar() for name, sql in PATH_SAMPLES.items()}
+    requests = []
+    for route in app.routes:
+        if not route.path.startswith(settings.API_V1_PREFIX) or route.path in SKIPPED_ROUTES:
+            continue
+        if "GET" not in getattr(route, "methods", set()):
+            continue
+
+        path = route.path
+        for name, value in samples.items():
+            path = path.replace(f"{{{name}}}", str(value))
+        if "{" in path:
+            continue
+
+        requests.append(path)
+        if any(param.name == "period" for param in route.dependant.query_params):
+            requests.append(f"{path}?period=1y")
+        requests.extend(f"{path}?{query}" for query in EXTRA_REQUESTS.get(route.path, []))
+    return requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the API's query plans with EXPLAIN.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--min-rows", type=int, default=1000, help="ignore full scans of smaller tables")
+    parser.add_argument("--report", default=None, help="also write the full report as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(message)s")
+
+    if engine.dialect.name != "mysql":
+        sys.exit("check_query_plans needs a MySQL database (EXPLAIN FORMAT=JSON)")
+
+    # Every query must reach MySQL
+    settings.SNAPSHOT_DIR = ""
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    client = TestClient(app, raise_server_exceptions=False)
+    report, recorded, regressions = [], {}, []
+
+    with engine.connect() as connection:
+        for request in route_requests(connection):
+            with capture_queries() as queries:
+                status = client.get(request).status_code
+
+            for statement, parameters in queries:
+                key = f"{request.split('?')[0]} {fingerprint(statement)}"
+                if key in recorded:
+                    continue
+
+                summary = summarize_plan(explain(connection, statement, parameters))
+                recorded[key] = {"statement": " ".join(statement.split())[:300], **baseline_entry(summary)}
+
+                entry = {
+                    "request": request,
+                    "status": status,
+                    "key": key,
+                    "issues": plan_issues(summary, args.min_rows),
+                    "suggestions": suggest_indexes(summary, statement, args.min_rows),
+                    "regressions": plan_regressions(baseline[key], summary) if key in baseline else [],
+                    "plan": summary,
+                }
+                report.append(entry)
+                regressions.extend(f"{key}: {r}" for r in entry["regressions"])
+
+    for entry in report:
+        if entry["issues"] or entry["regressions"]:
+            print(f"{entry['request']} [{entry['key'].split()[-1]}]")
+            for issue in entry["issues"]:
+                print(f"    {issue}")
+            for suggestion in entry["suggestions"]:
+                print(f"    suggest: {suggestion}")
+            for regression in entry["regressions"]:
+                print(f"    REGRESSION: {regression}")
+
+    flagged = sum(1 for entry in report if entry["issues"])
+    print(f"\n{len(report)} queries explained, {flagged} with issues, {len(regressions)} regressions")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(recorded, f, indent=2, sort_keys=True)
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Create the fact tables' monthly partitions ahead and expire old ones (schedule daily).
+
+Usage: python scripts/maintain_partitions.py [--today YYYY-MM-DD] [--tenant CODE]
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+from datetime import date
+
+from app.database import primary_session
+from app.services.partitions import maintain_partitions
+from app.tenancy import DEFAULT_TENANT, use_tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the fact tables.")
+    parser.add_argument("--today", type=date.fromisoformat, default=None)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="client code (multi-tenant deployments)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    with use_tenant(args.tenant):
+        db = primary_session()
+        try:
+            changes = maintain_partitions(db, today=args.today)
+        finally:
+            db.close()
+
+    for table, change in changes.items():
+        print(f"{table}: created {change['created']}, expired {change['expired']}")
+
+
+if __name__ == "__main__":
+    main()
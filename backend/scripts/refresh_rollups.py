@@ -0,0 +1,44 @@
+"""
+Refresh the aggregate tables after an ETL load.
+
+Usage: python scripts/refresh_rollups.py [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--lookback-days N] [--tenant CODE]
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import logging
+from datetime import date, timedelta
+
+from app.database import primary_session
+from app.services.pipeline import refresh_after_load
+from app.tenancy import DEFAULT_TENANT, use_tenant
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh aggregate tables for a loaded date range.")
+    parser.add_argument("--start", type=date.fromisoformat, default=None)
+    parser.add_argument("--end", type=date.fromisoformat, default=None)
+    parser.add_argument("--lookback-days", type=int, default=7)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="client code (multi-tenant deployments)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    end_date = args.end or date.today()
+    start_date = args.start or end_date - timedelta(days=args.lookback_days)
+
+    with use_tenant(args.tenant):
+        db = primary_session()
+        try:
+            refreshed = refresh_after_load(db, start_date, end_date)
+        finally:
+            db.close()
+
+    for table, rows in refreshed.items():
+        print(f"{table}: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,12 +14,18 @@ from sqlalchemy import text
 from app.database import SessionLocal, engine
 from app.models import (
     Customer, Product, Order, OrderItem, Campaign, AdSpend,
-    Channel, DateDimension, Session, Attribution, CohortMetric
+    Channel, DateDimension, Session, CohortMetric
 )
+from app.services.partitions import maintain_partitions
+from app.services.pipeline import refresh_after_load
+from app.services.snapshots import clear_manifest
 
 # Seed for reproducibility
 random.seed(42)
 
+# Multiplies customers and daily orders (e.g. SEED_SCALE=50 for query plan benchmarks)
+SEED_SCALE = int(os.getenv("SEED_SCALE", "1"))
+
 # Brazilian states and cities
 STATES = {
     "SP": ["São Paulo", "Campinas", "Santos", "Ribeirão Preto", "Guarulhos"],
@@ -191,7 +197,7 @@ def create_customers(db, channel_ids):
     start_date = date(2023, 1, 1)
     end_date = date(2024, 11, 30)
 
-    for i in range(1, 501):
+    for i in range(1, 500 * SEED_SCALE + 1):
         state = random.choice(list(STATES.keys()))
         city = random.choice(STATES[state])
 
@@ -319,7 +325,7 @@ def create_orders(db, customers, products, channel_ids):
     current = start_date
     while current <= end_date:
         # Base orders per day + seasonality
-        base_orders = random.randint(5, 15)
+        base_orders = random.randint(5, 15) * SEED_SCALE
         seasonal_multiplier = seasonality.get(current.month, 1.0)
 
         # Weekend boost
@@ -638,68 +644,6 @@ def update_customer_metrics(db):
     print("Customer metrics updated.")
 
 
-def update_product_abc(db):
-    """Update product ABC classification."""
-    print("Updating product ABC classification...")
-
-    products = db.query(Product).filter(Product.total_revenue > 0).order_by(Product.total_revenue.desc()).all()
-
-    total_revenue = sum(float(p.total_revenue) for p in products)
-    cumulative = 0
-
-    for p in products:
-        cumulative += float(p.total_revenue)
-        percentage = cumulative / total_revenue if total_revenue > 0 else 0
-
-        if percentage <= 0.8:
-            p.abc_classification = "A"
-        elif percentage <= 0.95:
-            p.abc_classification = "B"
-        else:
-            p.abc_classification = "C"
-
-    db.commit()
-    print("Product ABC classification updated.")
-
-
-def create_attributions(db, channel_ids):
-    """Create attribution records for orders."""
-    print("Creating attribution records...")
-
-    orders = db.query(Order).filter(Order.order_status != "cancelled").all()
-    campaigns = {c.campaign_id: c for c in db.query(Campaign).all()}
-
-    attributions = []
-
-    for order in orders:
-        # Last click attribution
-        campaign_id = None
-
-        # Try to find matching campaign
-        if order.utm_source and order.utm_campaign:
-            for cid, campaign in campaigns.items():
-                if (campaign.utm_source == order.utm_source and
-                    order.utm_campaign and campaign.utm_campaign and
-                    order.utm_campaign in campaign.utm_campaign):
-                    campaign_id = cid
-                    break
-
-        attributions.append(Attribution(
-            order_id=order.order_id,
-            campaign_id=campaign_id,
-            channel_id=order.channel_id,
-            attribution_model="last_click",
-            attributed_revenue=order.total_amount,
-            attributed_orders=Decimal("1.0000"),
-            days_to_conversion=random.randint(0, 7),
-            touchpoint_position="last",
-        ))
-
-    db.bulk_save_objects(attributions)
-    db.commit()
-    print(f"Created {len(attributions)} attribution records.")
-
-
 def main():
     """Main seed function."""
     print("=" * 60)
@@ -721,11 +665,18 @@ def main():
             # Clear existing data
             print("Clearing existing data...")
             db.execute(text("SET FOREIGN_KEY_CHECKS = 0"))
-            for table in ["fct_attribution", "fct_cohort_metrics", "fct_sessions",
-                         "fct_ad_spend", "fct_order_items", "fct_orders",
+            for table in ["fct_sales_hourly", "fct_product_sales_daily", "fct_stock_snapshot", "fct_campaign_daily",
+                         "fct_session_funnel_daily", "fct_landing_page_daily",
+                         "fct_session_traffic_daily", "fct_session_device_daily", "fct_session_geo_daily",
+                         "fct_attribution", "fct_cohort_metrics", "fct_sessions",
+                         "fct_ad_spend", "fct_order_items", "fct_orders", "fct_order_keys",
                          "dim_campaigns", "dim_products", "dim_customers",
                          "dim_channels", "dim_dates"]:
                 db.execute(text(f"TRUNCATE TABLE {table}"))
+            # DELETE keeps etl_loads' AUTO_INCREMENT: load ids (the data version in ETags and
+            # in the snapshot manifest) must never repeat, or stale caches would match
+            db.execute(text("DELETE FROM etl_loads"))
+            clear_manifest()
             db.execute(text("SET FOREIGN_KEY_CHECKS = 1"))
             db.commit()
 
@@ -740,10 +691,15 @@ def main():
         orders = create_orders(db, customers, products, channel_ids)
         create_ad_spend(db, campaigns)
 
+        # Monthly partitions for the seeded history (no-op outside MySQL)
+        maintain_partitions(db)
+
         # Update metrics
         update_customer_metrics(db)
-        update_product_abc(db)
-        create_attributions(db, channel_ids)
+
+        # Attribution and aggregate tables
+        print("Refreshing aggregate tables...")
+        refresh_after_load(db, date(2023, 1, 1), date(2024, 12, 10))
 
         print("=" * 60)
         print("SEED COMPLETED SUCCESSFULLY!")
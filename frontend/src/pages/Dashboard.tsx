@@ -24,32 +24,17 @@ import { useState } from 'react';
 export function Dashboard() {
   const [period, setPeriod] = useState('30d');
 
-  const { data: kpis, isLoading: kpisLoading } = useQuery({
-    queryKey: ['dashboard-kpis', period],
-    queryFn: () => dashboardApi.getKPIs(period),
+  // All widgets in one request (one scan of the order/spend facts)
+  const { data: bundle, isLoading } = useQuery({
+    queryKey: ['dashboard-bundle', period],
+    queryFn: () => dashboardApi.getBundle(period, 5),
   });
 
-  const { data: revenueChart, isLoading: chartLoading } = useQuery({
-    queryKey: ['dashboard-revenue-chart', period],
-    queryFn: () => dashboardApi.getRevenueChart(period),
-  });
-
-  const { data: topProducts } = useQuery({
-    queryKey: ['dashboard-top-products', period],
-    queryFn: () => dashboardApi.getTopProducts(5, period),
-  });
-
-  const { data: topChannels } = useQuery({
-    queryKey: ['dashboard-top-channels', period],
-    queryFn: () => dashboardApi.getTopChannels(period),
-  });
-
-  const { data: alerts = [] } = useQuery({
-    queryKey: ['alerts'],
-    queryFn: dashboardApi.getAlerts,
-  });
-
-  const isLoading = kpisLoading || chartLoading;
+  const kpis = bundle?.kpis;
+  const revenueChart = bundle?.revenue_chart;
+  const topProducts = bundle?.top_products;
+  const topChannels = bundle?.top_channels;
+  const alerts = bundle?.alerts ?? [];
 
   if (isLoading) {
     return (
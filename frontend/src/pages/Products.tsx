@@ -260,7 +260,7 @@ export function Products() {
                       +{product.change_percent.toFixed(0)}%
                     </p>
                     <p className="text-xs text-dark-400">
-                      {formatCurrency(product.second_half_revenue)}
+                      {formatCurrency(product.recent_revenue)}
                     </p>
                   </div>
                 </motion.div>
@@ -298,7 +298,7 @@ export function Products() {
                       {product.change_percent.toFixed(0)}%
                     </p>
                     <p className="text-xs text-dark-400">
-                      {formatCurrency(product.second_half_revenue)}
+                      {formatCurrency(product.recent_revenue)}
                     </p>
                   </div>
                 </motion.div>
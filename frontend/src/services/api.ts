@@ -5,6 +5,7 @@ import type {
   TopProduct,
   TopChannel,
   Alert,
+  DashboardBundle,
   RFMSegment,
   Customer,
   Product,
@@ -20,10 +21,15 @@ import type {
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || '/api';
 
+// Client database served by a multi-tenant API (unset: resolved from the subdomain;
+// the API honours it only with TENANT_HEADER_SELECTION)
+const TENANT: string | undefined = import.meta.env.VITE_TENANT;
+
 const api = axios.create({
   baseURL: API_BASE_URL,
   headers: {
     'Content-Type': 'application/json',
+    ...(TENANT ? { 'X-Tenant': TENANT } : {}),
   },
 });
 
@@ -53,6 +59,34 @@ export const dashboardApi = {
     const { data } = await api.get('/dashboard/alerts');
     return Array.isArray(data) ? data : [];
   },
+
+  getBundle: async (period = '30d', limit = 10): Promise<DashboardBundle> => {
+    const { data } = await api.get(`/dashboard/bundle?period=${period}&limit=${limit}`);
+    return data;
+  },
+
+  // Live KPIs (SSE): full snapshot on connect, then only the changed fields after each data load
+  subscribeKPIs: (
+    period: string,
+    onUpdate: (kpis: KPIData) => void
+  ): (() => void) => {
+    let kpis: KPIData | undefined;
+    // EventSource cannot send headers, so the tenant goes in the query string
+    const tenant = TENANT ? `&tenant=${encodeURIComponent(TENANT)}` : '';
+    const source = new EventSource(`${API_BASE_URL}/dashboard/live?period=${period}${tenant}`);
+
+    source.addEventListener('snapshot', (event) => {
+      kpis = JSON.parse((event as MessageEvent).data).kpis;
+      onUpdate(kpis as KPIData);
+    });
+    source.addEventListener('delta', (event) => {
+      if (!kpis) return;
+      kpis = { ...kpis, ...JSON.parse((event as MessageEvent).data).changes };
+      onUpdate(kpis as KPIData);
+    });
+
+    return () => source.close();
+  },
 };
 
 // Sales endpoints
@@ -230,4 +264,17 @@ export const predictionsApi = {
   },
 };
 
+// Columnar table endpoints: one array per column instead of an object per row
+export interface ColumnarTable<T> {
+  columns: (keyof T)[];
+  data: { [K in keyof T]: T[K][] };
+}
+
+export const getColumns = async <T>(url: string): Promise<ColumnarTable<T>> => {
+  const { data } = await api.get(url, {
+    headers: { Accept: 'application/vnd.cortex.columns+json' },
+  });
+  return data;
+};
+
 export default api;
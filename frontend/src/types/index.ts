@@ -51,6 +51,15 @@ export interface Alert {
   created_at: string;
 }
 
+export interface DashboardBundle {
+  period: { start: string; end: string };
+  kpis: KPIData;
+  revenue_chart: RevenueChartData[];
+  top_products: TopProduct[];
+  top_channels: TopChannel[];
+  alerts: Alert[];
+}
+
 export interface RFMSegment {
   segment: string;
   count: number;
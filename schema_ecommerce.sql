@@ -94,7 +94,9 @@ CREATE TABLE IF NOT EXISTS dim_customers (
     UNIQUE INDEX idx_external_id (external_customer_id),
     INDEX idx_email_hash (email_hash),
     INDEX idx_first_order_date (first_order_date),
-    INDEX idx_rfm_segment (rfm_segment),
+    -- Listagem: filtro por segmento e ordenação por receita sem filesort
+    INDEX idx_rfm_segment_revenue (rfm_segment, total_revenue),
+    INDEX idx_total_revenue (total_revenue),
     INDEX idx_acquisition_channel (first_order_channel)
 ) ENGINE=InnoDB;
 
@@ -125,7 +127,9 @@ CREATE TABLE IF NOT EXISTS dim_products (
     -- Métricas calculadas
     total_units_sold INT DEFAULT 0,
     total_revenue DECIMAL(14,2) DEFAULT 0,
-    abc_classification CHAR(1) NULL,             -- A, B ou C
+    abc_classification CHAR(1) NULL,             -- A, B ou C (geral)
+    abc_category_classification CHAR(1) NULL,    -- A, B ou C dentro da category_level_1
+    abc_revenue DECIMAL(14,2) NULL,              -- Receita usada na classificação ABC
     
     -- Controle
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -134,7 +138,8 @@ CREATE TABLE IF NOT EXISTS dim_products (
     UNIQUE INDEX idx_external_id (external_product_id),
     INDEX idx_sku (sku),
     INDEX idx_category (category_level_1, category_level_2),
-    INDEX idx_abc (abc_classification)
+    INDEX idx_abc (abc_classification),
+    INDEX idx_category_abc (category_level_1, abc_category_classification)
 ) ENGINE=InnoDB;
 
 -- -----------------------------------------------------
@@ -215,7 +220,7 @@ INSERT INTO dim_channels (channel_name, channel_group, is_paid) VALUES
 -- fct_orders - Pedidos
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS fct_orders (
-    order_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    order_id BIGINT NOT NULL AUTO_INCREMENT,
     external_order_id VARCHAR(100) NOT NULL,     -- ID do e-commerce
     customer_id BIGINT NOT NULL,
     date_key INT NOT NULL,
@@ -265,24 +270,39 @@ CREATE TABLE IF NOT EXISTS fct_orders (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
-    UNIQUE INDEX idx_external_order (external_order_id),
+    -- Toda chave única de uma tabela particionada inclui a coluna de partição
+    PRIMARY KEY (order_id, date_key),
+    UNIQUE INDEX idx_external_order (external_order_id, date_key),
     INDEX idx_customer (customer_id),
-    INDEX idx_date (date_key),
+    -- Cobertura dos KPIs e séries diárias (período + status sem ler a linha)
+    INDEX idx_date_status_totals (date_key, order_status, customer_id, total_amount, is_first_order, is_repeat_order),
     INDEX idx_order_created (order_created_at),
     INDEX idx_status (order_status),
     INDEX idx_channel (channel_id),
-    INDEX idx_attribution (utm_source, utm_medium, utm_campaign),
-    
-    FOREIGN KEY (customer_id) REFERENCES dim_customers(customer_id),
-    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
-    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
+    INDEX idx_attribution (utm_source, utm_medium, utm_campaign)
+) ENGINE=InnoDB
+-- Partições mensais pYYYYMM são criadas à frente por services/partitions.py
+PARTITION BY RANGE (date_key) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
+
+-- -----------------------------------------------------
+-- fct_order_keys - Unicidade global de external_order_id
+-- -----------------------------------------------------
+-- fct_orders é particionada, então sua chave única inclui date_key. Esta tabela
+-- (não particionada) mantém um date_key por external_order_id; os triggers de
+-- fct_orders a atualizam e rejeitam um pedido recarregado com outra data em vez
+-- de inseri-lo de novo (receita em dobro).
+CREATE TABLE IF NOT EXISTS fct_order_keys (
+    external_order_id VARCHAR(100) PRIMARY KEY,
+    date_key INT NOT NULL
 ) ENGINE=InnoDB;
 
 -- -----------------------------------------------------
 -- fct_order_items - Itens dos Pedidos
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS fct_order_items (
-    order_item_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    order_item_id BIGINT NOT NULL AUTO_INCREMENT,
     order_id BIGINT NOT NULL,
     product_id BIGINT NOT NULL,
     date_key INT NOT NULL,
@@ -299,20 +319,21 @@ CREATE TABLE IF NOT EXISTS fct_order_items (
     
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
-    INDEX idx_order (order_id),
+    PRIMARY KEY (order_item_id, date_key),
+    INDEX idx_order (order_id, date_key),
     INDEX idx_product (product_id),
-    INDEX idx_date (date_key),
-    
-    FOREIGN KEY (order_id) REFERENCES fct_orders(order_id),
-    FOREIGN KEY (product_id) REFERENCES dim_products(product_id),
-    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key)
-) ENGINE=InnoDB;
+    INDEX idx_date (date_key)
+) ENGINE=InnoDB
+-- Partições mensais pYYYYMM são criadas à frente por services/partitions.py
+PARTITION BY RANGE (date_key) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
 
 -- -----------------------------------------------------
 -- fct_ad_spend - Gastos com Ads (diário por campanha)
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS fct_ad_spend (
-    spend_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    spend_id BIGINT NOT NULL AUTO_INCREMENT,
     date_key INT NOT NULL,
     campaign_id BIGINT NOT NULL,
     
@@ -341,19 +362,21 @@ CREATE TABLE IF NOT EXISTS fct_ad_spend (
     -- Controle
     extracted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
+    PRIMARY KEY (spend_id, date_key),
     UNIQUE INDEX idx_date_campaign (date_key, campaign_id),
     INDEX idx_date (date_key),
-    INDEX idx_campaign (campaign_id),
-    
-    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
-    FOREIGN KEY (campaign_id) REFERENCES dim_campaigns(campaign_id)
-) ENGINE=InnoDB;
+    INDEX idx_campaign (campaign_id)
+) ENGINE=InnoDB
+-- Partições mensais pYYYYMM são criadas à frente por services/partitions.py
+PARTITION BY RANGE (date_key) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
 
 -- -----------------------------------------------------
 -- fct_sessions - Sessões do GA4
 -- -----------------------------------------------------
 CREATE TABLE IF NOT EXISTS fct_sessions (
-    session_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    session_id BIGINT NOT NULL AUTO_INCREMENT,
     date_key INT NOT NULL,
     
     -- Identificadores
@@ -396,15 +419,16 @@ CREATE TABLE IF NOT EXISTS fct_sessions (
     
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     
+    PRIMARY KEY (session_id, date_key),
     INDEX idx_date (date_key),
     INDEX idx_customer (customer_id),
     INDEX idx_source_medium (source, medium),
-    INDEX idx_channel (channel_id),
-    
-    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
-    FOREIGN KEY (customer_id) REFERENCES dim_customers(customer_id),
-    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
-) ENGINE=InnoDB;
+    INDEX idx_channel (channel_id)
+) ENGINE=InnoDB
+-- Partições mensais pYYYYMM são criadas à frente por services/partitions.py
+PARTITION BY RANGE (date_key) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
 
 -- -----------------------------------------------------
 -- fct_attribution - Atribuição de pedidos a campanhas
@@ -415,8 +439,12 @@ CREATE TABLE IF NOT EXISTS fct_attribution (
     campaign_id BIGINT NULL,
     channel_id INT NULL,
     
+    -- Desnormalizado de fct_orders (evita join nas consultas de marketing)
+    date_key INT NOT NULL,
+    is_cancelled BOOLEAN NOT NULL DEFAULT FALSE,
+    
     -- Modelo de atribuição
-    attribution_model VARCHAR(50) NOT NULL,      -- last_click, first_click, linear, data_driven
+    attribution_model VARCHAR(50) NOT NULL,      -- last_click, first_click, linear, time_decay, position_based
     
     -- Valores atribuídos
     attributed_revenue DECIMAL(12,2) NOT NULL,
@@ -431,11 +459,13 @@ CREATE TABLE IF NOT EXISTS fct_attribution (
     UNIQUE INDEX idx_order_campaign_model (order_id, campaign_id, attribution_model),
     INDEX idx_order (order_id),
     INDEX idx_campaign (campaign_id),
-    INDEX idx_model (attribution_model),
+    -- Índices de cobertura para rollups por modelo/período
+    INDEX idx_model_date_campaign (attribution_model, date_key, campaign_id, is_cancelled, attributed_revenue, attributed_orders),
+    INDEX idx_model_date_channel (attribution_model, date_key, channel_id, is_cancelled, attributed_revenue, attributed_orders),
     
-    FOREIGN KEY (order_id) REFERENCES fct_orders(order_id),
     FOREIGN KEY (campaign_id) REFERENCES dim_campaigns(campaign_id),
-    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
+    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id),
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key)
 ) ENGINE=InnoDB;
 
 -- -----------------------------------------------------
@@ -468,6 +498,281 @@ CREATE TABLE IF NOT EXISTS fct_cohort_metrics (
     INDEX idx_cohort_month (cohort_month)
 ) ENGINE=InnoDB;
 
+-- ============================================================
+-- TABELAS AGREGADAS (atualizadas após cada carga)
+-- ============================================================
+
+-- -----------------------------------------------------
+-- fct_sales_hourly - Vendas por dia x hora x canal
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_sales_hourly (
+    sales_hourly_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    hour TINYINT NOT NULL,                       -- 0-23
+    day_of_week TINYINT NOT NULL,                -- 0=Domingo, 6=Sábado
+    channel_id INT NULL,
+    
+    -- Métricas (somente pedidos não cancelados)
+    orders INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    units INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_hour_channel (date_key, hour, channel_id),
+    INDEX idx_channel_date (channel_id, date_key),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
+    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_product_sales_daily - Vendas por dia x produto
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_product_sales_daily (
+    product_sales_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    product_id BIGINT NOT NULL,
+    
+    -- Métricas (somente pedidos não cancelados)
+    units INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    gross_margin DECIMAL(14,2) NOT NULL DEFAULT 0,
+    orders INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_product (date_key, product_id),
+    INDEX idx_product_date (product_id, date_key),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
+    FOREIGN KEY (product_id) REFERENCES dim_products(product_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_campaign_daily - Performance por dia x campanha x modelo de atribuição
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_campaign_daily (
+    campaign_daily_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    campaign_id BIGINT NOT NULL,
+    attribution_model VARCHAR(50) NOT NULL,
+    
+    -- Métricas de entrega (repetidas em cada modelo; sempre filtrar um modelo)
+    impressions BIGINT NOT NULL DEFAULT 0,
+    clicks BIGINT NOT NULL DEFAULT 0,
+    spend DECIMAL(14,2) NOT NULL DEFAULT 0,
+    conversions_platform INT NOT NULL DEFAULT 0,
+    conversions_value_platform DECIMAL(14,2) NOT NULL DEFAULT 0,
+    
+    -- Resultado atribuído pelo modelo
+    attributed_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    attributed_orders DECIMAL(12,4) NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_campaign_model (date_key, campaign_id, attribution_model),
+    INDEX idx_model_date_campaign (attribution_model, date_key, campaign_id),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
+    FOREIGN KEY (campaign_id) REFERENCES dim_campaigns(campaign_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_stock_snapshot - Estoque x velocidade de venda (30 dias)
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_stock_snapshot (
+    product_id BIGINT PRIMARY KEY,
+    snapshot_date DATE NOT NULL,
+    
+    -- Atributos do produto na data do snapshot
+    product_name VARCHAR(500) NOT NULL,
+    category_level_1 VARCHAR(200) NULL,
+    stock_quantity INT NOT NULL DEFAULT 0,
+    current_price DECIMAL(12,2) NULL,
+    
+    -- Velocidade de venda
+    units_sold INT NOT NULL DEFAULT 0,           -- Unidades vendidas na janela
+    daily_velocity DECIMAL(12,4) NOT NULL DEFAULT 0,
+    days_of_stock DECIMAL(12,1) NULL,            -- NULL = sem vendas na janela
+    stock_value DECIMAL(14,2) NOT NULL DEFAULT 0,
+    stock_status VARCHAR(20) NOT NULL,           -- critical, low, healthy, overstock
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    INDEX idx_status_days (stock_status, days_of_stock),
+    INDEX idx_category_status (category_level_1, stock_status),
+    INDEX idx_days_of_stock (days_of_stock),
+    
+    FOREIGN KEY (product_id) REFERENCES dim_products(product_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_session_funnel_daily - Funil de sessões por dia x canal x dispositivo
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_session_funnel_daily (
+    session_funnel_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    channel_id INT NULL,
+    device_category VARCHAR(50) NULL,
+    
+    -- Sessões que atingiram cada etapa do funil
+    sessions INT NOT NULL DEFAULT 0,
+    add_to_cart INT NOT NULL DEFAULT 0,
+    begin_checkout INT NOT NULL DEFAULT 0,
+    purchases INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_channel_device (date_key, channel_id, device_category),
+    INDEX idx_channel_date (channel_id, date_key),
+    INDEX idx_device_date (device_category, date_key),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
+    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_landing_page_daily - Funil de sessões por dia x página de entrada
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_landing_page_daily (
+    landing_page_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    landing_page VARCHAR(500) NULL,
+    
+    -- Sessões que atingiram cada etapa do funil
+    sessions INT NOT NULL DEFAULT 0,
+    engaged_sessions INT NOT NULL DEFAULT 0,
+    add_to_cart INT NOT NULL DEFAULT 0,
+    begin_checkout INT NOT NULL DEFAULT 0,
+    purchases INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_page (date_key, landing_page),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_session_traffic_daily - Tráfego por dia x canal x origem/mídia
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_session_traffic_daily (
+    session_traffic_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    channel_id INT NULL,
+    source VARCHAR(100) NULL,
+    medium VARCHAR(100) NULL,
+    
+    -- Métricas
+    sessions INT NOT NULL DEFAULT 0,
+    engaged_sessions INT NOT NULL DEFAULT 0,
+    duration_seconds BIGINT NOT NULL DEFAULT 0,   -- Soma (média = duration_seconds / sessions)
+    pageviews BIGINT NOT NULL DEFAULT 0,
+    purchases INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_channel_source (date_key, channel_id, source, medium),
+    INDEX idx_source_medium_date (source, medium, date_key),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key),
+    FOREIGN KEY (channel_id) REFERENCES dim_channels(channel_id)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_session_device_daily - Sessões por dia x dispositivo x navegador x SO
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_session_device_daily (
+    session_device_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    device_category VARCHAR(50) NULL,
+    browser VARCHAR(100) NULL,
+    operating_system VARCHAR(100) NULL,
+    
+    -- Métricas
+    sessions INT NOT NULL DEFAULT 0,
+    engaged_sessions INT NOT NULL DEFAULT 0,
+    duration_seconds BIGINT NOT NULL DEFAULT 0,   -- Soma (média = duration_seconds / sessions)
+    pageviews BIGINT NOT NULL DEFAULT 0,
+    purchases INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_device (date_key, device_category, browser, operating_system),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key)
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- fct_session_geo_daily - Sessões por dia x país x região
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS fct_session_geo_daily (
+    session_geo_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date_key INT NOT NULL,
+    country VARCHAR(50) NULL,
+    region VARCHAR(100) NULL,
+    
+    -- Métricas
+    sessions INT NOT NULL DEFAULT 0,
+    engaged_sessions INT NOT NULL DEFAULT 0,
+    duration_seconds BIGINT NOT NULL DEFAULT 0,   -- Soma (média = duration_seconds / sessions)
+    pageviews BIGINT NOT NULL DEFAULT 0,
+    purchases INT NOT NULL DEFAULT 0,
+    
+    refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    UNIQUE INDEX idx_date_geo (date_key, country, region),
+    
+    FOREIGN KEY (date_key) REFERENCES dim_dates(date_key)
+) ENGINE=InnoDB;
+
+-- ============================================================
+-- TABELAS DE CONTROLE
+-- ============================================================
+
+-- -----------------------------------------------------
+-- etl_loads - Cargas concluídas (o maior load_id é a versão dos dados)
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS etl_loads (
+    load_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    
+    -- Período recarregado
+    start_date_key INT NOT NULL,
+    end_date_key INT NOT NULL,
+    
+    loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
+-- -----------------------------------------------------
+-- api_jobs - Requisições longas executadas em segundo plano (Prefer: respond-async)
+-- -----------------------------------------------------
+CREATE TABLE IF NOT EXISTS api_jobs (
+    job_id VARCHAR(32) PRIMARY KEY,
+    tenant VARCHAR(64) NOT NULL,
+    
+    -- Rota e parâmetros (params_key identifica requisições idênticas)
+    endpoint VARCHAR(200) NOT NULL,
+    params TEXT NULL,
+    params_key VARCHAR(40) NOT NULL,
+    
+    status VARCHAR(20) NOT NULL,                  -- queued, running, done, failed
+    
+    -- Resposta (ou detalhe do erro)
+    status_code INT NULL,
+    media_type VARCHAR(100) NULL,
+    result LONGBLOB NULL,
+    error TEXT NULL,
+    
+    created_at DATETIME NOT NULL,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    expires_at DATETIME NOT NULL,                 -- Job em execução: timeout; concluído: retenção do resultado
+    
+    INDEX idx_job_lookup (tenant, params_key, expires_at),
+    INDEX idx_expires (expires_at)
+) ENGINE=InnoDB;
+
 -- ============================================================
 -- TABELAS RAW (dados brutos das APIs)
 -- ============================================================
@@ -740,6 +1045,8 @@ LEFT JOIN (
         SUM(attributed_revenue) as attributed_revenue
     FROM fct_attribution
     WHERE attribution_model = 'last_click'
+      AND is_cancelled = FALSE
+      AND date_key >= CAST(DATE_FORMAT(DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY), '%Y%m%d') AS UNSIGNED)
     GROUP BY campaign_id
 ) attr ON c.campaign_id = attr.campaign_id
 WHERE d.full_date >= DATE_SUB(CURRENT_DATE, INTERVAL 30 DAY)
@@ -747,6 +1054,57 @@ GROUP BY c.campaign_id, c.platform, c.campaign_name, c.campaign_type, c.funnel_s
          attr.attributed_orders, attr.attributed_revenue
 ORDER BY spend DESC;
 
+-- ============================================================
+-- TRIGGERS
+-- ============================================================
+
+-- -----------------------------------------------------
+-- fct_orders -> fct_order_keys (unicidade de external_order_id)
+-- -----------------------------------------------------
+-- O loader faz upsert em fct_orders pela chave (external_order_id, date_key).
+-- Um pedido cuja data mudou deve ser atualizado pelo external_order_id
+-- (UPDATE ... SET date_key = ...); um INSERT com outra data falha aqui.
+DELIMITER //
+CREATE TRIGGER trg_fct_orders_key_insert
+BEFORE INSERT ON fct_orders
+FOR EACH ROW
+BEGIN
+    DECLARE loaded_date_key INT DEFAULT NULL;
+    
+    SELECT date_key INTO loaded_date_key
+    FROM fct_order_keys
+    WHERE external_order_id = NEW.external_order_id;
+    
+    IF loaded_date_key IS NULL THEN
+        INSERT INTO fct_order_keys (external_order_id, date_key)
+        VALUES (NEW.external_order_id, NEW.date_key);
+    ELSEIF loaded_date_key <> NEW.date_key THEN
+        -- Upsert na mesma data segue para o ON DUPLICATE KEY UPDATE
+        SIGNAL SQLSTATE '23000'
+            SET MESSAGE_TEXT = 'external_order_id already loaded with another date_key';
+    END IF;
+END //
+
+CREATE TRIGGER trg_fct_orders_key_update
+BEFORE UPDATE ON fct_orders
+FOR EACH ROW
+BEGIN
+    IF NEW.external_order_id <> OLD.external_order_id OR NEW.date_key <> OLD.date_key THEN
+        -- Falha por chave duplicada se o novo external_order_id já existir
+        UPDATE fct_order_keys
+        SET external_order_id = NEW.external_order_id, date_key = NEW.date_key
+        WHERE external_order_id = OLD.external_order_id;
+    END IF;
+END //
+
+CREATE TRIGGER trg_fct_orders_key_delete
+AFTER DELETE ON fct_orders
+FOR EACH ROW
+BEGIN
+    DELETE FROM fct_order_keys WHERE external_order_id = OLD.external_order_id;
+END //
+DELIMITER ;
+
 -- ============================================================
 -- STORED PROCEDURES
 -- ============================================================
@@ -900,3 +1258,39 @@ DELIMITER ;
 
 -- Popular calendário de 2020 a 2030
 CALL sp_populate_dim_dates('2020-01-01', '2030-12-31');
+
+-- ============================================================
+-- MIGRAÇÃO: particionar fatos de bancos criados antes das partições
+-- ============================================================
+-- Rodar uma vez (reescreve as tabelas); depois, scripts/maintain_partitions.py
+-- cria as partições mensais.
+--
+-- ALTER TABLE fct_order_items DROP FOREIGN KEY <fk_order_id>, DROP FOREIGN KEY <fk_product_id>, DROP FOREIGN KEY <fk_date_key>;
+-- ALTER TABLE fct_attribution DROP FOREIGN KEY <fk_order_id>;
+-- ALTER TABLE fct_orders DROP FOREIGN KEY <fk_customer_id>, DROP FOREIGN KEY <fk_date_key>, DROP FOREIGN KEY <fk_channel_id>;
+-- ALTER TABLE fct_ad_spend DROP FOREIGN KEY <fk_date_key>, DROP FOREIGN KEY <fk_campaign_id>;
+-- ALTER TABLE fct_sessions DROP FOREIGN KEY <fk_date_key>, DROP FOREIGN KEY <fk_customer_id>, DROP FOREIGN KEY <fk_channel_id>;
+--
+-- ALTER TABLE fct_orders DROP PRIMARY KEY, ADD PRIMARY KEY (order_id, date_key),
+--     DROP INDEX idx_external_order, ADD UNIQUE INDEX idx_external_order (external_order_id, date_key),
+--     PARTITION BY RANGE (date_key) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+-- ALTER TABLE fct_order_items DROP PRIMARY KEY, ADD PRIMARY KEY (order_item_id, date_key),
+--     DROP INDEX idx_order, ADD INDEX idx_order (order_id, date_key),
+--     PARTITION BY RANGE (date_key) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+-- ALTER TABLE fct_ad_spend DROP PRIMARY KEY, ADD PRIMARY KEY (spend_id, date_key),
+--     PARTITION BY RANGE (date_key) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+-- ALTER TABLE fct_sessions DROP PRIMARY KEY, ADD PRIMARY KEY (session_id, date_key),
+--     PARTITION BY RANGE (date_key) (PARTITION p_future VALUES LESS THAN MAXVALUE);
+
+-- Unicidade de external_order_id (depois de criar fct_order_keys e os triggers acima)
+--
+-- INSERT INTO fct_order_keys (external_order_id, date_key)
+--     SELECT external_order_id, MIN(date_key) FROM fct_orders GROUP BY external_order_id;
+-- SELECT external_order_id FROM fct_orders GROUP BY external_order_id HAVING COUNT(*) > 1;  -- deve vir vazio
+
+-- Índices propostos por scripts/check_query_plans.py (bancos existentes)
+--
+-- ALTER TABLE dim_customers DROP INDEX idx_rfm_segment,
+--     ADD INDEX idx_rfm_segment_revenue (rfm_segment, total_revenue), ADD INDEX idx_total_revenue (total_revenue);
+-- ALTER TABLE fct_orders DROP INDEX idx_date,
+--     ADD INDEX idx_date_status_totals (date_key, order_status, customer_id, total_amount, is_first_order, is_repeat_order);